@@ -1,40 +1,300 @@
 import sys
 import os
-import urllib.request
+import json
+import argparse
+import hashlib
+import threading
 import shutil
+import tempfile
+import time
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, 
                              QLabel, QPushButton, QProgressBar, QFileDialog,
                              QGraphicsDropShadowEffect, QLineEdit)
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QPoint, QPropertyAnimation, QEasingCurve
 from PyQt5.QtGui import QFont, QColor, QPalette, QPixmap
 import requests
+from requests.adapters import HTTPAdapter
 
-FLYKIT_URL = "https://fly.itrypro.ru/flykit.exe"
+# Default mirror; more come from --mirror and the manifest's "mirrors" list
+MIRRORS = [
+    "https://fly.itrypro.ru/",
+]
+PROBE_FILE = "flykit.exe"
+PROBE_BYTES = 128 * 1024
+# Below this rate after the grace period the download moves to the next mirror
+MIN_THROUGHPUT = 64 * 1024
+THROUGHPUT_WINDOW = 3.0
 DEFAULT_INSTALL_PATH = os.path.join(os.environ.get('PROGRAMFILES', 'C:\\Program Files'), 'Flykit')
+MAX_PARALLEL_DOWNLOADS = 4
+CHUNK_SIZE = 64 * 1024
+# Files written by the installer; only these are ever replaced or removed
+INSTALL_RECORD = "install.json"
 
-class DownloadThread(QThread):
+# One connection pool shared by the manifest, the logo and all components
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=MAX_PARALLEL_DOWNLOADS, pool_maxsize=MAX_PARALLEL_DOWNLOADS))
+session.mount("http://", HTTPAdapter(pool_connections=MAX_PARALLEL_DOWNLOADS, pool_maxsize=MAX_PARALLEL_DOWNLOADS))
+
+def probe_mirror(mirror):
+    # Small ranged request: time to first byte and transfer rate
+    started = time.perf_counter()
+    try:
+        with session.get(urljoin(mirror, PROBE_FILE), headers={"Range": f"bytes=0-{PROBE_BYTES - 1}"},
+                         stream=True, timeout=5) as response:
+            response.raise_for_status()
+            received = 0
+            latency = None
+            for chunk in response.iter_content(CHUNK_SIZE):
+                if latency is None:
+                    latency = time.perf_counter() - started
+                received += len(chunk)
+                if received >= PROBE_BYTES:
+                    break
+    except requests.RequestException:
+        return None
+    elapsed = max(time.perf_counter() - started, 1e-6)
+    return {"mirror": mirror, "latency": latency or elapsed, "throughput": received / elapsed}
+
+def rank_mirrors(mirrors):
+    with ThreadPoolExecutor(max_workers=len(mirrors)) as executor:
+        results = list(executor.map(probe_mirror, mirrors))
+    reachable = sorted((result for result in results if result), key=lambda result: (-result["throughput"], result["latency"]))
+    ranked = [result["mirror"] for result in reachable]
+    # Unreachable mirrors stay at the end as a last resort
+    return ranked + [mirror for mirror in mirrors if mirror not in ranked]
+
+def load_manifest(mirrors):
+    # Fall back to the single executable if the manifest is unavailable
+    for mirror in mirrors:
+        try:
+            response = session.get(urljoin(mirror, "manifest.json"), timeout=10)
+            response.raise_for_status()
+            manifest = response.json()
+            extra = [urljoin(mirror, url) for url in manifest.get("mirrors", []) if isinstance(url, str)]
+            return manifest["components"], extra
+        except (requests.RequestException, ValueError, KeyError, AttributeError):
+            continue
+    return [{"name": "Flykit Browser", "url": PROBE_FILE, "path": "flykit.exe"}], []
+
+def safe_relative_path(path):
+    # Manifest paths must stay inside the install folder
+    normalized = os.path.normpath(path.replace("\\", "/"))
+    parts = normalized.split(os.sep)
+    if not path or os.path.isabs(normalized) or os.path.splitdrive(normalized)[0] or normalized == os.curdir or os.pardir in parts:
+        raise ValueError(f"unsafe path in manifest: {path}")
+    return normalized
+
+class MirrorTooSlow(requests.ConnectionError):
+    pass
+
+class InstallThread(QThread):
     progress = pyqtSignal(int)
+    status = pyqtSignal(str)
     finished = pyqtSignal(bool, str)
     
-    def __init__(self, url, destination):
+    def __init__(self, install_path, mirrors=None):
         super().__init__()
-        self.url = url
-        self.destination = destination
+        self.install_path = os.path.normpath(os.path.abspath(install_path))
+        self.staging_path = None
+        self.lock = threading.Lock()
+        self.cancelled = threading.Event()
+        self.downloaded = 0
+        self.total = 0
+        self.mirrors = list(mirrors or MIRRORS)
+    
+    def add_progress(self, size):
+        with self.lock:
+            self.downloaded += size
+            if self.total > 0:
+                self.progress.emit(min(int(self.downloaded * 100 / self.total), 100))
+    
+    def demote_mirror(self, mirror):
+        with self.lock:
+            if mirror in self.mirrors and len(self.mirrors) > 1:
+                self.mirrors.remove(mirror)
+                self.mirrors.append(mirror)
+    
+    def fetch_from(self, url, destination, offset, component):
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        with session.get(url, headers=headers, stream=True, timeout=(5, 15)) as response:
+            if offset and response.status_code == 416:
+                # Nothing left past the offset: the file is already complete
+                total = response.headers.get("Content-Range", "").rpartition("/")[2]
+                if total.isdigit() and int(total) == offset:
+                    return
+                os.remove(destination)
+                self.add_progress(-offset)
+            response.raise_for_status()
+            if offset and response.status_code != 206:
+                # Mirror ignored the range: start the file over
+                self.add_progress(-offset)
+                offset = 0
+            if not component.get("size"):
+                # Size missing from the manifest: count it in once the server reports it
+                component["size"] = offset + int(response.headers.get("Content-Length", 0))
+                with self.lock:
+                    self.total += component["size"]
+            
+            window_start = time.perf_counter()
+            window_bytes = 0
+            with open(destination, "r+b" if offset else "wb") as f:
+                f.seek(offset)
+                f.truncate()
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    if self.cancelled.is_set():
+                        raise RuntimeError("cancelled")
+                    f.write(chunk)
+                    self.add_progress(len(chunk))
+                    window_bytes += len(chunk)
+                    elapsed = time.perf_counter() - window_start
+                    if elapsed >= THROUGHPUT_WINDOW:
+                        # A slow link is still better than none when there is no other mirror
+                        if window_bytes / elapsed < MIN_THROUGHPUT and len(self.mirrors) > 1:
+                            raise MirrorTooSlow("mirror too slow")
+                        window_start = time.perf_counter()
+                        window_bytes = 0
+    
+    def staged_file(self, component):
+        return os.path.join(self.staging_path, safe_relative_path(component["path"]))
+    
+    def fetch(self, component):
+        destination = self.staged_file(component)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        
+        # Every mirror gets two chances; completed bytes are kept between attempts.
+        # Moving off a slow mirror that still made progress is not a failure.
+        error = None
+        failures = 0
+        while failures < len(self.mirrors) * 2:
+            mirror = self.mirrors[0]
+            offset = os.path.getsize(destination) if os.path.exists(destination) else 0
+            try:
+                self.fetch_from(urljoin(mirror, component["url"]), destination, offset, component)
+                break
+            except MirrorTooSlow as e:
+                error = e
+                self.demote_mirror(mirror)
+                if os.path.getsize(destination) <= offset:
+                    failures += 1
+            except requests.RequestException as e:
+                error = e
+                failures += 1
+                self.demote_mirror(mirror)
+        else:
+            raise RuntimeError(f"all mirrors failed: {error}")
+        
+        # Hash the finished file: it may have been assembled from several mirrors
+        expected = component.get("sha256")
+        digest = hashlib.sha256()
+        with open(destination, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+        if expected and digest.hexdigest().lower() != expected.lower():
+            os.remove(destination)
+            raise ValueError(f"checksum mismatch for {component['name']}")
+    
+    def read_record(self):
+        try:
+            with open(os.path.join(self.install_path, INSTALL_RECORD), encoding="utf-8") as f:
+                recorded = json.load(f)["files"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        files = []
+        for path in recorded:
+            try:
+                files.append(safe_relative_path(path))
+            except (ValueError, AttributeError):
+                continue
+        return files
+    
+    def write_record(self, files):
+        record_path = os.path.join(self.install_path, INSTALL_RECORD)
+        with open(record_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"files": files}, f, indent=2)
+        os.replace(record_path + ".tmp", record_path)
+    
+    def check_install_path(self):
+        # Never install over a folder with someone else's files in it
+        if not os.path.isdir(self.install_path) or not os.listdir(self.install_path):
+            return
+        if self.read_record() is None and not os.path.isfile(os.path.join(self.install_path, "flykit.exe")):
+            raise RuntimeError(f"{self.install_path} is not empty and does not contain a Flykit installation")
+    
+    def commit(self, files):
+        # Swap only the installer's own files, keeping the old ones until every swap succeeds
+        previous = self.read_record() or []
+        os.makedirs(self.install_path, exist_ok=True)
+        backup_path = tempfile.mkdtemp(prefix=".flykit-backup-", dir=os.path.dirname(self.install_path))
+        backed_up = []
+        placed = []
+        try:
+            for path in dict.fromkeys(files + previous):
+                target = os.path.join(self.install_path, path)
+                if os.path.isfile(target):
+                    backup = os.path.join(backup_path, path)
+                    os.makedirs(os.path.dirname(backup), exist_ok=True)
+                    os.replace(target, backup)
+                    backed_up.append(path)
+            for path in files:
+                target = os.path.join(self.install_path, path)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(os.path.join(self.staging_path, path), target)
+                placed.append(path)
+            self.write_record(files)
+        except OSError:
+            for path in placed:
+                os.remove(os.path.join(self.install_path, path))
+            for path in backed_up:
+                os.replace(os.path.join(backup_path, path), os.path.join(self.install_path, path))
+            raise
+        finally:
+            shutil.rmtree(backup_path, ignore_errors=True)
     
     def run(self):
         try:
-            # Create destination directory if it doesn't exist
-            os.makedirs(os.path.dirname(self.destination), exist_ok=True)
+            self.check_install_path()
+            
+            self.status.emit("Reading component manifest...")
+            components, extra = load_manifest(self.mirrors)
+            
+            self.status.emit("Choosing the fastest mirror...")
+            self.mirrors = rank_mirrors(list(dict.fromkeys(self.mirrors + extra)))
+            self.total = sum(component.get("size", 0) for component in components)
+            
+            # Staging sits next to the install folder so the final moves are renames
+            parent = os.path.dirname(self.install_path)
+            os.makedirs(parent, exist_ok=True)
+            self.staging_path = tempfile.mkdtemp(prefix=".flykit-staging-", dir=parent)
             
-            def reporthook(block_num, block_size, total_size):
-                if total_size > 0:
-                    downloaded = block_num * block_size
-                    progress = int((downloaded / total_size) * 100)
-                    self.progress.emit(min(progress, 100))
+            self.status.emit(f"Downloading {len(components)} components...")
+            files = []
+            with ThreadPoolExecutor(max_workers=MAX_PARALLEL_DOWNLOADS) as executor:
+                futures = {executor.submit(self.fetch, component): component for component in components}
+                for future in as_completed(futures):
+                    component = futures[future]
+                    try:
+                        future.result()
+                        files.append(safe_relative_path(component["path"]))
+                    except Exception as e:
+                        if component.get("optional"):
+                            # A partial file must not end up in the install
+                            try:
+                                os.remove(self.staged_file(component))
+                            except (OSError, ValueError):
+                                pass
+                            continue
+                        self.cancelled.set()
+                        raise RuntimeError(f"{component['name']}: {e}")
             
-            urllib.request.urlretrieve(self.url, self.destination, reporthook)
+            self.status.emit("Installing...")
+            self.commit(files)
+            shutil.rmtree(self.staging_path, ignore_errors=True)
             self.finished.emit(True, "Installation completed successfully!")
         except Exception as e:
+            if self.staging_path:
+                shutil.rmtree(self.staging_path, ignore_errors=True)
             self.finished.emit(False, f"Installation failed: {str(e)}")
 
 class DraggableTitleBar(QWidget):
@@ -87,9 +347,10 @@ class DraggableTitleBar(QWidget):
             event.accept()
 
 class FlykitInstaller(QWidget):
-    def __init__(self):
+    def __init__(self, mirrors=None):
         super().__init__()
         self.install_path = DEFAULT_INSTALL_PATH
+        self.mirrors = mirrors
         self.current_step = 0
         self.init_ui()
     
@@ -137,7 +398,10 @@ class FlykitInstaller(QWidget):
         content_layout.setSpacing(25)
         
         url = "https://fly.itrypro.ru/favicon.png"
-        data = requests.get(url).content
+        try:
+            data = session.get(url, timeout=10).content
+        except requests.RequestException:
+            data = b""
 
 # Загружаем в QPixmap
         pixmap = QPixmap()
@@ -333,9 +597,9 @@ class FlykitInstaller(QWidget):
         self.status_label.setText("Downloading Flykit Browser...")
         
         # Start download
-        exe_path = os.path.join(self.install_path, "flykit.exe")
-        self.download_thread = DownloadThread(FLYKIT_URL, exe_path)
+        self.download_thread = InstallThread(self.install_path, self.mirrors)
         self.download_thread.progress.connect(self.update_progress)
+        self.download_thread.status.connect(self.status_label.setText)
         self.download_thread.finished.connect(self.installation_finished)
         self.download_thread.start()
     
@@ -343,8 +607,6 @@ class FlykitInstaller(QWidget):
         self.progress_bar.setValue(value)
         if value < 100:
             self.status_label.setText(f"Downloading Flykit Browser... {value}%")
-        else:
-            self.status_label.setText("Installing...")
     
     def installation_finished(self, success, message):
         if success:
@@ -405,13 +667,19 @@ class FlykitInstaller(QWidget):
             self.status_label.setStyleSheet("color: #d93025;")
 
 def main():
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Flykit Browser Installer")
+    parser.add_argument("--mirror", action="append", default=[], metavar="URL",
+                        help="download mirror to use instead of the default one (repeatable)")
+    args, qt_args = parser.parse_known_args()
+    mirrors = [mirror if mirror.endswith("/") else mirror + "/" for mirror in args.mirror]
+    
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setStyle('Fusion')
     
     # Set application font
     app.setFont(QFont("Segoe UI", 10))
     
-    installer = FlykitInstaller()
+    installer = FlykitInstaller(mirrors)
     installer.show()
     
     sys.exit(app.exec_())
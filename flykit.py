@@ -5,28 +5,176 @@ import zipfile
 import shutil
 import time
 import gc
+import re
+import hashlib
+import sqlite3
+import secrets
+import threading
+import io
+import html
+import traceback
+import copy
+import argparse
+import csv
+from collections import OrderedDict, Counter, deque
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QToolBar, QAction, QLineEdit, 
                              QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
                              QListWidget, QMessageBox, QWidget, QMenu, QGraphicsDropShadowEffect,
-                             QTabWidget, QTabBar)
-from PyQt5.QtGui import QIcon, QPixmap, QFont, QPalette, QColor, QPainter, QPainterPath
-from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEngineProfile, QWebEngineScript
-from PyQt5.QtCore import QUrl, Qt, QFile, QIODevice, QPropertyAnimation, QEasingCurve, QRect, QPoint
+                             QTabWidget, QTabBar, QListWidgetItem, QCompleter)
+from PyQt5.QtGui import QIcon, QPixmap, QFont, QPalette, QColor, QPainter, QPainterPath, QImage
+from PyQt5.QtWebEngineWidgets import (QWebEngineView, QWebEngineProfile, QWebEngineScript, QWebEngineSettings,
+                                      QWebEnginePage, QWebEngineDownloadItem)
+from PyQt5.QtWebEngineCore import (QWebEngineUrlRequestInterceptor, QWebEngineUrlRequestInfo,
+                                  QWebEngineUrlSchemeHandler, QWebEngineUrlScheme, QWebEngineUrlRequestJob)
+from PyQt5.QtCore import (QUrl, Qt, QFile, QIODevice, QPropertyAnimation, QEasingCurve, QRect, QPoint, QTimer, QBuffer,
+                          QByteArray, QObject, pyqtSignal, pyqtSlot, QRunnable, QThreadPool, QSize, QEvent, QCoreApplication,
+                          QStringListModel)
+from PyQt5.QtWebChannel import QWebChannel
+from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkRequest, QNetworkReply, QNetworkConfigurationManager
+
+PROCESS_STARTED = time.perf_counter()
 
 # Путь установки
 INSTALL_PATH = os.path.join(os.path.expanduser("~"), ".expb")
 SETTINGS_FILE = os.path.join(INSTALL_PATH, "settings.json")
 CACHE_DIR = os.path.join(INSTALL_PATH, "cache")
 EXTENSIONS_DIR = os.path.join(INSTALL_PATH, "extensions")
+FILTERS_DIR = os.path.join(INSTALL_PATH, "filters")
+
+HOMEPAGE_URL = "https://www.fly.itrypro.ru/alp/index.html"
+
+settings_cache = (None, {})
+
+def load_settings():
+    # Файл перечитывается только после изменения; вызывающий код получает свою копию
+    global settings_cache
+    try:
+        stat = os.stat(SETTINGS_FILE)
+        key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if settings_cache[0] != key:
+            with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
+                settings_cache = (key, json.load(f))
+        return copy.deepcopy(settings_cache[1])
+    except (OSError, ValueError):
+        return {}
+
+def write_file_atomic(path, data):
+    # Запись через временный файл: при сбое на диске остаётся прежняя версия, а не половина новой
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def write_json_atomic(path, value, **options):
+    write_file_atomic(path, json.dumps(value, **options).encode("utf-8"))
+
+def save_settings(settings):
+    global settings_cache
+    write_json_atomic(SETTINGS_FILE, settings, indent=4)
+    settings_cache = (None, {})
 
-# Проверяем папки
-os.makedirs(CACHE_DIR, exist_ok=True)
-os.makedirs(EXTENSIONS_DIR, exist_ok=True)
+def prepare_install_dirs():
+    # Папки и настройки по умолчанию создаются при запуске, а не при импорте модуля
+    for path in (CACHE_DIR, EXTENSIONS_DIR, FILTERS_DIR):
+        os.makedirs(path, exist_ok=True)
+    if not os.path.exists(SETTINGS_FILE):
+        save_settings({"homepage": HOMEPAGE_URL})
+
+ENGINE_DEFAULTS = {
+    "renderer_process_limit": "auto",
+    "process_model": "process-per-site-instance",
+    "gpu": "auto",
+    "background_throttling": True,
+    "dns_prefetch": True,
+}
+
+def engine_settings():
+    engine = dict(ENGINE_DEFAULTS)
+    engine.update(load_settings().get("engine", {}))
+    return engine
+
+def total_memory():
+    try:
+        import psutil
+        return psutil.virtual_memory().total
+    except Exception:
+        pass
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        pass
+    try:
+        import ctypes
+
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                        ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                        ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                        ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                        ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+        status = MemoryStatus()
+        status.dwLength = ctypes.sizeof(MemoryStatus)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullTotalPhys
+    except Exception:
+        pass
+    return None
+
+def build_chromium_flags(engine):
+    flags = []
+    
+    limit = engine["renderer_process_limit"]
+    if limit == "auto":
+        # На машинах с малым объёмом памяти ограничиваем число процессов отрисовки
+        memory_gb = (total_memory() or 0) / 1024 ** 3
+        if not memory_gb or memory_gb > 8.5:
+            limit = None
+        elif memory_gb > 4.5:
+            limit = 6
+        elif memory_gb > 2.5:
+            limit = 3
+        else:
+            limit = 2
+    if limit:
+        # Настройка читается до создания QApplication: неверное значение не должно ронять запуск
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            print(f"Неверное значение renderer_process_limit: {limit!r}")
+            limit = 0
+        if limit > 0:
+            flags.append(f"--renderer-process-limit={limit}")
+    
+    # Chromium поддерживает только эти модели; по умолчанию — process-per-site-instance без флага
+    if engine["process_model"] == "process-per-site":
+        flags.append("--process-per-site")
+    elif engine["process_model"] == "single-process":
+        flags.append("--single-process")
+    elif engine["process_model"] != "process-per-site-instance":
+        print(f"Неизвестная модель процессов: {engine['process_model']!r}")
+    
+    if engine["gpu"] == "disabled":
+        flags += ["--disable-gpu", "--disable-gpu-compositing"]
+    elif engine["gpu"] == "software":
+        flags.append("--disable-gpu-rasterization")
+    
+    if not engine["background_throttling"]:
+        flags += ["--disable-background-timer-throttling", "--disable-renderer-backgrounding",
+                  "--disable-backgrounding-occluded-windows"]
+    return flags
 
-# Сохраняем настройки
-if not os.path.exists(SETTINGS_FILE):
-    with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-        json.dump({"homepage": "https://www.fly.itrypro.ru/alp/index.html"}, f, indent=4)
+def apply_engine_settings():
+    # Должно вызываться до создания QApplication
+    engine = engine_settings()
+    existing = os.environ.get("QTWEBENGINE_CHROMIUM_FLAGS", "").split()
+    # Флаги, заданные в окружении вручную, важнее настроек
+    names = {flag.split("=", 1)[0] for flag in existing}
+    flags = existing + [flag for flag in build_chromium_flags(engine) if flag.split("=", 1)[0] not in names]
+    os.environ["QTWEBENGINE_CHROMIUM_FLAGS"] = " ".join(flags)
+    if engine["gpu"] == "software":
+        QCoreApplication.setAttribute(Qt.AA_UseSoftwareOpenGL)
+    return flags
 
 class ExtensionInstallDialog(QDialog):
     def __init__(self, extension_name, extension_icon=None, parent=None):
@@ -191,9 +339,12 @@ class ExtensionsManager(QDialog):
     def __init__(self, browser, parent=None):
         super().__init__(parent)
         self.browser = browser
+        self.checking_updates = False
         self.setWindowTitle("Расширения")
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.Dialog)
         self.setAttribute(Qt.WA_TranslucentBackground)
+        # Окно создаётся на каждое открытие, после закрытия оно больше не нужно
+        self.setAttribute(Qt.WA_DeleteOnClose)
         self.setFixedSize(720, 520)
         
         container = QWidget(self)
@@ -317,6 +468,38 @@ class ExtensionsManager(QDialog):
             }
         """)
         remove_btn.clicked.connect(self.remove_extension)
+        
+        self.update_btn = QPushButton("Проверить обновления")
+        self.update_btn.setFixedHeight(40)
+        self.update_btn.setCursor(Qt.PointingHandCursor)
+        self.update_btn.setStyleSheet("""
+            QPushButton {
+                background-color: transparent;
+                border: 1px solid #dadce0;
+                padding: 0px 24px;
+                border-radius: 20px;
+                font-size: 14px;
+                font-weight: 500;
+                color: #1a73e8;
+                font-family: 'Segoe UI', Arial, sans-serif;
+            }
+            QPushButton:hover {
+                background-color: #f8f9fa;
+                border-color: #1a73e8;
+            }
+            QPushButton:pressed {
+                background-color: #e8f0fe;
+            }
+        """)
+        self.update_btn.clicked.connect(self.check_updates)
+        btn_layout.addWidget(self.update_btn)
+        
+        toggle_btn = QPushButton("Вкл./откл.")
+        toggle_btn.setFixedHeight(40)
+        toggle_btn.setCursor(Qt.PointingHandCursor)
+        toggle_btn.setStyleSheet(self.update_btn.styleSheet())
+        toggle_btn.clicked.connect(self.toggle_extension)
+        btn_layout.addWidget(toggle_btn)
         btn_layout.addWidget(remove_btn)
         
         layout.addLayout(btn_layout)
@@ -333,6 +516,7 @@ class ExtensionsManager(QDialog):
     
     def load_extensions(self):
         self.extensions_list.clear()
+        disabled = set(load_settings().get("disabled_extensions", []))
         for ext_name in os.listdir(EXTENSIONS_DIR):
             ext_path = os.path.join(EXTENSIONS_DIR, ext_name)
             if os.path.isdir(ext_path):
@@ -340,7 +524,50 @@ class ExtensionsManager(QDialog):
                 if os.path.exists(manifest_path):
                     with open(manifest_path, "r", encoding="utf-8") as f:
                         manifest = json.load(f)
-                        self.extensions_list.addItem(f"📦 {manifest.get('name', ext_name)} (v{manifest.get('version', '1.0')})")
+                    text = f"📦 {manifest.get('name', ext_name)} (v{manifest.get('version', '1.0')})"
+                    summary = self.browser.extension_runtime.summary(ext_name)
+                    if summary:
+                        text += f" — {summary}"
+                    if ext_name in disabled:
+                        text += " — отключено"
+                    item = QListWidgetItem(text)
+                    item.setData(Qt.UserRole, ext_name)
+                    self.extensions_list.addItem(item)
+    
+    def toggle_extension(self):
+        current_item = self.extensions_list.currentItem()
+        if current_item:
+            ext_id = current_item.data(Qt.UserRole)
+            disabled = ext_id in load_settings().get("disabled_extensions", [])
+            self.browser.set_extension_enabled(ext_id, disabled)
+            self.load_extensions()
+    
+    def check_updates(self):
+        self.update_btn.setEnabled(False)
+        self.update_btn.setText("Проверка...")
+        self.checking_updates = True
+        self.browser.extension_updater.finished.connect(self.updates_checked)
+        self.browser.extension_updater.check_all()
+    
+    def stop_checking_updates(self):
+        if self.checking_updates:
+            self.checking_updates = False
+            self.browser.extension_updater.finished.disconnect(self.updates_checked)
+    
+    def done(self, result):
+        # Проверка может закончиться уже после закрытия окна
+        self.stop_checking_updates()
+        super().done(result)
+    
+    def updates_checked(self, count):
+        self.stop_checking_updates()
+        self.update_btn.setEnabled(True)
+        self.update_btn.setText("Проверить обновления")
+        self.load_extensions()
+        if count:
+            QMessageBox.information(self, "Обновления", f"Обновлено расширений: {count}")
+        else:
+            QMessageBox.information(self, "Обновления", "Все расширения обновлены")
     
     def remove_extension(self):
         current_item = self.extensions_list.currentItem()
@@ -367,7 +594,8 @@ class ExtensionsManager(QDialog):
                                             gc.collect()
                                             
                                             # Try to delete the folder
-                                            shutil.rmtree(ext_folder)
+                                            self.browser.extension_files.remove(folder)
+                                            self.browser.extension_storage.clear(folder)
                                             
                                             self.load_extensions()
                                             self.browser.load_extensions()
@@ -432,6 +660,25 @@ class ChromeTabBar(QTabBar):
                 border-radius: 8px;
             }
         """)
+        self.thumbnail_provider = None
+        self.preview = QLabel(None, Qt.ToolTip)
+        self.preview.setStyleSheet("border: 1px solid #dadce0; background-color: white;")
+    
+    def event(self, event):
+        if event.type() == QEvent.ToolTip and self.thumbnail_provider:
+            index = self.tabAt(event.pos())
+            image = self.thumbnail_provider(index) if index >= 0 else None
+            if image is not None:
+                self.preview.setPixmap(QPixmap.fromImage(image))
+                self.preview.adjustSize()
+                self.preview.move(self.mapToGlobal(QPoint(self.tabRect(index).left(), self.height() + 4)))
+                self.preview.show()
+            else:
+                self.preview.hide()
+            return True
+        if event.type() in (QEvent.Leave, QEvent.MouseButtonPress):
+            self.preview.hide()
+        return super().event(event)
 
 class CustomTitleBar(QWidget):
     def __init__(self, parent=None):
@@ -562,237 +809,4165 @@ class CustomTitleBar(QWidget):
     def mouseReleaseEvent(self, event):
         self.drag_position = None
 
-class Browser(QMainWindow):
-    def __init__(self):
+THUMBNAILS_DIR = os.path.join(CACHE_DIR, "thumbnails")
+
+class ThumbnailSignals(QObject):
+    ready = pyqtSignal(str, QImage)
+
+class ThumbnailJob(QRunnable):
+    def __init__(self, key, image, size, path, signals):
         super().__init__()
-        self.setWindowTitle("Flykit Browser")
-        self.setWindowIcon(QIcon("https://cdn.itrypro.ru/flkt-ico.png"))
-        self.setWindowFlags(Qt.FramelessWindowHint)
-        self.resize(1280, 860)
+        self.key = key
+        self.image = image
+        self.size = size
+        self.path = path
+        self.signals = signals
 
-        central_widget = QWidget()
-        self.setCentralWidget(central_widget)
-        main_layout = QVBoxLayout(central_widget)
-        main_layout.setContentsMargins(0, 0, 0, 0)
-        main_layout.setSpacing(0)
+    def run(self):
+        image = self.image.scaled(self.size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        temp_path = self.path + ".tmp"
+        if image.save(temp_path, "JPG", 75):
+            try:
+                os.replace(temp_path, self.path)
+            except OSError:
+                pass
+        self.signals.ready.emit(self.key, image)
 
-        self.title_bar = CustomTitleBar(self)
-        main_layout.addWidget(self.title_bar)
-        
-        self.tab_widget = QTabWidget()
-        self.tab_widget.setTabBar(self.title_bar.tab_bar)
-        self.tab_widget.setDocumentMode(True)
-        self.tab_widget.setStyleSheet("""
-            QTabWidget::pane {
-                border: none;
-                background-color: white;
-            }
-        """)
+class ThumbnailCache(QObject):
+    # LRU-кэш миниатюр вкладок: в памяти и на диске
+    SIZE = QSize(320, 200)
+
+    def __init__(self, memory_limit=64, disk_limit=500, parent=None):
+        super().__init__(parent)
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self.memory = OrderedDict()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.signals = ThumbnailSignals(self)
+        self.signals.ready.connect(self.store)
+        self.writes = 0
+        os.makedirs(THUMBNAILS_DIR, exist_ok=True)
+
+    @staticmethod
+    def key_for(url):
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(THUMBNAILS_DIR, key + ".jpg")
+
+    def capture(self, url, view):
+        if not url:
+            return
+        pixmap = view.grab()
+        if pixmap.isNull():
+            return
+        key = self.key_for(url)
+        # Снимок делается в UI-потоке, масштабирование и сжатие — в фоне
+        self.pool.start(ThumbnailJob(key, pixmap.toImage(), self.SIZE, self.path_for(key), self.signals))
+
+    def store(self, key, image):
+        self.memory[key] = image
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_limit:
+            self.memory.popitem(last=False)
+        self.writes += 1
+        if self.writes % 50 == 0:
+            self.evict_disk()
+
+    def get(self, url):
+        if not url:
+            return None
+        key = self.key_for(url)
+        image = self.memory.get(key)
+        if image is not None:
+            self.memory.move_to_end(key)
+            return image
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            return None
+        image = QImage(path)
+        if image.isNull():
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.memory[key] = image
+        while len(self.memory) > self.memory_limit:
+            self.memory.popitem(last=False)
+        return image
+
+    def evict_disk(self):
+        try:
+            entries = [entry for entry in os.scandir(THUMBNAILS_DIR) if entry.name.endswith(".jpg")]
+        except OSError:
+            return
+        if len(entries) <= self.disk_limit:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.disk_limit]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+FAVICONS_DIR = os.path.join(CACHE_DIR, "favicons")
+
+class FaviconStore(QObject):
+    # Иконки хранятся один раз по хэшу содержимого, индекс: хост -> хэш
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.index_path = os.path.join(FAVICONS_DIR, "index.json")
+        self.index = {}
+        self.icons = {}
+        os.makedirs(FAVICONS_DIR, exist_ok=True)
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
         
-        self.title_bar.new_tab_btn.clicked.connect(lambda: self.add_new_tab())
-        self.title_bar.tab_bar.tabCloseRequested.connect(self.close_tab)
-        self.title_bar.tab_bar.currentChanged.connect(self.tab_changed)
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(2000)
+        self.save_timer.timeout.connect(self.save_index)
+        # Иконки, полученные за последние секунды перед выходом, не должны теряться
+        QApplication.instance().aboutToQuit.connect(self.flush)
+    
+    def flush(self):
+        if self.save_timer.isActive():
+            self.save_timer.stop()
+            self.save_index()
+    
+    def icon_for(self, host):
+        digest = self.index.get(host)
+        if digest is None:
+            return None
+        icon = self.icons.get(digest)
+        if icon is None:
+            path = os.path.join(FAVICONS_DIR, digest + ".png")
+            if not os.path.exists(path):
+                return None
+            icon = QIcon(path)
+            self.icons[digest] = icon
+        return icon
+    
+    def store(self, host, icon):
+        buffer = QBuffer()
+        buffer.open(QIODevice.WriteOnly)
+        icon.pixmap(32, 32).save(buffer, "PNG")
+        data = bytes(buffer.data())
+        digest = hashlib.sha1(data).hexdigest()
         
-        toolbar = QToolBar()
-        toolbar.setMovable(False)
-        toolbar.setStyleSheet("""
-            QToolBar {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #ffffff, stop:1 #f8f9fa);
-                border: none;
-                border-bottom: 1px solid #e8eaed;
-                spacing: 4px;
-                padding: 12px 16px;
-                min-height: 56px;
-            }
-            QToolButton {
-                background-color: transparent;
-                border: none;
-                border-radius: 20px;
-                padding: 8px;
-                margin: 0px 2px;
-                color: #5f6368;
-                font-size: 20px;
-                min-width: 40px;
-                min-height: 40px;
+        if digest not in self.icons:
+            path = os.path.join(FAVICONS_DIR, digest + ".png")
+            if not os.path.exists(path):
+                with open(path, "wb") as f:
+                    f.write(data)
+            self.icons[digest] = icon
+        if host and self.index.get(host) != digest:
+            self.index[host] = digest
+            self.save_timer.start()
+        return self.icons[digest]
+    
+    def save_index(self):
+        try:
+            write_json_atomic(self.index_path, self.index)
+        except OSError as e:
+            print(f"Не удалось сохранить индекс иконок: {e}")
+
+EXTENSION_STORAGE_FILE = os.path.join(INSTALL_PATH, "extension_storage.sqlite3")
+# Расширения и канал к ним живут в отдельном мире: скрипты страницы их не видят
+EXTENSION_WORLD = QWebEngineScript.UserWorld
+
+# Мир общий для всех расширений, поэтому токены не должны проходить через то, что можно подменить:
+# загрузчик нельзя перезаписать, каждое расширение получает API один раз, сообщения кодируются своими копиями JSON
+EXTENSION_API_JS = """
+(function (tokens) {
+    if (window.__flykitExtension) {
+        return;
+    }
+    var stringify = JSON.stringify;
+    var parse = JSON.parse;
+    var assign = Object.assign;
+    var later = setTimeout;
+    // Таблица без прототипа: геттер на Object.prototype не увидит токены
+    var table = Object.create(null);
+    var remaining = 0;
+    for (var key in tokens) {
+        table[key] = tokens[key];
+        remaining += 1;
+    }
+    tokens = null;
+    var bridge = null;
+    var runtime = null;
+    var objects = {};
+    var queue = [];
+    var listeners = {};
+    var available = typeof qt !== "undefined" && qt.webChannelTransport && typeof QWebChannel !== "undefined";
+    if (available) {
+        var transport = qt.webChannelTransport;
+        var send = transport.send.bind(transport);
+        var channel = new QWebChannel(transport, function (channel) {
+            objects = channel.objects;
+            bridge = objects.extensionStorage;
+            runtime = objects.extensionRuntime;
+            queue.splice(0).forEach(function (call) { call(); });
+        });
+        channel.send = function (data) {
+            send(typeof data === "string" ? data : stringify(data));
+        };
+        var receive = transport.onmessage;
+        transport.onmessage = function (message) {
+            receive({data: typeof message.data === "string" ? parse(message.data) : message.data});
+        };
+        try {
+            Object.freeze(transport);
+        } catch (e) {
+        }
+        delete window.qt;
+    }
+    function call(fn) {
+        if (bridge) {
+            fn();
+        } else if (available) {
+            queue.push(fn);
+        }
+    }
+    function subscribe(id) {
+        // Каждое расширение слушает только свой объект изменений
+        listeners[id] = [];
+        call(function () {
+            var events = objects["extensionEvents:" + id];
+            if (events) {
+                events.changed.connect(function (changes) {
+                    var parsed = parse(changes);
+                    listeners[id].forEach(function (callback) { callback(parsed); });
+                });
             }
-            QToolButton:hover {
-                background-color: #f1f3f4;
-                color: #202124;
+        });
+    }
+    function claim(id, token) {
+        // API выдаётся один раз и только с верным токеном; после последнего расширения загрузчик пуст
+        if (!table || typeof id !== "string" || table[id] !== token) {
+            throw new Error("flykit: extension API is not available");
+        }
+        delete table[id];
+        remaining -= 1;
+        if (!remaining) {
+            table = null;
+        }
+        var pending = null;
+        var reported = false;
+        subscribe(id);
+        function flush() {
+            if (!pending) {
+                return;
             }
-            QToolButton:pressed {
-                background-color: #e8eaed;
+            var items = stringify(pending);
+            pending = null;
+            call(function () { bridge.set(id, token, items); });
+        }
+        return {
+            storage: {
+                get: function (keys) {
+                    flush();
+                    var request = stringify(keys == null ? null : [].concat(keys));
+                    return new Promise(function (resolve) {
+                        if (!available) {
+                            resolve({});
+                            return;
+                        }
+                        call(function () {
+                            bridge.get(id, token, request, function (result) { resolve(parse(result)); });
+                        });
+                    });
+                },
+                set: function (items) {
+                    // Записи одного тика отправляются одним сообщением
+                    if (!pending) {
+                        pending = {};
+                        later(flush, 0);
+                    }
+                    assign(pending, items);
+                    return Promise.resolve();
+                },
+                remove: function (keys) {
+                    flush();
+                    var request = stringify([].concat(keys));
+                    call(function () { bridge.remove(id, token, request); });
+                    return Promise.resolve();
+                },
+                onChanged: function (callback) {
+                    listeners[id].push(callback);
+                }
+            },
+            report: function (ms, error) {
+                // Один отчёт на загрузку документа: ровно столько шлёт обёртка content-скрипта
+                if (reported) {
+                    return;
+                }
+                reported = true;
+                call(function () { runtime.report(id, token, ms, error, location.host); });
             }
-        """)
-        self.addToolBar(toolbar)
+        };
+    }
+    Object.defineProperty(window, "__flykitExtension", {
+        value: claim,
+        writable: false,
+        configurable: false,
+        enumerable: false
+    });
+})(__FLYKIT_TOKENS__);
+"""
 
-        back_action = QAction("←", self)
-        back_action.triggered.connect(self.browser_back)
-        toolbar.addAction(back_action)
+EXTENSION_STORE_DIR = os.path.join(INSTALL_PATH, "extension_store")
 
-        forward_action = QAction("→", self)
-        forward_action.triggered.connect(self.browser_forward)
-        toolbar.addAction(forward_action)
+class ExtensionFileStore:
+    # Файлы расширений хранятся один раз по хэшу и связываются жёсткими ссылками
+    def __init__(self, root=EXTENSION_STORE_DIR):
+        self.objects_dir = os.path.join(root, "objects")
+        self.staging_dir = os.path.join(root, "staging")
+        self.refs_path = os.path.join(root, "refs.json")
+        self.lock = threading.RLock()
+        os.makedirs(self.objects_dir, exist_ok=True)
+        # Недостроенные папки от прерванной установки
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+        os.makedirs(self.staging_dir, exist_ok=True)
+        try:
+            with open(self.refs_path, "r", encoding="utf-8") as f:
+                self.refs = json.load(f)
+        except (OSError, ValueError):
+            self.refs = {}
 
-        reload_action = QAction("⟳", self)
-        reload_action.triggered.connect(self.browser_reload)
-        toolbar.addAction(reload_action)
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
 
-        toolbar.addSeparator()
+    def save(self):
+        write_json_atomic(self.refs_path, self.refs)
 
-        self.urlbar = QLineEdit()
-        self.urlbar.setPlaceholderText("Поиск в Google или введите URL")
-        self.urlbar.setMinimumHeight(44)
-        self.urlbar.setStyleSheet("""
-            QLineEdit {
-                border: 1px solid #e8eaed;
-                border-radius: 22px;
-                padding: 0px 20px;
-                background-color: white;
-                font-size: 14px;
-                color: #202124;
-                font-family: 'Segoe UI', Arial, sans-serif;
-                selection-background-color: #d2e3fc;
-            }
-            QLineEdit:hover {
-                border-color: #dadce0;
-            }
-            QLineEdit:focus {
-                border: 2px solid #1a73e8;
-                padding: 0px 19px;
-                background-color: white;
-            }
-        """)
-        self.urlbar.returnPressed.connect(self.navigate_to_url)
-        toolbar.addWidget(self.urlbar)
+    @staticmethod
+    def safe_path(name):
+        parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".")]
+        if not parts or ".." in parts or ":" in parts[0]:
+            return None
+        return "/".join(parts)
 
-        toolbar.addSeparator()
+    @staticmethod
+    def link(source, destination):
+        try:
+            os.link(source, destination)
+        except OSError:
+            shutil.copyfile(source, destination)
 
-        extensions_action = QAction("⋮", self)
-        extensions_action.triggered.connect(self.show_extensions_manager)
-        toolbar.addAction(extensions_action)
+    def install_from_zip(self, ext_id, zip_ref):
+        # Обновления ставятся из фонового потока
+        with self.lock:
+            return self._install_from_zip(ext_id, zip_ref)
 
-        self.current_browser = None
+    def _install_from_zip(self, ext_id, zip_ref):
+        # Новая версия собирается рядом и подменяет старую переименованием: расширение не остаётся полуобновлённым
+        target = os.path.join(EXTENSIONS_DIR, ext_id)
+        staging = os.path.join(self.staging_dir, f"{ext_id}-{secrets.token_hex(4)}")
+        old = self.refs.get(ext_id, {})
+        new = {}
+        written = 0
+        unchanged = 0
+        try:
+            os.makedirs(staging)
+            for info in zip_ref.infolist():
+                if info.is_dir():
+                    continue
+                rel_path = self.safe_path(info.filename)
+                if rel_path is None:
+                    continue
+                destination = os.path.join(staging, *rel_path.split("/"))
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                
+                # Файл не менялся: совпадают CRC и размер, распаковывать не нужно
+                previous = old.get(rel_path)
+                if previous and previous[1:] == [info.CRC, info.file_size]:
+                    object_path = self.object_path(previous[0])
+                    if os.path.exists(object_path):
+                        new[rel_path] = previous
+                        self.link(object_path, destination)
+                        unchanged += 1
+                        continue
+                
+                data = zip_ref.read(info)
+                digest = hashlib.sha256(data).hexdigest()
+                new[rel_path] = [digest, info.CRC, info.file_size]
+                object_path = self.object_path(digest)
+                if not os.path.exists(object_path):
+                    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                    write_file_atomic(object_path, data)
+                    written += 1
+                self.link(object_path, destination)
+            self.swap(staging, target)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            self.collect_garbage({entry[0] for entry in new.values()})
+            raise
         
-        main_layout.addWidget(toolbar)
-        main_layout.addWidget(self.tab_widget)
+        self.refs[ext_id] = new
+        self.save()
+        self.collect_garbage({entry[0] for entry in old.values()})
+        return written, unchanged
 
-        self.profile = QWebEngineProfile.defaultProfile()
-        self.add_new_tab()
+    def swap(self, staging, target):
+        if not os.path.exists(target):
+            os.replace(staging, target)
+            return
+        backup = staging + ".old"
+        os.replace(target, backup)
+        try:
+            os.replace(staging, target)
+        except OSError:
+            os.replace(backup, target)
+            raise
+        shutil.rmtree(backup, ignore_errors=True)
 
-        self.profile.downloadRequested.connect(self.handle_download)
-        self.load_extensions()
-    
-    def add_new_tab(self, url=None):
-        browser = QWebEngineView()
-        
-        if url is None:
-            with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-                settings = json.load(f)
-            url = settings.get("homepage", "https://www.fly.itrypro.ru/alp/index.html")
+    def remove(self, ext_id):
+        with self.lock:
+            target = os.path.join(EXTENSIONS_DIR, ext_id)
+            if os.path.exists(target):
+                shutil.rmtree(target)
+            old = self.refs.pop(ext_id, None)
+            if old is not None:
+                self.save()
+                self.collect_garbage({entry[0] for entry in old.values()})
+
+    def collect_garbage(self, candidates):
+        referenced = {entry[0] for files in self.refs.values() for entry in files.values()}
+        for digest in candidates - referenced:
+            try:
+                os.remove(self.object_path(digest))
+            except OSError:
+                pass
+
+def parse_version(version):
+    parts = []
+    for part in str(version).split("."):
+        digits = "".join(ch for ch in part if ch.isdigit())
+        parts.append(int(digits) if digits else 0)
+    # 1.0 и 1.0.0 — одна и та же версия
+    while parts and parts[-1] == 0:
+        parts.pop()
+    return tuple(parts)
+
+class ExtensionInstallSignals(QObject):
+    done = pyqtSignal(str, bool, str)
+
+class ExtensionInstallJob(QRunnable):
+    def __init__(self, file_store, ext_id, data, signals):
+        super().__init__()
+        self.file_store = file_store
+        self.ext_id = ext_id
+        self.data = data
+        self.signals = signals
+
+    def run(self):
+        try:
+            with zipfile.ZipFile(io.BytesIO(self.data), 'r') as zip_ref:
+                if "manifest.json" not in zip_ref.namelist():
+                    raise ValueError("отсутствует manifest.json")
+                self.file_store.install_from_zip(self.ext_id, zip_ref)
+            self.signals.done.emit(self.ext_id, True, "")
+        except Exception as e:
+            self.signals.done.emit(self.ext_id, False, str(e))
+
+class ExtensionUpdater(QObject):
+    # Проверяет update_url всех расширений параллельно через общий QNetworkAccessManager
+    updated = pyqtSignal(str, str)
+    finished = pyqtSignal(int)
+
+    def __init__(self, file_store, parent=None):
+        super().__init__(parent)
+        self.file_store = file_store
+        self.network = QNetworkAccessManager(self)
+        self.state_path = os.path.join(EXTENSION_STORE_DIR, "updates.json")
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {}
+        self.pending = 0
+        self.updated_count = 0
+        self.installs = {}
+        # Ссылки на ответы до их завершения: иначе сборщик мусора может забрать обёртку вместе с подключением
+        self.replies = set()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.signals = ExtensionInstallSignals(self)
+        self.signals.done.connect(self.install_finished)
+
+    def save_state(self):
+        try:
+            write_json_atomic(self.state_path, self.state)
+        except OSError as e:
+            print(f"Не удалось сохранить состояние обновлений: {e}")
+
+    def check_all(self):
+        if self.pending:
+            return
+        self.updated_count = 0
+        for ext_id in os.listdir(EXTENSIONS_DIR):
+            manifest_path = os.path.join(EXTENSIONS_DIR, ext_id, "manifest.json")
+            if not os.path.exists(manifest_path):
+                continue
+            try:
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if manifest.get("update_url"):
+                self.check(ext_id, manifest)
+        if not self.pending:
+            self.finished.emit(0)
+
+    def make_request(self, url):
+        request = QNetworkRequest(QUrl(url))
+        # HTTP/2 только поверх TLS: без него Qt пробует апгрейд h2c, а ошибка сервера в ответ на него
+        # оставляет запрос висеть
+        request.setAttribute(QNetworkRequest.HTTP2AllowedAttribute, request.url().scheme() == "https")
+        request.setAttribute(QNetworkRequest.FollowRedirectsAttribute, True)
+        return request
+
+    def check(self, ext_id, manifest):
+        request = self.make_request(manifest["update_url"])
+        cached = self.state.get(ext_id, {})
+        # Если ничего не изменилось, сервер ответит коротким 304
+        if cached.get("url") == manifest["update_url"]:
+            if cached.get("etag"):
+                request.setRawHeader(b"If-None-Match", cached["etag"].encode("latin-1"))
+            if cached.get("last_modified"):
+                request.setRawHeader(b"If-Modified-Since", cached["last_modified"].encode("latin-1"))
+        self.pending += 1
+        reply = self.network.get(request)
+        self.replies.add(reply)
+        reply.finished.connect(lambda reply=reply: self.check_finished(ext_id, manifest, reply))
+
+    def check_finished(self, ext_id, manifest, reply):
+        self.replies.discard(reply)
+        reply.deleteLater()
+        status = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
+        if reply.error() != QNetworkReply.NoError or status != 200:
+            if status != 304:
+                print(f"Не удалось проверить обновления {ext_id}: {reply.errorString()}")
+            self.done()
+            return
         
-        browser.setUrl(QUrl(url))
-        browser.urlChanged.connect(lambda q: self.update_urlbar(q) if browser == self.current_browser else None)
-        browser.titleChanged.connect(lambda title: self.update_tab_title(browser, title))
+        validators = {
+            "url": manifest["update_url"],
+            "etag": bytes(reply.rawHeader(b"ETag")).decode("latin-1"),
+            "last_modified": bytes(reply.rawHeader(b"Last-Modified")).decode("latin-1"),
+        }
+        try:
+            info = json.loads(bytes(reply.readAll()).decode("utf-8"))
+        except ValueError:
+            self.done()
+            return
         
-        index = self.tab_widget.addTab(browser, "Новая вкладка")
-        self.tab_widget.setCurrentIndex(index)
-        self.current_browser = browser
+        if parse_version(info.get("version", "0")) <= parse_version(manifest.get("version", "0")) or not info.get("url"):
+            self.state[ext_id] = validators
+            self.save_state()
+            self.done()
+            return
         
-        return browser
-    
-    def close_tab(self, index):
-        if self.tab_widget.count() > 1:
-            widget = self.tab_widget.widget(index)
-            self.tab_widget.removeTab(index)
-            widget.deleteLater()
+        package_reply = self.network.get(self.make_request(info["url"]))
+        self.replies.add(package_reply)
+        package_reply.finished.connect(
+            lambda reply=package_reply: self.package_finished(ext_id, info, validators, reply))
+
+    def package_finished(self, ext_id, info, validators, reply):
+        self.replies.discard(reply)
+        reply.deleteLater()
+        if reply.error() != QNetworkReply.NoError:
+            print(f"Не удалось скачать обновление {ext_id}: {reply.errorString()}")
+            self.done()
+            return
+        data = bytes(reply.readAll())
+        if info.get("sha256") and hashlib.sha256(data).hexdigest() != info["sha256"].lower():
+            print(f"Обновление {ext_id} не прошло проверку хэша")
+            self.done()
+            return
+        # Распаковка идёт в фоновом потоке
+        self.installs[ext_id] = (info.get("version", ""), validators)
+        self.pool.start(ExtensionInstallJob(self.file_store, ext_id, data, self.signals))
+
+    def install_finished(self, ext_id, success, error):
+        version, validators = self.installs.pop(ext_id)
+        if success:
+            # Валидаторы сохраняем только после установки, иначе обновление потеряется за 304
+            self.state[ext_id] = validators
+            self.save_state()
+            self.updated_count += 1
+            self.updated.emit(ext_id, version)
         else:
-            self.close()
-    
-    def tab_changed(self, index):
-        if index >= 0:
-            self.current_browser = self.tab_widget.widget(index)
-            if self.current_browser:
-                self.update_urlbar(self.current_browser.url())
-    
-    def update_tab_title(self, browser, title):
-        index = self.tab_widget.indexOf(browser)
-        if index >= 0:
-            # Truncate long titles
-            if len(title) > 20:
-                title = title[:20] + "..."
-            self.tab_widget.setTabText(index, title)
+            print(f"Не удалось установить обновление {ext_id}: {error}")
+        self.done()
 
-    def browser_back(self):
-        if self.current_browser:
-            self.current_browser.back()
+    def done(self):
+        self.pending -= 1
+        if self.pending == 0:
+            self.finished.emit(self.updated_count)
+
+def wrap_content_script(source, ext_id, token):
+    # Скрипт получает API расширения через параметр flykit, время выполнения и ошибки уходят в отчёт
+    return (f"(function (flykit) {{\n"
+            f"var started = performance.now();\n"
+            f"var failure = null;\n"
+            f"try {{\n"
+            f"(function (flykit) {{\n{source}\n}})(flykit);\n"
+            f"}} catch (e) {{\n"
+            f"failure = e;\n"
+            f"}}\n"
+            f"flykit.report(performance.now() - started, failure ? String(failure.stack || failure) : \"\");\n"
+            f"if (failure) {{\n"
+            f"throw failure;\n"
+            f"}}\n"
+            f"}})(window.__flykitExtension({json.dumps(ext_id)}, {json.dumps(token)}));")
+
+def extension_api_script(tokens):
+    qwebchannel_js = QFile(":/qtwebchannel/qwebchannel.js")
+    qwebchannel_js.open(QIODevice.ReadOnly)
+    source = bytes(qwebchannel_js.readAll()).decode("utf-8")
+    qwebchannel_js.close()
     
-    def browser_forward(self):
-        if self.current_browser:
-            self.current_browser.forward()
+    script = QWebEngineScript()
+    script.setName("flykit-extension-api")
+    script.setSourceCode(source + EXTENSION_API_JS.replace("__FLYKIT_TOKENS__", json.dumps(tokens)))
+    script.setInjectionPoint(QWebEngineScript.DocumentCreation)
+    script.setWorldId(EXTENSION_WORLD)
+    script.setRunsOnSubFrames(True)
+    return script
+
+def scan_extensions():
+    # Только чтение файлов, поэтому можно вызывать из фонового потока
+    extensions = []
+    disabled = set(load_settings().get("disabled_extensions", []))
     
-    def browser_reload(self):
-        if self.current_browser:
-            self.current_browser.reload()
+    for ext_name in os.listdir(EXTENSIONS_DIR):
+        ext_path = os.path.join(EXTENSIONS_DIR, ext_name)
+        if os.path.isdir(ext_path) and ext_name != "temp_extract" and ext_name not in disabled:
+            manifest_path = os.path.join(ext_path, "manifest.json")
+            if os.path.exists(manifest_path):
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+                
+                content_js_path = os.path.join(ext_path, "content.js")
+                if os.path.exists(content_js_path):
+                    with open(content_js_path, "r", encoding="utf-8") as f:
+                        content_js = f.read()
+                    extensions.append({"id": ext_name, "name": manifest.get("name", ext_name), "source": content_js})
+    return extensions
 
-    def handle_download(self, download):
-        file_path = download.path()
-        if file_path.endswith('.ebx'):
-            download.accept()
+def extension_content_scripts(bridge, extensions=None):
+    if extensions is None:
+        extensions = scan_extensions()
+    if not extensions:
+        return []
+    tokens = {extension["id"]: bridge.token_for(extension["id"]) for extension in extensions}
+    # Загрузчик API идёт первым и знает токены только этого набора расширений
+    scripts = [extension_api_script(tokens)]
+    for extension in extensions:
+        token = tokens[extension["id"]]
+        script = QWebEngineScript()
+        script.setName(extension["name"])
+        script.setSourceCode(wrap_content_script(extension["source"], extension["id"], token))
+        script.setInjectionPoint(QWebEngineScript.DocumentReady)
+        script.setWorldId(EXTENSION_WORLD)
+        script.setRunsOnSubFrames(True)
+        scripts.append(script)
+    return scripts
+
+class ExtensionRuntimeMonitor(QObject):
+    # Учёт времени выполнения content-скриптов по расширениям
+    over_budget = pyqtSignal(str)
+
+    def __init__(self, bridge, budget_ms=50, strikes=3, parent=None):
+        super().__init__(parent)
+        self.bridge = bridge
+        self.budget_ms = budget_ms
+        self.strikes = strikes
+        self.stats = {}
+
+    @pyqtSlot(str, str, float, str, str)
+    def report(self, extension, token, ms, error, host):
+        # Отчёт принимается только от владельца токена и с правдоподобным временем
+        if not self.bridge.check(extension, token) or not 0 <= ms < 3600 * 1000:
+            return
+        stats = self.stats.setdefault(extension, {
+            "runs": 0, "total_ms": 0.0, "max_ms": 0.0, "errors": 0,
+            "last_error": "", "slow_runs": 0, "slow_streak": 0, "slow_hosts": {},
+        })
+        stats["runs"] += 1
+        stats["total_ms"] += ms
+        stats["max_ms"] = max(stats["max_ms"], ms)
+        if error:
+            stats["errors"] += 1
+            stats["last_error"] = error.splitlines()[0][:200]
+        if ms > self.budget_ms:
+            stats["slow_runs"] += 1
+            stats["slow_streak"] += 1
+            stats["slow_hosts"][host] = stats["slow_hosts"].get(host, 0) + 1
+            # Считаются только медленные загрузки подряд; после сигнала счёт начинается заново
+            if stats["slow_streak"] >= self.strikes:
+                stats["slow_streak"] = 0
+                self.over_budget.emit(extension)
+        else:
+            stats["slow_streak"] = 0
+
+    def reset(self, extension):
+        if extension in self.stats:
+            self.stats[extension]["slow_streak"] = 0
+
+    def summary(self, extension):
+        stats = self.stats.get(extension)
+        if not stats or not stats["runs"]:
+            return ""
+        average = stats["total_ms"] / stats["runs"]
+        text = f"{average:.1f} мс/стр, макс. {stats['max_ms']:.0f} мс"
+        if stats["errors"]:
+            text += f", ошибок: {stats['errors']}"
+        return text
+
+class ExtensionStorage(QObject):
+    # Хранилище ключ-значение для расширений; записи копятся и пишутся пачкой
+    changed = pyqtSignal(str, str)
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS storage (
+                extension TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (extension, key)
+            ) WITHOUT ROWID
+        """)
+        self.db.commit()
+        self.pending = {}
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(250)
+        self.flush_timer.timeout.connect(self.flush)
+        QApplication.instance().aboutToQuit.connect(self.flush)
+
+    def get(self, extension, keys=None):
+        result = {}
+        if keys is None:
+            for key, value in self.db.execute("SELECT key, value FROM storage WHERE extension = ?", (extension,)):
+                result[key] = value
+            for (ext, key), value in self.pending.items():
+                if ext == extension:
+                    if value is None:
+                        result.pop(key, None)
+                    else:
+                        result[key] = value
+            return result
+        
+        missing = []
+        for key in keys:
+            if (extension, key) in self.pending:
+                if self.pending[(extension, key)] is not None:
+                    result[key] = self.pending[(extension, key)]
+            else:
+                missing.append(key)
+        # SQLite ограничивает число параметров в запросе
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            query = f"SELECT key, value FROM storage WHERE extension = ? AND key IN ({','.join('?' * len(chunk))})"
+            for key, value in self.db.execute(query, [extension] + chunk):
+                result[key] = value
+        return result
+
+    def set(self, extension, items):
+        for key, value in items.items():
+            self.pending[(extension, key)] = value
+        self.schedule_flush()
+        # Значения уже в JSON, вставляем их как есть
+        self.changed.emit(extension, "{" + ", ".join(f'{json.dumps(key)}: {{"newValue": {value}}}' for key, value in items.items()) + "}")
+
+    def remove(self, extension, keys):
+        for key in keys:
+            self.pending[(extension, key)] = None
+        self.schedule_flush()
+        self.changed.emit(extension, json.dumps({key: {"newValue": None} for key in keys}))
+
+    def clear(self, extension):
+        self.flush()
+        with self.db:
+            self.db.execute("DELETE FROM storage WHERE extension = ?", (extension,))
+
+    def schedule_flush(self):
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush(self):
+        if not self.pending:
+            return
+        pending = self.pending
+        self.pending = {}
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO storage (extension, key, value) VALUES (?, ?, ?)",
+                                [(ext, key, value) for (ext, key), value in pending.items() if value is not None])
+            self.db.executemany("DELETE FROM storage WHERE extension = ? AND key = ?",
+                                [(ext, key) for (ext, key), value in pending.items() if value is None])
+
+class ExtensionEvents(QObject):
+    # Изменения хранилища одного расширения
+    changed = pyqtSignal(str)
+
+class ExtensionStorageBridge(QObject):
+    # Объект QWebChannel; значения передаются в JSON, чтобы не гонять мелкие сообщения
+    def __init__(self, storage, parent=None):
+        super().__init__(parent)
+        self.storage = storage
+        self.tokens = {}
+        self.events = {}
+        self.channels = []
+        storage.changed.connect(self.storage_changed)
+
+    def attach(self, channel):
+        self.channels.append(channel)
+        channel.registerObject("extensionStorage", self)
+        for extension, events in self.events.items():
+            channel.registerObject("extensionEvents:" + extension, events)
+
+    def token_for(self, extension):
+        if extension not in self.tokens:
+            self.tokens[extension] = secrets.token_hex(16)
+            self.events[extension] = ExtensionEvents(self)
+            for channel in self.channels:
+                channel.registerObject("extensionEvents:" + extension, self.events[extension])
+        return self.tokens[extension]
+
+    def storage_changed(self, extension, changes):
+        if extension in self.events:
+            self.events[extension].changed.emit(changes)
+
+    def check(self, extension, token):
+        return extension in self.tokens and secrets.compare_digest(self.tokens[extension], token)
+
+    @pyqtSlot(str, str, str, result=str)
+    def get(self, extension, token, keys_json):
+        if not self.check(extension, token):
+            return "{}"
+        keys = json.loads(keys_json)
+        values = self.storage.get(extension, keys)
+        return json.dumps({key: json.loads(value) for key, value in values.items()})
+
+    @pyqtSlot(str, str, str)
+    def set(self, extension, token, items_json):
+        if self.check(extension, token):
+            items = json.loads(items_json)
+            self.storage.set(extension, {key: json.dumps(value) for key, value in items.items()})
+
+    @pyqtSlot(str, str, str)
+    def remove(self, extension, token, keys_json):
+        if self.check(extension, token):
+            self.storage.remove(extension, json.loads(keys_json))
+
+OFFLINE_DIR = os.path.join(CACHE_DIR, "offline")
+
+class OfflineStore(QObject):
+    # Снимки страниц в MHTML с лимитом размера и вытеснением давно не открывавшихся
+    saved = pyqtSignal(str)
+
+    REFRESH_TIMEOUT_MS = 60000
+
+    def __init__(self, profile, budget_mb=200, refresh_hours=12, parent=None):
+        super().__init__(parent)
+        self.profile = profile
+        self.budget = budget_mb * 1024 * 1024
+        self.refresh_age = refresh_hours * 3600
+        self.index_path = os.path.join(OFFLINE_DIR, "index.json")
+        self.pending = {}
+        self.queue = []
+        self.refresh_page = None
+        os.makedirs(OFFLINE_DIR, exist_ok=True)
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+        profile.downloadRequested.connect(self.download_requested)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(30 * 60 * 1000)
+        self.refresh_timer.timeout.connect(self.refresh_stale)
+        self.refresh_timer.start()
+
+        # Страница не загрузилась или сохранение так и не началось — переходим к следующей
+        self.refresh_watchdog = QTimer(self)
+        self.refresh_watchdog.setSingleShot(True)
+        self.refresh_watchdog.setInterval(self.REFRESH_TIMEOUT_MS)
+        self.refresh_watchdog.timeout.connect(self.refresh_expired)
+
+    def path_for(self, url):
+        return os.path.join(OFFLINE_DIR, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".mhtml")
+
+    def save_index(self):
+        try:
+            write_json_atomic(self.index_path, self.index)
+        except OSError as e:
+            print(f"Не удалось сохранить индекс офлайн-страниц: {e}")
+
+    def is_kept(self, url):
+        return url in self.index and os.path.exists(self.path_for(url))
+
+    def snapshot_url(self, url):
+        self.index[url]["used"] = time.time()
+        self.save_index()
+        return QUrl.fromLocalFile(self.path_for(url))
+
+    def keep(self, page, url, title=""):
+        temp_path = self.path_for(url) + ".part"
+        self.pending[temp_path] = (url, title, page)
+        page.save(temp_path, QWebEngineDownloadItem.MimeHtmlSaveFormat)
+
+    def download_requested(self, download):
+        if download.path() not in self.pending:
+            return
+        download.accept()
+        download.finished.connect(lambda: self.save_finished(download))
+
+    def save_finished(self, download):
+        temp_path = download.path()
+        if temp_path not in self.pending:
+            # Сохранение уже списано по таймауту
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        url, title, page = self.pending.pop(temp_path)
+        if download.state() == QWebEngineDownloadItem.DownloadCompleted and os.path.exists(temp_path):
+            os.replace(temp_path, self.path_for(url))
+            previous = self.index.get(url, {})
+            self.index[url] = {
+                "title": title or previous.get("title", ""),
+                "size": os.path.getsize(self.path_for(url)),
+                "saved": time.time(),
+                "used": previous.get("used", time.time()),
+            }
+            self.evict()
+            self.save_index()
+            self.saved.emit(url)
+        elif os.path.exists(temp_path):
+            os.remove(temp_path)
+        if page is self.refresh_page:
+            self.refresh_next()
+
+    def remove(self, url):
+        self.index.pop(url, None)
+        try:
+            os.remove(self.path_for(url))
+        except OSError:
+            pass
+        self.save_index()
+
+    def evict(self):
+        total = sum(entry["size"] for entry in self.index.values())
+        for url in sorted(self.index, key=lambda url: self.index[url]["used"]):
+            if total <= self.budget:
+                break
+            total -= self.index[url]["size"]
+            self.index.pop(url)
+            try:
+                os.remove(self.path_for(url))
+            except OSError:
+                pass
+
+    def refresh_stale(self):
+        if self.refresh_page is not None:
+            return
+        now = time.time()
+        self.queue = [url for url, entry in self.index.items() if now - entry["saved"] > self.refresh_age]
+        self.refresh_next()
+
+    def refresh_next(self):
+        # Обновляем снимки по одному в скрытой странице
+        if self.refresh_page is not None:
+            self.refresh_page.deleteLater()
+            self.refresh_page = None
+        if not self.queue:
+            self.refresh_watchdog.stop()
+            return
+        url = self.queue.pop(0)
+        page = QWebEnginePage(self.profile, self)
+        page.loadFinished.connect(lambda ok: self.refresh_loaded(page, url, ok))
+        self.refresh_page = page
+        self.refresh_watchdog.start()
+        page.load(QUrl(url))
+
+    def refresh_expired(self):
+        for temp_path, (url, title, page) in list(self.pending.items()):
+            if page is self.refresh_page:
+                del self.pending[temp_path]
+        self.refresh_next()
+
+    def refresh_loaded(self, page, url, ok):
+        if page is not self.refresh_page:
+            return
+        if ok and url in self.index:
+            self.keep(page, url, page.title())
+        else:
+            self.refresh_next()
+
+class FilterRuleSet:
+    # Правила одного вида (блокировка или исключения), разложенные по индексам
+    MIN_EDGE = 3
+    CACHE_LIMIT = 50000
+
+    def __init__(self):
+        # Литерал, совпадающий с токеном URL целиком
+        self.tokens = {}
+        # Литерал, которым токен URL начинается, заканчивается или который он просто содержит
+        self.prefixes = {}
+        self.suffixes = {}
+        self.contains = {}
+        # Правила с domain= и правила без литералов
+        self.domains = {}
+        self.fallback = []
+        self.groups = None
+        self.heads = None
+        # Токены URL часто повторяются: для каждого запоминаем подходящие корзины,
+        # а токены без правил держим отдельным множеством, чтобы отсекать их одной операцией
+        self.cache = {}
+        self.empty = set()
+
+    def index(self, kind):
+        return {"token": self.tokens, "prefix": self.prefixes, "suffix": self.suffixes,
+                "contains": self.contains}[kind]
+
+    def add(self, rule, kind, token):
+        # domain= отсекает сильнее любого токена
+        if rule[3]:
+            for domain in rule[3]:
+                self.domains.setdefault(domain, []).append(rule)
+        elif kind is not None:
+            self.index(kind).setdefault(token, []).append(rule)
+        else:
+            self.fallback.append(rule)
+        self.groups = None
+        self.heads = None
+        self.cache = {}
+        self.empty = set()
+
+    def literal_heads(self):
+        # По трём символам — длины начал и концов и сами вложенные литералы, которые стоит проверить
+        if self.heads is None:
+            prefix_heads = {}
+            suffix_heads = {}
+            contains_heads = {}
+            for token in self.prefixes:
+                prefix_heads.setdefault(token[:self.MIN_EDGE], set()).add(len(token))
+            for token in self.suffixes:
+                suffix_heads.setdefault(token[-self.MIN_EDGE:], set()).add(len(token))
+            for token in self.contains:
+                contains_heads.setdefault(token[:self.MIN_EDGE], []).append(token)
+            self.heads = ({head: sorted(lengths) for head, lengths in prefix_heads.items()},
+                          {head: sorted(lengths) for head, lengths in suffix_heads.items()},
+                          contains_heads)
+        return self.heads
+
+    def buckets_for(self, token):
+        buckets = []
+        if token in self.tokens:
+            buckets.append(self.tokens[token])
+        if len(token) >= self.MIN_EDGE:
+            prefix_heads, suffix_heads, contains_heads = self.literal_heads()
+            for length in prefix_heads.get(token[:self.MIN_EDGE], ()):
+                if length <= len(token) and token[:length] in self.prefixes:
+                    buckets.append(self.prefixes[token[:length]])
+            for length in suffix_heads.get(token[-self.MIN_EDGE:], ()):
+                if length <= len(token) and token[-length:] in self.suffixes:
+                    buckets.append(self.suffixes[token[-length:]])
+            if contains_heads:
+                found = set()
+                for start in range(len(token) - self.MIN_EDGE + 1):
+                    for literal in contains_heads.get(token[start:start + self.MIN_EDGE], ()):
+                        if literal not in found and token.startswith(literal, start):
+                            found.add(literal)
+                            buckets.append(self.contains[literal])
+        if len(self.cache) + len(self.empty) >= self.CACHE_LIMIT:
+            self.cache = {}
+            self.empty = set()
+        if buckets:
+            self.cache[token] = buckets
+        else:
+            self.empty.add(token)
+        return buckets
+
+    def to_data(self):
+        return {"tokens": self.tokens, "prefixes": self.prefixes, "suffixes": self.suffixes,
+                "contains": self.contains, "domains": self.domains, "fallback": self.fallback}
+
+    @classmethod
+    def from_data(cls, data):
+        rules = cls()
+        rules.tokens = data["tokens"]
+        rules.prefixes = data["prefixes"]
+        rules.suffixes = data["suffixes"]
+        rules.contains = data["contains"]
+        rules.domains = data["domains"]
+        rules.fallback = data["fallback"]
+        return rules
+
+class ContentFilter:
+    # Компилированный движок блокировки в формате EasyList
+    FORMAT_VERSION = 3
+    TOKEN_RE = re.compile(r"[a-z0-9%]{2,}")
+    BAD_TOKENS = {"http", "https", "www", "com", "js", "html", "net", "org", "ru"}
+    RESOURCE_TYPES = {"script", "image", "stylesheet", "object", "xmlhttprequest", "subdocument",
+                      "font", "media", "ping", "websocket", "other"}
+    SEPARATOR = r"(?:[^a-z0-9_.%-]|$)"
+    # Правило без *, ^ и якорей — обычная подстрока, её быстрее искать через in
+    PLAIN_SOURCE = re.compile(r"(?:\\.|[^\\.^$*+?{}\[\]|()])*")
+    KIND_RANK = {"token": 0, "prefix": 1, "suffix": 1, "contains": 2}
+
+    def __init__(self, suffixes=None):
+        self.blocked_domains = set()
+        self.allowed_domains = set()
+        self.block = FilterRuleSet()
+        self.allow = FilterRuleSet()
+        self.rule_count = 0
+        self.suffixes = suffixes or PublicSuffixIndex.builtin()
+        self._compiled = {}
+        self._hosts = {}
+
+    def set_suffixes(self, suffixes):
+        # Полный список публичных суффиксов приходит позже правил
+        self.suffixes = suffixes
+        self._hosts = {}
+
+    def to_data(self):
+        return {
+            "version": self.FORMAT_VERSION,
+            "blocked_domains": sorted(self.blocked_domains),
+            "allowed_domains": sorted(self.allowed_domains),
+            "block": self.block.to_data(),
+            "allow": self.allow.to_data(),
+            "rule_count": self.rule_count,
+        }
+
+    @classmethod
+    def from_data(cls, data):
+        if data.get("version") != cls.FORMAT_VERSION:
+            raise ValueError("unsupported filter cache version")
+        engine = cls()
+        engine.blocked_domains = set(data["blocked_domains"])
+        engine.allowed_domains = set(data["allowed_domains"])
+        engine.block = FilterRuleSet.from_data(data["block"])
+        engine.allow = FilterRuleSet.from_data(data["allow"])
+        engine.rule_count = data["rule_count"]
+        return engine
+
+    @classmethod
+    def load(cls, paths):
+        key = hashlib.sha1(str(cls.FORMAT_VERSION).encode())
+        for path in sorted(paths):
+            stat = os.stat(path)
+            key.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+        cache_name = f"filters-{key.hexdigest()[:16]}.json"
+        cache_path = os.path.join(CACHE_DIR, cache_name)
+
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    return cls.from_data(json.load(f))
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+
+        engine = cls()
+        lines = []
+        for path in paths:
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                lines.extend(f)
+        engine.add_rules(lines)
+
+        # Убираем устаревшие скомпилированные списки
+        for name in os.listdir(CACHE_DIR):
+            if name.startswith("filters-") and name != cache_name:
+                try:
+                    os.remove(os.path.join(CACHE_DIR, name))
+                except OSError:
+                    pass
+        try:
+            # Наборы типов и доменов сохраняются списками
+            write_json_atomic(cache_path, engine.to_data(), separators=(",", ":"), default=sorted)
+        except OSError:
+            pass
+        return engine
+
+    def add_rules(self, lines):
+        # Сначала частоты токенов по всему списку, чтобы каждое правило попало в корзину самого редкого
+        token_counts = Counter()
+        for line in lines:
+            token_counts.update(set(self.TOKEN_RE.findall(line.lower())))
+        for line in lines:
+            self.add_rule(line, token_counts)
+
+    def add_rule(self, line, token_counts=None):
+        line = line.strip()
+        if not line or line.startswith(("!", "[")) or "##" in line or "#@#" in line or "#?#" in line:
+            return False
+
+        exception = line.startswith("@@")
+        if exception:
+            line = line[2:]
+
+        options = None
+        dollar = line.rfind("$")
+        if dollar > 0 and not line.endswith("/"):
+            options = self._parse_options(line[dollar + 1:])
+            if options is None:
+                return False
+            line = line[:dollar]
+        if not line:
+            return False
+
+        pattern = line.lower()
+        if options is None and pattern.startswith("||") and pattern.endswith("^"):
+            domain = pattern[2:-1]
+            if domain and all(c.isalnum() or c in ".-" for c in domain):
+                (self.allowed_domains if exception else self.blocked_domains).add(domain)
+                self.rule_count += 1
+                return True
+
+        types, third_party, include, exclude = options or (None, None, None, None)
+        rule = (self._pattern_to_regex(line), types, third_party, include, exclude)
+        rules = self.allow if exception else self.block
+        rules.add(rule, *self._pick_token(pattern, rules, token_counts))
+        self.rule_count += 1
+        return True
+
+    def _parse_options(self, text):
+        types = set()
+        excluded_types = set()
+        third_party = None
+        include = set()
+        exclude = set()
+        for option in text.lower().split(","):
+            option = option.strip()
+            negated = option.startswith("~")
+            name = option[1:] if negated else option
+            if name in self.RESOURCE_TYPES:
+                (excluded_types if negated else types).add(name)
+            elif name in ("third-party", "3p"):
+                third_party = not negated
+            elif name in ("first-party", "1p"):
+                third_party = negated
+            elif name.startswith("domain="):
+                for domain in name[7:].split("|"):
+                    if domain.startswith("~"):
+                        exclude.add(domain[1:])
+                    elif domain:
+                        include.add(domain)
+            elif name in ("match-case", "important"):
+                continue
+            else:
+                # Неизвестные опции (popup, csp, redirect...) не поддерживаем
+                return None
+        if excluded_types and not types:
+            types = self.RESOURCE_TYPES - excluded_types
+        return (frozenset(types) or None, third_party,
+                frozenset(include) or None, frozenset(exclude) or None)
+
+    def _pattern_to_regex(self, pattern):
+        if len(pattern) > 2 and pattern.startswith("/") and pattern.endswith("/"):
+            # Тело регулярного выражения не переводим в нижний регистр: \D и \W превратились бы в \d и \w
+            return f"(?i:{pattern[1:-1]})"
+        pattern = pattern.lower()
+        prefix = ""
+        suffix = ""
+        if pattern.startswith("||"):
+            prefix = r"^[a-z][a-z0-9+.-]*://(?:[^/?#]*\.)?"
+            pattern = pattern[2:]
+        elif pattern.startswith("|"):
+            prefix = "^"
+            pattern = pattern[1:]
+        if pattern.endswith("|"):
+            suffix = "$"
+            pattern = pattern[:-1]
+        body = re.escape(pattern).replace(r"\*", ".*").replace(r"\^", self.SEPARATOR)
+        return prefix + body + suffix
+
+    def _pick_token(self, pattern, rules, token_counts=None):
+        # Из подходящих литералов берём самый точный, а среди них самый редкий:
+        # по частотам всего списка или по уже заполненным корзинам
+        if len(pattern) > 2 and pattern.startswith("/") and pattern.endswith("/"):
+            candidates = self._regex_tokens(pattern[1:-1])
+        else:
+            candidates = self._pattern_tokens(pattern)
+        best = None
+        for kind, token in candidates:
+            if token in self.BAD_TOKENS or (kind != "token" and len(token) < FilterRuleSet.MIN_EDGE):
+                continue
+            if token_counts is not None:
+                count = token_counts[token]
+            else:
+                count = len(rules.index(kind).get(token, ()))
+            cost = (self.KIND_RANK[kind], count, -len(token))
+            if best is None or cost < best[0]:
+                best = (cost, kind, token)
+        if best is None:
+            return None, None
+        return best[1], best[2]
+
+    @staticmethod
+    def _literal_kind(left, right):
+        # Известна ли граница токена URL слева и справа от литерала
+        if left and right:
+            return "token"
+        if left:
+            return "prefix"
+        if right:
+            return "suffix"
+        return "contains"
+
+    def _pattern_tokens(self, pattern):
+        candidates = []
+        for match in self.TOKEN_RE.finditer(pattern):
+            start, end = match.span()
+            left = start > 0 and pattern[start - 1] != "*"
+            right = end < len(pattern) and pattern[end] != "*"
+            candidates.append((self._literal_kind(left, right), match.group()))
+        return candidates
+
+    def _regex_tokens(self, source):
+        # Обязательные литералы регулярного выражения. None — символ, про который ничего не известно
+        items = []
+        depth = 0
+        i = 0
+        while i < len(source):
+            char = source[i]
+            i += 1
+            if char == "\\" and i < len(source):
+                escaped = source[i]
+                i += 1
+                # \d, \w, \b и обратные ссылки — не литералы
+                items.append(None if escaped.isalnum() or depth else escaped)
+            elif char == "[":
+                # Класс символов пропускаем целиком
+                if i < len(source) and source[i] == "^":
+                    i += 1
+                if i < len(source) and source[i] == "]":
+                    i += 1
+                while i < len(source) and source[i] != "]":
+                    i += 2 if source[i] == "\\" else 1
+                i += 1
+                items.append(None)
+            elif char == "|" and depth == 0:
+                # Альтернатива верхнего уровня: обязательных литералов нет
+                return []
+            elif char in "?*{":
+                # Предыдущий символ может отсутствовать
+                if items:
+                    items[-1] = None
+                if char == "{":
+                    close = source.find("}", i)
+                    i = len(source) if close < 0 else close + 1
+                items.append(None)
+            elif char in "+.()|":
+                depth += {"(": 1, ")": -1}.get(char, 0)
+                items.append(None)
+            elif char == "^" and not items:
+                items.append("^")
+            elif char == "$" and i == len(source):
+                items.append("$")
+            else:
+                items.append(None if depth else char)
+
+        candidates = []
+        run = ""
+        left = False
+        for item in items + [None]:
+            if item is not None and (item.isascii() and item.isalnum() or item == "%"):
+                run += item
+                continue
+            if len(run) >= 2:
+                candidates.append((self._literal_kind(left, item is not None), run))
+            run = ""
+            left = item is not None
+        return candidates
+
+    def _matcher(self, source):
+        # Функция поиска правила в адресе: возвращает истину, если правило совпало
+        search = self._compiled.get(source)
+        if search is None:
+            if self.PLAIN_SOURCE.fullmatch(source):
+                literal = re.sub(r"\\(.)", r"\1", source)
+                search = lambda url: literal in url
+            else:
+                try:
+                    search = re.compile(source).search
+                except re.error:
+                    search = lambda url: False
+                else:
+                    if source.startswith(self.SEPARATOR):
+                        search = self._separator_matcher(source, search)
+            self._compiled[source] = search
+        return search
+
+    def _separator_matcher(self, source, search):
+        # «^слово...»: движок не может пропустить позиции без литерала, поэтому начинаем с его первого вхождения
+        prefix = self.PLAIN_SOURCE.match(source, len(self.SEPARATOR)).group()
+        literal = re.sub(r"\\(.)", r"\1", prefix)
+        if len(literal) < 2:
+            return search
+
+        def separator_search(url):
+            start = url.find(literal)
+            return start >= 0 and search(url, max(start - 1, 0))
+        return separator_search
+
+    def _groups(self, rules):
+        # Общие правила с одинаковыми опциями проверяются одним регулярным выражением
+        if rules.groups is not None:
+            return rules.groups
+        grouped = {}
+        for source, types, third_party, include, exclude in rules.fallback:
+            key = (tuple(sorted(types)) if types else None, third_party, tuple(sorted(exclude)) if exclude else None)
+            grouped.setdefault(key, []).append(source)
+        rules.groups = []
+        for (types, third_party, exclude), sources in grouped.items():
+            try:
+                matchers = [re.compile("|".join(f"(?:{source})" for source in sources)).search]
+            except re.error:
+                matchers = [self._matcher(source) for source in sources]
+            rules.groups.append((frozenset(types) if types else None, third_party,
+                                 frozenset(exclude) if exclude else None, matchers))
+        return rules.groups
+
+    @staticmethod
+    def _parent_domains(host):
+        domains = set()
+        while host:
+            domains.add(host)
+            host = host.partition(".")[2]
+        return frozenset(domains)
+
+    def _host_info(self, host):
+        # Страница шлёт десятки запросов с одних и тех же хостов
+        info = self._hosts.get(host)
+        if info is None:
+            if len(self._hosts) >= FilterRuleSet.CACHE_LIMIT:
+                self._hosts = {}
+            info = self._hosts[host] = (self._base_domain(host), self._parent_domains(host))
+        return info
+
+    def _base_domain(self, host):
+        return self.suffixes.registrable_domain(host)
+
+    def _rule_matches(self, rule, url, resource_type, third_party, source_domains):
+        return self._match_bucket((rule,), url, resource_type, third_party, source_domains)
+
+    def _match_bucket(self, bucket, url, resource_type, third_party, source_domains):
+        # Горячий цикл: проверки опций встроены, поиск по адресу — последним
+        compiled = self._compiled
+        for source, types, rule_third_party, include, exclude in bucket:
+            if types is not None and resource_type not in types:
+                continue
+            if rule_third_party is not None and rule_third_party != third_party:
+                continue
+            if include is not None and source_domains.isdisjoint(include):
+                continue
+            if exclude is not None and not source_domains.isdisjoint(exclude):
+                continue
+            search = compiled.get(source) or self._matcher(source)
+            if search(url):
+                return True
+        return False
+
+    def _match(self, rules, tokens, url, resource_type, third_party, source_domains):
+        cache = rules.cache
+        for token in tokens - rules.empty:
+            buckets = cache.get(token)
+            if buckets is None:
+                buckets = rules.buckets_for(token)
+            for bucket in buckets:
+                if self._match_bucket(bucket, url, resource_type, third_party, source_domains):
+                    return True
+
+        if rules.domains:
+            for domain in source_domains:
+                bucket = rules.domains.get(domain)
+                if bucket and self._match_bucket(bucket, url, resource_type, third_party, source_domains):
+                    return True
+
+        for types, rule_third_party, exclude, matchers in self._groups(rules):
+            if types is not None and resource_type not in types:
+                continue
+            if rule_third_party is not None and rule_third_party != third_party:
+                continue
+            if exclude is not None and not source_domains.isdisjoint(exclude):
+                continue
+            for search in matchers:
+                if search(url):
+                    return True
+        return False
+
+    def should_block(self, url, host, source_host="", resource_type="other"):
+        url = url.lower()
+        host = host.lower()
+        source_host = source_host.lower()
+        base_domain, host_domains = self._host_info(host)
+        source_base_domain, source_domains = self._host_info(source_host)
+        third_party = bool(source_host) and base_domain != source_base_domain
+
+        blocked = not host_domains.isdisjoint(self.blocked_domains)
+        tokens = None
+        if not blocked:
+            tokens = set(self.TOKEN_RE.findall(url))
+            blocked = self._match(self.block, tokens, url, resource_type, third_party, source_domains)
+        if not blocked:
+            return False
+
+        if not host_domains.isdisjoint(self.allowed_domains):
+            return False
+        if tokens is None:
+            tokens = set(self.TOKEN_RE.findall(url))
+        return not self._match(self.allow, tokens, url, resource_type, third_party, source_domains)
+
+REQUEST_TYPES = {
+    QWebEngineUrlRequestInfo.ResourceTypeMainFrame: "document",
+    QWebEngineUrlRequestInfo.ResourceTypeSubFrame: "subdocument",
+    QWebEngineUrlRequestInfo.ResourceTypeStylesheet: "stylesheet",
+    QWebEngineUrlRequestInfo.ResourceTypeScript: "script",
+    QWebEngineUrlRequestInfo.ResourceTypeImage: "image",
+    QWebEngineUrlRequestInfo.ResourceTypeFontResource: "font",
+    QWebEngineUrlRequestInfo.ResourceTypeObject: "object",
+    QWebEngineUrlRequestInfo.ResourceTypeMedia: "media",
+    QWebEngineUrlRequestInfo.ResourceTypeFavicon: "image",
+    QWebEngineUrlRequestInfo.ResourceTypeXhr: "xmlhttprequest",
+    QWebEngineUrlRequestInfo.ResourceTypePing: "ping",
+    QWebEngineUrlRequestInfo.ResourceTypePluginResource: "object",
+}
+
+class RequestInterceptorChain(QWebEngineUrlRequestInterceptor):
+    # Единственный перехватчик профиля: фильтры решают судьбу запроса, наблюдатели видят итог
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.filters = []
+        self.observers = []
+
+    def interceptRequest(self, info):
+        blocked = False
+        for request_filter in self.filters:
+            if request_filter(info):
+                info.block(True)
+                blocked = True
+                break
+        for observer in self.observers:
+            observer(info, blocked)
+
+class AdBlockFilter:
+    def __init__(self, content_filter):
+        self.content_filter = content_filter
+        self.blocked_count = 0
+
+    def __call__(self, info):
+        resource_type = info.resourceType()
+        # Саму страницу не блокируем, только её ресурсы
+        if resource_type == QWebEngineUrlRequestInfo.ResourceTypeMainFrame:
+            return False
+        url = info.requestUrl()
+        if url.scheme() not in ("http", "https", "ws", "wss"):
+            return False
+        if self.content_filter.should_block(url.toString(), url.host(), info.firstPartyUrl().host(),
+                                            REQUEST_TYPES.get(resource_type, "other")):
+            self.blocked_count += 1
+            return True
+        return False
+
+class TabSearchIndex:
+    # Триграммный индекс по заголовкам и адресам вкладок
+    def __init__(self):
+        self.entries = {}
+        self.trigrams = {}
+
+    @staticmethod
+    def _trigrams(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def update(self, key, title=None, url=None):
+        old_title, old_url, old_text = self.entries.get(key, ("", "", ""))
+        title = old_title if title is None else title
+        url = old_url if url is None else url
+        text = f"{title} {url}".lower()
+        if key in self.entries and text == old_text:
+            return
+        old_grams = self._trigrams(old_text)
+        new_grams = self._trigrams(text)
+        for gram in old_grams - new_grams:
+            keys = self.trigrams.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.trigrams[gram]
+        for gram in new_grams - old_grams:
+            self.trigrams.setdefault(gram, set()).add(key)
+        self.entries[key] = (title, url, text)
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for gram in self._trigrams(entry[2]):
+            keys = self.trigrams.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.trigrams[gram]
+
+    @staticmethod
+    def _fuzzy_score(word, text):
+        pos = text.find(word)
+        if pos >= 0:
+            return 1000 - min(pos, 500)
+        score = 0
+        prev = -2
+        i = 0
+        for ch in word:
+            i = text.find(ch, i)
+            if i < 0:
+                return 0
+            score += 10 if i == prev + 1 else 1
+            prev = i
+            i += 1
+        return score
+
+    def search(self, query, limit=50):
+        words = query.lower().split()
+        if not words:
+            return list(self.entries)[:limit]
+
+        # Сначала вкладки, у которых совпадает больше всего триграмм
+        hits = {}
+        for word in words:
+            for gram in self._trigrams(word):
+                for key in self.trigrams.get(gram, ()):
+                    hits[key] = hits.get(key, 0) + 1
+        candidates = sorted(hits, key=hits.get, reverse=True)
+        if len(candidates) < limit:
+            seen = set(candidates)
+            candidates.extend(key for key in self.entries if key not in seen)
+
+        results = []
+        for key in candidates:
+            text = self.entries[key][2]
+            total = 0
+            for word in words:
+                score = self._fuzzy_score(word, text)
+                if not score:
+                    break
+                total += score
+            else:
+                results.append((total + hits.get(key, 0), key))
+        results.sort(key=lambda item: item[0], reverse=True)
+        return [key for score, key in results[:limit]]
+
+    def entry(self, key):
+        title, url, text = self.entries[key]
+        return title, url
+
+class TabSwitcherDialog(QDialog):
+    def __init__(self, browser, parent=None):
+        super().__init__(parent)
+        self.browser = browser
+        self.setWindowTitle("Поиск вкладок")
+        self.setWindowFlags(Qt.FramelessWindowHint | Qt.Dialog)
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.setFixedSize(620, 460)
+        
+        container = QWidget(self)
+        container.setGeometry(10, 10, 600, 440)
+        container.setStyleSheet("""
+            QWidget {
+                background-color: white;
+                border-radius: 16px;
+            }
+        """)
+        
+        shadow = QGraphicsDropShadowEffect()
+        shadow.setBlurRadius(30)
+        shadow.setXOffset(0)
+        shadow.setYOffset(4)
+        shadow.setColor(QColor(0, 0, 0, 60))
+        container.setGraphicsEffect(shadow)
+        
+        layout = QVBoxLayout(container)
+        layout.setContentsMargins(24, 24, 24, 24)
+        layout.setSpacing(16)
+        
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Поиск по вкладкам")
+        self.search_input.setMinimumHeight(44)
+        self.search_input.setStyleSheet("""
+            QLineEdit {
+                border: 2px solid #1a73e8;
+                border-radius: 22px;
+                padding: 0px 19px;
+                background-color: white;
+                font-size: 14px;
+                color: #202124;
+                font-family: 'Segoe UI', Arial, sans-serif;
+                selection-background-color: #d2e3fc;
+            }
+        """)
+        self.search_input.textChanged.connect(self.update_results)
+        self.search_input.returnPressed.connect(self.activate_current)
+        layout.addWidget(self.search_input)
+        
+        self.results_list = QListWidget()
+        self.results_list.setStyleSheet("""
+            QListWidget {
+                border: none;
+                background-color: white;
+                outline: none;
+            }
+            QListWidget::item {
+                padding: 10px 16px;
+                border-radius: 8px;
+                color: #202124;
+                font-size: 13px;
+                font-family: 'Segoe UI', Arial, sans-serif;
+            }
+            QListWidget::item:hover {
+                background-color: #f8f9fa;
+            }
+            QListWidget::item:selected {
+                background-color: #e8f0fe;
+                color: #1a73e8;
+            }
+        """)
+        self.results_list.itemActivated.connect(self.activate_current)
+        layout.addWidget(self.results_list)
+        
+        self.result_keys = []
+        self.update_results("")
+        self.search_input.setFocus()
+    
+    def update_results(self, text):
+        self.results_list.clear()
+        self.result_keys = self.browser.tab_search_index.search(text)
+        for key in self.result_keys:
+            title, url = self.browser.tab_search_index.entry(key)
+            self.results_list.addItem(f"{title or 'Новая вкладка'}\n{url}")
+        if self.result_keys:
+            self.results_list.setCurrentRow(0)
+    
+    def keyPressEvent(self, event):
+        if event.key() in (Qt.Key_Down, Qt.Key_Up):
+            self.results_list.keyPressEvent(event)
+        else:
+            super().keyPressEvent(event)
+    
+    def activate_current(self, *args):
+        row = self.results_list.currentRow()
+        if 0 <= row < len(self.result_keys):
+            self.browser.switch_to_tab(self.browser.tab_index(self.result_keys[row]))
+            self.accept()
+
+class PageTextJob(QRunnable):
+    def __init__(self, index, key, version, text):
+        super().__init__()
+        self.index = index
+        self.key = key
+        self.version = version
+        self.text = text
+
+    def run(self):
+        self.index.add(self.key, self.version, self.text)
+
+class PageTextIndex(QObject):
+    # Инвертированный индекс по тексту страниц; разбор текста идёт в фоновом потоке
+    MIN_INTERVAL = 30
+    TEXT_LIMIT = 500000
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.lock = threading.Lock()
+        self.postings = {}
+        self.documents = {}
+        self.versions = {}
+        self.indexed_at = {}
+        self.deferred = set()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+    @staticmethod
+    def _words(text):
+        # Число вхождений слова нужно для ранжирования результатов
+        return Counter(re.findall(r"\w+", text.lower()))
+
+    def schedule(self, browser):
+        # Страницы, которые часто перезагружаются, индексируем не чаще раза в MIN_INTERVAL секунд
+        if browser in self.deferred:
+            return
+        wait = self.indexed_at.get(browser, 0) + self.MIN_INTERVAL - time.time()
+        if wait > 0:
+            self.deferred.add(browser)
+            QTimer.singleShot(int(wait * 1000), lambda: self.deferred_capture(browser))
+            return
+        self.capture(browser)
+
+    def deferred_capture(self, browser):
+        if browser in self.deferred:
+            self.deferred.discard(browser)
+            self.capture(browser)
+
+    def capture(self, browser):
+        self.indexed_at[browser] = time.time()
+        version = self.versions.get(browser, 0) + 1
+        self.versions[browser] = version
+        browser.page().toPlainText(lambda text: self.pool.start(
+            PageTextJob(self, browser, version, text[:self.TEXT_LIMIT])))
+
+    def add(self, key, version, text):
+        words = self._words(text)
+        with self.lock:
+            # Вкладку успели закрыть или переиндексировать
+            if self.versions.get(key) != version:
+                return
+            old = self.documents.get(key)
+            old_words = old[1].keys() if old else set()
+            for word in old_words - words.keys():
+                keys = self.postings.get(word)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self.postings[word]
+            for word in words.keys() - old_words:
+                self.postings.setdefault(word, set()).add(key)
+            self.documents[key] = (text, words)
+
+    def remove(self, key):
+        self.deferred.discard(key)
+        self.indexed_at.pop(key, None)
+        with self.lock:
+            self.versions.pop(key, None)
+            document = self.documents.pop(key, None)
+            if document is None:
+                return
+            for word in document[1]:
+                keys = self.postings.get(word)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self.postings[word]
+
+    def search(self, query, limit=50):
+        words = re.findall(r"\w+", query.lower())
+        if not words:
+            return []
+        with self.lock:
+            keys = None
+            for word in sorted(words, key=lambda word: len(self.postings.get(word, ()))):
+                matches = self.postings.get(word, set())
+                keys = set(matches) if keys is None else keys & matches
+                if not keys:
+                    return []
+            # Сначала страницы, где слова запроса встречаются чаще, при равенстве — недавно проиндексированные
+            ranked = sorted(keys, key=lambda key: (-sum(self.documents[key][1][word] for word in words),
+                                                   -self.indexed_at.get(key, 0)))
+            results = []
+            for key in ranked[:limit]:
+                text = self.documents[key][0]
+                lower = text.lower()
+                # Фрагмент и подсветка — по слову запроса, которое встречается в тексте раньше остальных
+                pos, term = min(((lower.find(word), word) for word in words if word in lower),
+                                default=(0, words[0]))
+                snippet = " ".join(text[max(pos - 60, 0):pos + 80].split())
+                results.append((key, snippet, term))
+        return results
+
+class PageTextSearchDialog(TabSwitcherDialog):
+    def __init__(self, browser, parent=None):
+        super().__init__(browser, parent)
+        self.setWindowTitle("Поиск по тексту вкладок")
+        self.search_input.setPlaceholderText("Поиск по тексту всех вкладок")
+    
+    def update_results(self, text):
+        self.results_list.clear()
+        self.result_keys = []
+        self.result_terms = []
+        for key, snippet, term in self.browser.page_text_index.search(text):
+            if self.browser.tab_index(key) < 0:
+                continue
+            title = key.title() or "Новая вкладка"
+            self.results_list.addItem(f"{title}\n…{snippet}…")
+            self.result_keys.append(key)
+            self.result_terms.append(term)
+        if self.result_keys:
+            self.results_list.setCurrentRow(0)
+    
+    def activate_current(self, *args):
+        row = self.results_list.currentRow()
+        if 0 <= row < len(self.result_keys):
+            view = self.result_keys[row]
+            self.browser.switch_to_tab(self.browser.tab_index(view))
+            # Фраза целиком может и не встречаться подряд, поэтому ищем одно слово
+            view.findText(self.result_terms[row])
+            self.accept()
+
+class TabOverviewDialog(QDialog):
+    def __init__(self, browser, parent=None):
+        super().__init__(parent)
+        self.browser = browser
+        self.setWindowTitle("Все вкладки")
+        self.setWindowFlags(Qt.FramelessWindowHint | Qt.Dialog)
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.setFixedSize(1040, 720)
+        
+        container = QWidget(self)
+        container.setGeometry(10, 10, 1020, 700)
+        container.setStyleSheet("""
+            QWidget {
+                background-color: white;
+                border-radius: 16px;
+            }
+        """)
+        
+        shadow = QGraphicsDropShadowEffect()
+        shadow.setBlurRadius(30)
+        shadow.setXOffset(0)
+        shadow.setYOffset(4)
+        shadow.setColor(QColor(0, 0, 0, 60))
+        container.setGraphicsEffect(shadow)
+        
+        layout = QVBoxLayout(container)
+        layout.setContentsMargins(24, 24, 24, 24)
+        layout.setSpacing(16)
+        
+        self.grid = QListWidget()
+        self.grid.setViewMode(QListWidget.IconMode)
+        self.grid.setIconSize(ThumbnailCache.SIZE)
+        self.grid.setResizeMode(QListWidget.Adjust)
+        self.grid.setMovement(QListWidget.Static)
+        self.grid.setUniformItemSizes(True)
+        self.grid.setSpacing(12)
+        self.grid.setStyleSheet("""
+            QListWidget {
+                border: none;
+                background-color: white;
+                outline: none;
+            }
+            QListWidget::item {
+                border-radius: 8px;
+                color: #202124;
+                font-size: 12px;
+                font-family: 'Segoe UI', Arial, sans-serif;
+            }
+            QListWidget::item:selected {
+                background-color: #e8f0fe;
+                color: #1a73e8;
+            }
+        """)
+        self.grid.itemActivated.connect(self.activate_item)
+        self.grid.itemClicked.connect(self.activate_item)
+        layout.addWidget(self.grid)
+        
+        # Показываем только сохранённые миниатюры, вкладки не перерисовываются
+        placeholder = QPixmap(ThumbnailCache.SIZE)
+        placeholder.fill(QColor("#f1f3f4"))
+        self.views = []
+        for i in range(browser.tab_widget.count()):
+            view = browser.tab_widget.widget(i)
+            title, url = browser.tab_search_index.entry(view) if view in browser.tab_search_index.entries else ("", "")
+            image = browser.thumbnail_cache.get(url)
+            pixmap = QPixmap.fromImage(image) if image is not None else placeholder
+            self.grid.addItem(QListWidgetItem(QIcon(pixmap), browser.tab_widget.tabText(i)))
+            self.views.append(view)
+        self.grid.setCurrentRow(browser.tab_widget.currentIndex())
+    
+    def activate_item(self, item):
+        view = self.views[self.grid.row(item)]
+        self.browser.switch_to_tab(self.browser.tab_index(view))
+        self.accept()
+
+INTERNAL_PAGE_STYLE = """
+    body {
+        margin: 0;
+        padding: 64px 32px;
+        background-color: #ffffff;
+        color: #202124;
+        font-family: 'Segoe UI', Arial, sans-serif;
+    }
+    h1 {
+        font-size: 28px;
+        font-weight: 500;
+        margin: 0 0 16px 0;
+    }
+    p {
+        color: #5f6368;
+        font-size: 14px;
+    }
+    a {
+        color: #1a73e8;
+        text-decoration: none;
+    }
+    .search {
+        width: 560px;
+        max-width: 100%;
+        height: 44px;
+        border: 1px solid #e8eaed;
+        border-radius: 22px;
+        padding: 0px 20px;
+        font-size: 14px;
+        outline: none;
+    }
+    .search:focus {
+        border: 2px solid #1a73e8;
+        padding: 0px 19px;
+    }
+"""
+
+def build_internal_page(title, body):
+    return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{title}</title>"
+            f"<style>{INTERNAL_PAGE_STYLE}</style></head><body>{body}</body></html>").encode("utf-8")
+
+INTERNAL_SCHEMES = (b"flykit", b"ut")
+
+def register_internal_schemes():
+    # Должно вызываться до создания QApplication
+    for name in INTERNAL_SCHEMES:
+        scheme = QWebEngineUrlScheme(name)
+        scheme.setSyntax(QWebEngineUrlScheme.Syntax.Host)
+        scheme.setFlags(QWebEngineUrlScheme.SecureScheme | QWebEngineUrlScheme.LocalScheme |
+                        QWebEngineUrlScheme.LocalAccessAllowed | QWebEngineUrlScheme.CorsEnabled)
+        QWebEngineUrlScheme.registerScheme(scheme)
+
+def process_memory(pid):
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except Exception:
+        pass
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        import ctypes
+
+        # Windows без psutil: рабочий набор процесса через K32GetProcessMemoryInfo
+        class MemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", ctypes.c_ulong), ("PageFaultCount", ctypes.c_ulong),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        kernel32 = ctypes.windll.kernel32
+        kernel32.OpenProcess.restype = ctypes.c_void_p
+        kernel32.OpenProcess.argtypes = [ctypes.c_ulong, ctypes.c_int, ctypes.c_ulong]
+        kernel32.K32GetProcessMemoryInfo.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_ulong]
+        kernel32.CloseHandle.argtypes = [ctypes.c_void_p]
+        # PROCESS_QUERY_LIMITED_INFORMATION | PROCESS_VM_READ
+        handle = kernel32.OpenProcess(0x1000 | 0x0010, False, pid)
+        if handle:
+            try:
+                counters = MemoryCounters()
+                counters.cb = ctypes.sizeof(MemoryCounters)
+                if kernel32.K32GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                    return counters.WorkingSetSize
+            finally:
+                kernel32.CloseHandle(handle)
+    except Exception:
+        pass
+    return None
+
+def directory_size(path):
+    total = 0
+    try:
+        for entry in os.scandir(path):
+            if entry.is_dir(follow_symlinks=False):
+                total += directory_size(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                total += entry.stat(follow_symlinks=False).st_size
+    except OSError:
+        pass
+    return total
+
+PERFORMANCE_PAGE = build_internal_page("Производительность", """
+    <h1>Производительность Flykit</h1>
+    <p id="updated">Загрузка...</p>
+    <h2>Запуск</h2><table id="startup"></table>
+    <h2>Вкладки</h2><table id="tabs"></table>
+    <h2>Процессы отрисовки</h2><table id="renderers"></table>
+    <h2>Скрипты расширений</h2><table id="scripts"></table>
+    <h2>Кэш</h2><table id="cache"></table>
+    <h2>Движок</h2><table id="engine"></table>
+    <style>
+        h2 { font-size: 18px; font-weight: 500; margin: 32px 0 8px 0; }
+        table { border-collapse: collapse; font-size: 13px; min-width: 480px; }
+        td, th { padding: 6px 16px 6px 0; text-align: left; border-bottom: 1px solid #e8eaed; }
+        th { color: #5f6368; font-weight: 500; }
+    </style>
+    <script>
+        function mb(bytes) {
+            return bytes == null ? "—" : (bytes / 1048576).toFixed(1) + " МБ";
+        }
+        function fill(id, head, rows) {
+            var table = document.getElementById(id);
+            var html = "<tr>" + head.map(function (h) { return "<th>" + h + "</th>"; }).join("") + "</tr>";
+            rows.forEach(function (row) {
+                html += "<tr>" + row.map(function (cell) {
+                    var td = document.createElement("td");
+                    td.textContent = cell == null ? "—" : cell;
+                    return td.outerHTML;
+                }).join("") + "</tr>";
+            });
+            table.innerHTML = html;
+        }
+        function refresh() {
+            fetch("flykit://performance/data.json").then(function (r) { return r.json(); }).then(function (d) {
+                fill("startup", ["Этап", "мс"], d.startup.map(function (s) { return [s.phase, s.ms]; }));
+                fill("tabs", ["Вкладка", "Адрес", "Загрузка, мс", "PID"], d.tabs.map(function (t) {
+                    return [t.title, t.url, t.load_ms, t.pid];
+                }));
+                fill("renderers", ["PID", "Память"], d.renderers.map(function (p) { return [p.pid, mb(p.memory)]; }));
+                fill("scripts", ["Расширение", "Скриптов"], Object.keys(d.scripts).map(function (k) {
+                    return [k, d.scripts[k]];
+                }));
+                fill("cache", ["Папка", "Размер"], Object.keys(d.cache).map(function (k) {
+                    return [k, mb(d.cache[k])];
+                }));
+                fill("engine", ["Параметр", "Значение"], Object.keys(d.engine.settings).map(function (k) {
+                    return [k, String(d.engine.settings[k])];
+                }).concat([["QTWEBENGINE_CHROMIUM_FLAGS", d.engine.flags.join(" ")]]));
+                document.getElementById("updated").textContent = "Обновлено: " + new Date().toLocaleTimeString();
+            });
+        }
+        refresh();
+        setInterval(refresh, 1000);
+    </script>
+""")
+
+STALLS_DIR = os.path.join(INSTALL_PATH, "stalls")
+
+class StallWatchdog(QObject):
+    # Фоновый поток замечает, что цикл событий перестал отвечать, и снимает стек главного потока
+    HEARTBEAT_MS = 100
+    MAX_SAMPLES = 5
+
+    def __init__(self, threshold_ms=500, report_interval=60, max_reports=50, parent=None):
+        super().__init__(parent)
+        self.threshold_ms = threshold_ms
+        self.report_interval = report_interval
+        self.max_reports = max_reports
+        self.main_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.last_report = 0
+        self.stalls = deque(maxlen=200)
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.watch, name="flykit-stall-watchdog", daemon=True)
+        self.heartbeat = QTimer(self)
+        self.heartbeat.setInterval(self.HEARTBEAT_MS)
+        self.heartbeat.timeout.connect(self.beat)
+        os.makedirs(STALLS_DIR, exist_ok=True)
+
+    def start(self):
+        self.last_beat = time.monotonic()
+        self.heartbeat.start()
+        self.thread.start()
+        QApplication.instance().aboutToQuit.connect(self.stop)
+
+    def stop(self):
+        self.stop_event.set()
+
+    def beat(self):
+        self.last_beat = time.monotonic()
+
+    def sample(self):
+        frame = sys._current_frames().get(self.main_thread_id)
+        if frame is None:
+            return None
+        return traceback.extract_stack(frame)
+
+    def watch(self):
+        stall = None
+        while not self.stop_event.wait(self.HEARTBEAT_MS / 1000):
+            last_beat = self.last_beat
+            now = time.monotonic()
+            if (now - last_beat) * 1000 >= self.threshold_ms + self.HEARTBEAT_MS:
+                if stall is None or stall["beat"] != last_beat:
+                    stall = {"beat": last_beat, "started": time.time() - (now - last_beat),
+                             "samples": [], "sampled": 0, "written": False}
+                # Пока главный поток стоит, снимаем несколько стеков с интервалом в секунду
+                if len(stall["samples"]) < self.MAX_SAMPLES and now - stall["sampled"] >= 1:
+                    stack = self.sample()
+                    if stack:
+                        stall["samples"].append(stack)
+                    stall["sampled"] = now
+                # Долгое зависание записываем сразу, на случай если процесс так и не оживёт
+                if not stall["written"] and now - last_beat > 10:
+                    stall["duration_ms"] = (now - last_beat) * 1000
+                    self.finish(stall)
+                    stall["written"] = True
+            elif stall is not None:
+                stall["duration_ms"] = (last_beat - stall["beat"]) * 1000 - self.HEARTBEAT_MS
+                if not stall["written"]:
+                    self.finish(stall)
+                stall = None
+
+    @staticmethod
+    def location(stack):
+        for entry in reversed(stack):
+            if entry.filename == __file__:
+                return f"{entry.name}:{entry.lineno}"
+        entry = stack[-1]
+        return f"{os.path.basename(entry.filename)}:{entry.name}:{entry.lineno}"
+
+    def finish(self, stall):
+        record = {
+            "started": stall["started"],
+            "duration_ms": round(stall["duration_ms"]),
+            "location": self.location(stall["samples"][0]) if stall["samples"] else "?",
+            "stack": "".join(traceback.format_list(stall["samples"][0])) if stall["samples"] else "",
+        }
+        with self.lock:
+            self.stalls.append(record)
+        
+        if time.time() - self.last_report < self.report_interval:
+            return
+        self.last_report = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(stall["started"]))
+        try:
+            with open(os.path.join(STALLS_DIR, f"stall-{stamp}.txt"), "w", encoding="utf-8") as f:
+                f.write(f"Зависание UI-потока: {record['duration_ms']} мс, начало {stamp}\n")
+                for number, stack in enumerate(stall["samples"], 1):
+                    f.write(f"\n--- Стек {number} ---\n")
+                    f.write("".join(traceback.format_list(stack)))
+            reports = sorted(name for name in os.listdir(STALLS_DIR) if name.startswith("stall-"))
+            for name in reports[:-self.max_reports]:
+                os.remove(os.path.join(STALLS_DIR, name))
+        except OSError:
+            pass
+
+    def summary_page(self):
+        with self.lock:
+            stalls = list(self.stalls)
+        groups = {}
+        for stall in stalls:
+            group = groups.setdefault(stall["location"], [0, 0, 0])
+            group[0] += 1
+            group[1] += stall["duration_ms"]
+            group[2] = max(group[2], stall["duration_ms"])
+        rows = "".join(
+            f"<tr><td>{html.escape(location)}</td><td>{count}</td><td>{total}</td><td>{longest}</td></tr>"
+            for location, (count, total, longest) in sorted(groups.items(), key=lambda item: -item[1][1]))
+        recent = "".join(
+            f"<h2>{time.strftime('%H:%M:%S', time.localtime(stall['started']))} — {stall['duration_ms']} мс</h2>"
+            f"<pre>{html.escape(stall['stack'])}</pre>"
+            for stall in reversed(stalls[-20:]))
+        return build_internal_page("Зависания", f"""
+            <h1>Зависания интерфейса</h1>
+            <p>Порог: {self.threshold_ms} мс. Всего: {len(stalls)}. Отчёты: {html.escape(STALLS_DIR)}</p>
+            <style>
+                h2 {{ font-size: 16px; font-weight: 500; margin: 24px 0 8px 0; }}
+                table {{ border-collapse: collapse; font-size: 13px; }}
+                td, th {{ padding: 6px 16px 6px 0; text-align: left; border-bottom: 1px solid #e8eaed; }}
+                pre {{ background-color: #f8f9fa; padding: 12px; font-size: 12px; overflow-x: auto; }}
+            </style>
+            <table><tr><th>Место</th><th>Раз</th><th>Всего, мс</th><th>Макс., мс</th></tr>{rows}</table>
+            {recent}
+        """)
+
+PAGE_METRICS_FILE = os.path.join(INSTALL_PATH, "page_metrics.json")
+
+PAGE_METRICS_JS = """
+(function () {
+    var nav = performance.getEntriesByType("navigation")[0];
+    if (!nav || !nav.loadEventEnd) {
+        return null;
+    }
+    var paints = {};
+    performance.getEntriesByType("paint").forEach(function (entry) { paints[entry.name] = entry.startTime; });
+    return JSON.stringify({
+        origin: performance.timeOrigin,
+        dns: nav.domainLookupEnd - nav.domainLookupStart,
+        connect: nav.connectEnd - nav.connectStart,
+        ttfb: nav.responseStart,
+        response: nav.responseEnd - nav.responseStart,
+        dom_content_loaded: nav.domContentLoadedEventEnd,
+        load: nav.loadEventEnd,
+        first_paint: paints["first-paint"] || null,
+        first_contentful_paint: paints["first-contentful-paint"] || null,
+        transfer_size: nav.transferSize
+    });
+})();
+"""
+
+# Первая отрисовка в часах эпохи, чтобы сравнить с моментом нажатия «Новая вкладка»
+FIRST_PAINT_JS = """
+(function () {
+    var paint = performance.getEntriesByName("first-paint")[0];
+    return paint ? performance.timeOrigin + paint.startTime : null;
+})();
+"""
+
+def percentile(values, p):
+    ordered = sorted(values)
+    rank = max(int(-(-p * len(ordered) // 100)) - 1, 0)
+    return ordered[rank]
+
+class PageMetricsStore(QObject):
+    # Navigation/Paint Timing по хостам: ограниченное число замеров и хостов
+    METRICS = ("ttfb", "first_paint", "first_contentful_paint", "dom_content_loaded", "load",
+               "dns", "connect", "response", "transfer_size")
+    SAMPLES_PER_HOST = 300
+    MAX_HOSTS = 500
+
+    def __init__(self, path=PAGE_METRICS_FILE, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.hosts = OrderedDict()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for host, samples in json.load(f).items():
+                    self.hosts[host] = deque(samples, maxlen=self.SAMPLES_PER_HOST)
+        except (OSError, ValueError, AttributeError):
+            self.hosts = OrderedDict()
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(10000)
+        self.save_timer.timeout.connect(self.save)
+        QApplication.instance().aboutToQuit.connect(self.flush)
+
+    def flush(self):
+        if self.save_timer.isActive():
+            self.save_timer.stop()
+            self.save()
+
+    def add(self, host, url, sample):
+        samples = self.hosts.get(host)
+        if samples is None:
+            samples = self.hosts[host] = deque(maxlen=self.SAMPLES_PER_HOST)
+        self.hosts.move_to_end(host)
+        while len(self.hosts) > self.MAX_HOSTS:
+            self.hosts.popitem(last=False)
+        entry = {"time": round(time.time(), 3), "url": url}
+        for metric in self.METRICS:
+            value = sample.get(metric)
+            entry[metric] = round(value, 1) if isinstance(value, (int, float)) else None
+        samples.append(entry)
+        if not self.save_timer.isActive():
+            self.save_timer.start()
+
+    def save(self):
+        try:
+            write_json_atomic(self.path, {host: list(samples) for host, samples in self.hosts.items()})
+        except OSError as e:
+            print(f"Не удалось сохранить метрики загрузки: {e}")
+
+    def summary(self):
+        result = {}
+        for host, samples in self.hosts.items():
+            stats = {"samples": len(samples)}
+            for metric in self.METRICS:
+                values = [sample[metric] for sample in samples if sample.get(metric) is not None]
+                if values:
+                    stats[metric] = {"p50": percentile(values, 50), "p95": percentile(values, 95),
+                                     "p99": percentile(values, 99)}
+            result[host] = stats
+        return result
+
+    def export_json(self):
+        return json.dumps({
+            "summary": self.summary(),
+            "samples": {host: list(samples) for host, samples in self.hosts.items()},
+        }, ensure_ascii=False).encode("utf-8")
+
+    def export_csv(self):
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(("host", "time", "url") + self.METRICS)
+        for host, samples in self.hosts.items():
+            for sample in samples:
+                writer.writerow([host, sample["time"], sample["url"]] + [
+                    "" if sample.get(metric) is None else sample[metric] for metric in self.METRICS])
+        return output.getvalue().encode("utf-8")
+
+    def summary_page(self):
+        summary = self.summary()
+        columns = ("ttfb", "first_contentful_paint", "load")
+        header = "".join(f"<th>{metric} p50 / p95 / p99, мс</th>" for metric in columns)
+        rows = []
+        for host, stats in sorted(summary.items(), key=lambda item: -item[1]["samples"]):
+            cells = "".join(
+                f"<td>{stats[metric]['p50']:.0f} / {stats[metric]['p95']:.0f} / {stats[metric]['p99']:.0f}</td>"
+                if metric in stats else "<td>—</td>" for metric in columns)
+            rows.append(f"<tr><td>{html.escape(host)}</td><td>{stats['samples']}</td>{cells}</tr>")
+        return build_internal_page("Скорость сайтов", f"""
+            <h1>Скорость загрузки сайтов</h1>
+            <p>Хостов: {len(summary)}. Выгрузка: <a href="flykit://metrics/data.json">JSON</a>,
+               <a href="flykit://metrics/data.csv">CSV</a></p>
+            <style>
+                table {{ border-collapse: collapse; font-size: 13px; }}
+                td, th {{ padding: 6px 16px 6px 0; text-align: left; border-bottom: 1px solid #e8eaed; }}
+            </style>
+            <table><tr><th>Хост</th><th>Замеров</th>{header}</tr>{"".join(rows)}</table>
+        """)
+
+# Буфер Resource Timing страницы ограничен 250 записями, поэтому записи собирает наблюдатель,
+# а браузер забирает накопленное по мере завершения запросов
+NETWORK_OBSERVER_JS = """
+(function () {
+    var queue = window.__flykitNetwork = [];
+    try {
+        new PerformanceObserver(function (list) {
+            Array.prototype.push.apply(queue, list.getEntries());
+            if (queue.length > 2000) {
+                queue.splice(0, queue.length - 2000);
+            }
+        }).observe({entryTypes: ["navigation", "resource"]});
+    } catch (e) {
+    }
+})();
+"""
+
+NETWORK_TIMING_JS = """
+(function () {
+    var entries = window.__flykitNetwork;
+    if (!entries || !entries.length) {
+        return null;
+    }
+    return JSON.stringify(entries.splice(0).map(function (entry) {
+        return {
+            url: entry.name,
+            duration: entry.duration,
+            dns: entry.domainLookupStart ? entry.domainLookupEnd - entry.domainLookupStart : -1,
+            connect: entry.connectStart ? entry.connectEnd - entry.connectStart : -1,
+            ssl: entry.secureConnectionStart ? entry.connectEnd - entry.secureConnectionStart : -1,
+            wait: entry.responseStart ? entry.responseStart - entry.requestStart : -1,
+            receive: entry.responseStart ? entry.responseEnd - entry.responseStart : -1,
+            transfer_size: entry.transferSize || 0,
+            body_size: entry.encodedBodySize || 0,
+            protocol: entry.nextHopProtocol || ""
+        };
+    }));
+})();
+"""
+
+def network_timing_script():
+    script = QWebEngineScript()
+    script.setName("flykit-network-timing")
+    script.setSourceCode(NETWORK_OBSERVER_JS)
+    script.setInjectionPoint(QWebEngineScript.DocumentCreation)
+    script.setWorldId(QWebEngineScript.ApplicationWorld)
+    script.setRunsOnSubFrames(False)
+    return script
+
+def har_time(timestamp):
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(timestamp)) + f".{int(timestamp % 1 * 1000):03d}Z"
+
+class TabRequestObserver(QWebEngineUrlRequestInterceptor):
+    # Перехватчик страницы вызывается после перехватчика профиля и точно знает свою вкладку,
+    # даже если в нескольких вкладках открыт один и тот же адрес
+    def __init__(self, network_log, tab_id, parent=None):
+        super().__init__(parent)
+        self.network_log = network_log
+        self.tab_id = tab_id
+
+    def interceptRequest(self, info):
+        self.network_log.record(self.tab_id, info)
+
+class NetworkLog(QObject):
+    # Запросы по вкладкам: кольцевой буфер на вкладку. Незаблокированные запросы пишет перехватчик
+    # страницы, заблокированные видит только наблюдатель в цепочке перехватчиков профиля.
+    # Перехватчик видит только начало запроса, время и размеры добавляются из Resource Timing страницы
+    PER_TAB = 1000
+    DOCUMENTS_PER_TAB = 8
+    MAX_HOSTS = 1000
+    MERGE_MS = 1000
+    # Запрос без записи Resource Timing (WebSocket, iframe) ждём не дольше этого
+    PENDING_SECONDS = 60
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.next_tab = 1
+        self.tab_ids = {}
+        self.tabs = {None: deque(maxlen=self.PER_TAB)}
+        self.documents = {}
+        self.tab_documents = {}
+        self.hosts = OrderedDict()
+        self.dirty = set()
+        self.attached = False
+        self.blocked_url = None
+        self.merge_timer = QTimer(self)
+        self.merge_timer.setSingleShot(True)
+        self.merge_timer.setInterval(self.MERGE_MS)
+        self.merge_timer.timeout.connect(self.collect)
+
+    def attach(self, chain):
+        chain.observers.append(self)
+        self.attached = True
+
+    def add_tab(self, view):
+        tab_id = self.next_tab
+        self.next_tab += 1
+        self.tab_ids[view] = tab_id
+        self.tabs[tab_id] = deque(maxlen=self.PER_TAB)
+        self.tab_documents[tab_id] = deque()
+        if self.attached:
+            # Страница не владеет перехватчиком, он живёт и удаляется вместе с вкладкой
+            view.page().setUrlRequestInterceptor(TabRequestObserver(self, tab_id, view))
+        return tab_id
+
+    def track(self, view, url):
+        # Заблокированный запрос относим к вкладкам по адресу документа (firstPartyUrl)
+        tab_id = self.tab_ids.get(view)
+        if tab_id is None or not url:
+            return
+        documents = self.tab_documents[tab_id]
+        if url in documents:
+            return
+        self.documents.setdefault(url, set()).add(tab_id)
+        documents.append(url)
+        if len(documents) > self.DOCUMENTS_PER_TAB:
+            self.forget_document(documents.popleft(), tab_id)
+
+    def forget_document(self, url, tab_id):
+        tabs = self.documents.get(url)
+        if tabs is not None:
+            tabs.discard(tab_id)
+            if not tabs:
+                del self.documents[url]
+
+    def remove_tab(self, view):
+        tab_id = self.tab_ids.pop(view, None)
+        if tab_id is None:
+            return
+        for url in self.tab_documents.pop(tab_id, ()):
+            self.forget_document(url, tab_id)
+        self.tabs.pop(tab_id, None)
+        self.dirty.discard(tab_id)
+
+    def __call__(self, info, blocked):
+        # Наблюдатель цепочки профиля: вызывается в потоке интерфейса (setUrlRequestInterceptor, Qt 5.13+)
+        # раньше перехватчика страницы. Заблокированный запрос страница может и не увидеть, поэтому
+        # пишем его здесь — во все вкладки с этим документом — и запоминаем, чтобы не записать дважды
+        self.blocked_url = None
+        if not blocked:
+            return
+        url = info.requestUrl()
+        if url.scheme() not in ("http", "https", "ws", "wss"):
+            return
+        self.blocked_url = url.toString()
+        tab_ids = self.documents.get(info.firstPartyUrl().toString()) or (None,)
+        for tab_id in tab_ids:
+            self.tabs[tab_id].append(self.new_entry(info, self.blocked_url, True))
+
+    def record(self, tab_id, info):
+        # Перехватчик страницы: только запись в буфер, время подтянется из Resource Timing
+        url = info.requestUrl()
+        if url.scheme() not in ("http", "https", "ws", "wss"):
+            return
+        url = url.toString()
+        if url == self.blocked_url:
+            self.blocked_url = None
+            return
+        entries = self.tabs.get(tab_id)
+        if entries is None:
+            return
+        entries.append(self.new_entry(info, url, False))
+        self.schedule_merge(tab_id)
+
+    @staticmethod
+    def new_entry(info, url, blocked):
+        return {
+            "started": time.time(),
+            "url": url,
+            "method": bytes(info.requestMethod()).decode("ascii", "replace"),
+            "type": REQUEST_TYPES.get(info.resourceType(), "other"),
+            "blocked": blocked,
+            "timing": None,
+        }
+
+    def schedule_merge(self, tab_id):
+        self.dirty.add(tab_id)
+        if not self.merge_timer.isActive():
+            self.merge_timer.start()
+
+    def collect(self):
+        dirty, self.dirty = self.dirty, set()
+        for view, tab_id in list(self.tab_ids.items()):
+            if tab_id in dirty:
+                view.page().runJavaScript(NETWORK_TIMING_JS, QWebEngineScript.ApplicationWorld,
+                                          lambda result, view=view: self.merge_timings(view, result))
+
+    def merge_timings(self, view, result):
+        tab_id = self.tab_ids.get(view)
+        if tab_id is None:
+            return
+        if not result:
+            self.schedule_pending(tab_id)
+            return
+        try:
+            timings = json.loads(result)
+        except ValueError:
+            return
+        entries = self.tabs[tab_id]
+        pending = {}
+        for entry in entries:
+            if entry["timing"] is None and not entry["blocked"]:
+                pending.setdefault(entry["url"], deque()).append(entry)
+        for timing in timings:
+            queue = pending.get(timing["url"])
+            if queue:
+                queue.popleft()["timing"] = timing
+            else:
+                # Ресурс прошёл мимо перехватчика, например из кэша памяти
+                entries.append({"started": time.time() - timing["duration"] / 1000, "url": timing["url"],
+                                 "method": "GET", "type": "other", "blocked": False, "timing": timing})
+            host = QUrl(timing["url"]).host()
+            stats = self.hosts.get(host)
+            if stats is None:
+                stats = self.hosts[host] = {"requests": 0, "bytes": 0, "durations": deque(maxlen=200)}
+                while len(self.hosts) > self.MAX_HOSTS:
+                    self.hosts.popitem(last=False)
+            self.hosts.move_to_end(host)
+            stats["requests"] += 1
+            stats["bytes"] += timing["transfer_size"]
+            stats["durations"].append(timing["duration"])
+        self.schedule_pending(tab_id)
+
+    def schedule_pending(self, tab_id):
+        # Запросы ещё идут — заберём их время при следующем проходе
+        recent = time.time() - self.PENDING_SECONDS
+        for entry in reversed(self.tabs[tab_id]):
+            if entry["started"] < recent:
+                break
+            if entry["timing"] is None and not entry["blocked"]:
+                self.schedule_merge(tab_id)
+                return
+
+    def slow_hosts(self, limit=20):
+        rows = []
+        for host, stats in self.hosts.items():
+            durations = stats["durations"]
+            rows.append({
+                "host": host,
+                "requests": stats["requests"],
+                "bytes": stats["bytes"],
+                "p50": round(percentile(durations, 50), 1),
+                "p95": round(percentile(durations, 95), 1),
+                "max": round(max(durations), 1),
+            })
+        rows.sort(key=lambda row: row["p95"], reverse=True)
+        return rows[:limit]
+
+    def har(self, pages):
+        # pages: {view: (title, url)} для открытых вкладок
+        har_pages = []
+        har_entries = []
+        for view, tab_id in list(self.tab_ids.items()):
+            entries = list(self.tabs.get(tab_id, ()))
+            title, url = pages.get(view, ("", ""))
+            page_id = f"tab{tab_id}"
+            har_pages.append({"startedDateTime": har_time(entries[0]["started"] if entries else time.time()),
+                              "id": page_id, "title": title or url, "pageTimings": {}})
+            for entry in entries:
+                har_entries.append(self.har_entry(entry, page_id))
+        har_entries.sort(key=lambda entry: entry["startedDateTime"])
+        return {"log": {"version": "1.2", "creator": {"name": "Flykit", "version": "1.0"},
+                        "pages": har_pages, "entries": har_entries}}
+
+    @staticmethod
+    def har_entry(entry, page_id):
+        timing = entry["timing"] or {}
+        wait = max(timing.get("wait", -1), 0)
+        receive = max(timing.get("receive", -1), 0)
+        return {
+            "pageref": page_id,
+            "startedDateTime": har_time(entry["started"]),
+            "time": round(timing.get("duration", 0), 3),
+            "request": {"method": entry["method"], "url": entry["url"], "httpVersion": timing.get("protocol", ""),
+                        "cookies": [], "headers": [], "queryString": [], "headersSize": -1, "bodySize": -1},
+            "response": {"status": 0, "statusText": "blocked" if entry["blocked"] else "",
+                         "httpVersion": timing.get("protocol", ""), "cookies": [], "headers": [],
+                         "content": {"size": timing.get("body_size", 0), "mimeType": ""},
+                         "redirectURL": "", "headersSize": -1, "bodySize": timing.get("transfer_size", -1)},
+            "cache": {},
+            "timings": {"blocked": -1, "dns": round(timing.get("dns", -1), 3),
+                        "connect": round(timing.get("connect", -1), 3), "ssl": round(timing.get("ssl", -1), 3),
+                        "send": 0, "wait": round(wait, 3), "receive": round(receive, 3)},
+            "_resourceType": entry["type"],
+            "_blocked": entry["blocked"],
+        }
+
+    def summary_page(self, pages):
+        rows = "".join(
+            f"<tr><td>{html.escape(row['host'])}</td><td>{row['requests']}</td><td>{row['p50']:.0f}</td>"
+            f"<td>{row['p95']:.0f}</td><td>{row['max']:.0f}</td><td>{row['bytes'] // 1024}</td></tr>"
+            for row in self.slow_hosts())
+        tabs = []
+        for view, tab_id in list(self.tab_ids.items()):
+            entries = list(self.tabs.get(tab_id, ()))
+            title, url = pages.get(view, ("", ""))
+            blocked = sum(1 for entry in entries if entry["blocked"])
+            tabs.append(f"<tr><td>{html.escape(title or url)}</td><td>{len(entries)}</td><td>{blocked}</td></tr>")
+        return build_internal_page("Сеть", f"""
+            <h1>Сетевые запросы</h1>
+            <p>Выгрузка всех вкладок: <a href="flykit://network/har.json">HAR</a></p>
+            <style>
+                h2 {{ font-size: 16px; font-weight: 500; margin: 24px 0 8px 0; }}
+                table {{ border-collapse: collapse; font-size: 13px; }}
+                td, th {{ padding: 6px 16px 6px 0; text-align: left; border-bottom: 1px solid #e8eaed; }}
+            </style>
+            <h2>Самые медленные хосты</h2>
+            <table><tr><th>Хост</th><th>Запросов</th><th>p50, мс</th><th>p95, мс</th><th>Макс., мс</th><th>КБ</th></tr>{rows}</table>
+            <h2>Вкладки</h2>
+            <table><tr><th>Вкладка</th><th>Запросов</th><th>Заблокировано</th></tr>{"".join(tabs)}</table>
+        """)
+
+class InternalSchemeHandler(QWebEngineUrlSchemeHandler):
+    # Служебные страницы отдаются из памяти, без сети и без повторной сборки HTML
+    REMOTE_URL = "https://flykit.itrypro.ru/?data={}"
+    MAX_RENDERED_PAGES = 256
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pages = {}
+        self.endpoints = {}
+        self.rendered = {}
+        self.register_page("newtab", build_internal_page("Новая вкладка", """
+            <h1>Flykit</h1>
+            <form action="https://www.google.com/search">
+                <input class="search" name="q" placeholder="Поиск в Google или введите URL" autofocus>
+            </form>
+        """))
+
+    def register_page(self, name, content, content_type=b"text/html; charset=utf-8"):
+        self.pages[name] = (content_type, content)
+
+    def register_endpoint(self, name, callback, content_type=b"application/json"):
+        self.endpoints[name] = (content_type, callback)
+
+    def error_page(self, code):
+        page = self.rendered.get(code)
+        if page is None:
+            if len(self.rendered) >= self.MAX_RENDERED_PAGES:
+                self.rendered.clear()
+            code_html = code.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+            page = build_internal_page(f"Ошибка {code_html}",
+                                       f"<h1>Ошибка {code_html}</h1><p>Служебная страница Flykit</p>")
+            self.rendered[code] = page
+        return b"text/html; charset=utf-8", page
+
+    def resolve(self, url):
+        scheme = url.scheme()
+        host = url.host()
+        path = url.path().strip("/")
+        if scheme == "ut":
+            return self.error_page(host or path)
+        if host == "error":
+            return self.error_page(path)
+        if host in self.endpoints and not path:
+            content_type, callback = self.endpoints[host]
+            return content_type, callback()
+        name = f"{host}/{path}" if path else host
+        if name in self.endpoints:
+            content_type, callback = self.endpoints[name]
+            return content_type, callback()
+        return self.pages.get(name)
+
+    def requestStarted(self, job):
+        url = job.requestUrl()
+        try:
+            resource = self.resolve(url)
+        except Exception as e:
+            print(f"Ошибка служебной страницы {url.toString()}: {e}")
+            job.fail(QWebEngineUrlRequestJob.RequestFailed)
+            return
+        if resource is None:
+            if url.scheme() == "flykit":
+                # Неизвестные страницы по-прежнему открываются на сервере Flykit
+                data = url.toString().split(":", 1)[1].lstrip("/")
+                job.redirect(QUrl(self.REMOTE_URL.format(data)))
+            else:
+                job.fail(QWebEngineUrlRequestJob.UrlNotFound)
+            return
+        content_type, content = resource
+        buffer = QBuffer(job)
+        buffer.setData(content)
+        job.reply(content_type, buffer)
+
+PUBLIC_SUFFIX_URL = "https://publicsuffix.org/list/public_suffix_list.dat"
+PUBLIC_SUFFIX_FILE = os.path.join(FILTERS_DIR, "public_suffix_list.dat")
+
+class PublicSuffixIndex:
+    # Список публичных суффиксов, скомпилированный в дерево по меткам справа налево
+    FORMAT_VERSION = 2
+    # Пока полного списка нет: частые общие зоны, а двухбуквенные метки считаются национальными доменами
+    BUILTIN = ("com net org edu gov mil int info biz name pro mobi app dev io ai co me tv cc ws xyz online site "
+               "store shop tech blog club top cloud page news live link click space website digital agency "
+               "email group media travel museum aero coop jobs asia cat tel post arpa рф рус москва дети сайт "
+               "com.ru net.ru org.ru pp.ru msk.ru spb.ru co.uk org.uk ac.uk gov.uk com.ua com.by co.jp com.au "
+               "com.br com.cn com.tr com.kz github.io")
+
+    def __init__(self):
+        self.root = {}
+        self.complete = False
+
+    @classmethod
+    def builtin(cls):
+        index = cls()
+        for rule in cls.BUILTIN.split():
+            index.add_rule(rule)
+        return index
+
+    @classmethod
+    def load(cls, path=PUBLIC_SUFFIX_FILE):
+        stat = os.stat(path)
+        key = hashlib.sha1(f"{cls.FORMAT_VERSION}:{path}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+        cache_name = f"suffixes-{key.hexdigest()[:16]}.json"
+        cache_path = os.path.join(CACHE_DIR, cache_name)
+        
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    index = cls()
+                    index.root = json.load(f)
+                    index.complete = True
+                    return index
+            except (OSError, ValueError):
+                pass
+        
+        index = cls()
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                index.add_rule(line)
+        index.complete = True
+        
+        for name in os.listdir(CACHE_DIR):
+            if name.startswith("suffixes-") and name != cache_name:
+                try:
+                    os.remove(os.path.join(CACHE_DIR, name))
+                except OSError:
+                    pass
+        try:
+            write_json_atomic(cache_path, index.root, ensure_ascii=False, separators=(",", ":"))
+        except OSError:
+            pass
+        return index
+
+    def add_rule(self, line):
+        rule = line.split(None, 1)[0].lower() if line.strip() else ""
+        if not rule or rule.startswith("//"):
+            return
+        exception = rule.startswith("!")
+        node = self.root
+        for label in reversed(rule.lstrip("!").split(".")):
+            node = node.setdefault(label, {})
+        # "" — обычное правило, "!" — исключение из правила со звёздочкой
+        node["!" if exception else ""] = True
+
+    def suffix_length(self, labels):
+        # Число меток публичного суффикса или 0, если зона неизвестна
+        node = self.root
+        length = 0
+        for depth, label in enumerate(reversed(labels), 1):
+            child = node.get(label)
+            wildcard = node.get("*")
+            if child is not None and "!" in child:
+                return depth - 1
+            if child is None:
+                if wildcard is None:
+                    break
+                child = wildcard
+            if "" in child or wildcard is not None and "" in wildcard:
+                length = depth
+            node = child
+        if not length and not self.complete and len(labels[-1]) == 2 and labels[-1].isalpha():
+            return 1
+        return length
+
+    def registrable_domain(self, host):
+        # Суффикс плюс одна метка: ads.example.co.uk -> example.co.uk. Неизвестная зона считается одной меткой
+        labels = host.split(".")
+        length = self.suffix_length(labels) or 1
+        return ".".join(labels[-length - 1:])
+
+class InputClassifier:
+    # Решает, что ввели в строку адреса: адрес или поисковый запрос
+    SCHEMES = {"http", "https", "ftp", "file", "about", "data", "view-source", "mailto", "flykit", "ut", "chrome"}
+    INTRANET_SUFFIXES = ("local", "localhost", "lan", "internal", "intranet", "corp", "home.arpa", "test")
+    HOST_CHARS = re.compile(r"^(?!-)[\w-]{1,63}(?<!-)$")
+
+    def __init__(self, suffixes, intranet_hosts=(), intranet_suffixes=INTRANET_SUFFIXES):
+        self.suffixes = suffixes
+        self.intranet_hosts = {host.lower() for host in intranet_hosts}
+        self.intranet_suffixes = tuple(suffix.lower() for suffix in intranet_suffixes)
+
+    @staticmethod
+    def is_ipv4(host):
+        parts = host.split(".")
+        return len(parts) == 4 and all(part.isdigit() and len(part) <= 3 and int(part) <= 255 for part in parts)
+
+    def is_intranet(self, host):
+        if host == "localhost" or host in self.intranet_hosts:
+            return True
+        # Нужна хотя бы одна метка перед суффиксом: одиночное «test» или «corp» — это запрос
+        return any(host.endswith("." + suffix) for suffix in self.intranet_suffixes)
+
+    def classify(self, text):
+        text = text.strip()
+        if not text:
+            return "search", ""
+        if text.startswith("?"):
+            return "search", text[1:].strip()
+        if any(ch.isspace() for ch in text):
+            return "search", text
+        
+        colon = text.find(":")
+        if colon > 0 and text[:colon].lower() in self.SCHEMES:
+            return "url", text
+        
+        end = len(text)
+        for separator in "/?#":
+            position = text.find(separator)
+            if 0 <= position < end:
+                end = position
+        authority, rest = text[:end], text[end:]
+        if not authority or "@" in authority:
+            return "search", text
+        
+        if authority.startswith("["):
+            # IPv6: [::1] или [::1]:8080
+            host, bracket, port = authority[1:].partition("]")
+            if not bracket or port and not (port.startswith(":") and port[1:].isdigit()):
+                return "search", text
+            return "url", f"http://{authority}{rest}"
+        
+        host, _, port = authority.partition(":")
+        if port and not (port.isdigit() and 0 < int(port) < 65536):
+            return "search", text
+        host = host.lower().rstrip(".")
+        if not host:
+            return "search", text
+        
+        if self.is_ipv4(host):
+            return "url", f"http://{authority}{rest}"
+        
+        labels = host.split(".")
+        if not all(self.HOST_CHARS.match(label) for label in labels):
+            return "search", text
+        if self.is_intranet(host):
+            return "url", f"http://{authority}{rest}"
+        if len(labels) == 1:
+            # Имя без точки — адрес, только если указан порт
+            return ("url", f"http://{authority}{rest}") if port else ("search", text)
+        if labels[-1].isdigit():
+            return "search", text
+        
+        try:
+            labels = [label.encode("ascii").decode("idna") if label.startswith("xn--") else label for label in labels]
+        except UnicodeError:
+            # Битый punycode вроде «xn--zz.com» адресом не считается
+            return "search", text
+        suffix = self.suffixes.suffix_length(labels)
+        if suffix and len(labels) > suffix:
+            return "url", f"https://{authority}{rest}"
+        return "search", text
+
+SEARCH_URL = "https://www.google.com/search?q={query}"
+SUGGEST_URL = "https://suggestqueries.google.com/complete/search?client=firefox&q={query}"
+
+def search_url(query):
+    template = load_settings().get("search_url", SEARCH_URL)
+    return template.replace("{query}", QUrl.toPercentEncoding(query).data().decode())
+
+class SearchSuggestions(QObject):
+    # Подсказки в формате OpenSearch: ["запрос", ["подсказка", ...]]
+    suggestions = pyqtSignal(str, list)
+
+    DEBOUNCE_MS = 150
+    CACHE_SIZE = 256
+    LIMIT = 8
+
+    def __init__(self, endpoint=SUGGEST_URL, parent=None):
+        super().__init__(parent)
+        self.endpoint = endpoint
+        self.network = QNetworkAccessManager(self)
+        self.cache = OrderedDict()
+        self.reply = None
+        self.query = ""
+        self.debounce = QTimer(self)
+        self.debounce.setSingleShot(True)
+        self.debounce.setInterval(self.DEBOUNCE_MS)
+        self.debounce.timeout.connect(self.fetch)
+
+    def cached(self, query):
+        key = query.lower()
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key], True
+        # Короткий список для префикса уже полный — достаточно отфильтровать его
+        for length in range(len(key) - 1, 0, -1):
+            results = self.cache.get(key[:length])
+            if results is not None:
+                matches = [item for item in results if item.lower().startswith(key)]
+                return matches, len(results) < self.LIMIT
+        return None, False
+
+    def remember(self, query, results):
+        self.cache[query.lower()] = results
+        self.cache.move_to_end(query.lower())
+        while len(self.cache) > self.CACHE_SIZE:
+            self.cache.popitem(last=False)
+
+    def request(self, query):
+        self.query = query.strip()
+        self.debounce.stop()
+        self.cancel()
+        if not self.query:
+            self.suggestions.emit("", [])
+            return
+        results, complete = self.cached(self.query)
+        if results is not None:
+            self.suggestions.emit(self.query, results[:self.LIMIT])
+            if complete:
+                return
+        self.debounce.start()
+
+    def cancel(self):
+        if self.reply is not None:
+            reply = self.reply
+            self.reply = None
+            reply.abort()
+            reply.deleteLater()
+
+    def fetch(self):
+        query = self.query
+        url = self.endpoint.replace("{query}", QUrl.toPercentEncoding(query).data().decode())
+        self.reply = self.network.get(QNetworkRequest(QUrl(url)))
+        self.reply.finished.connect(lambda reply=self.reply: self.fetched(reply, query))
+
+    def fetched(self, reply, query):
+        # Отменённые и устаревшие ответы просто отбрасываем
+        if reply is not self.reply:
+            return
+        self.reply = None
+        reply.deleteLater()
+        if reply.error() != QNetworkReply.NoError:
+            return
+        try:
+            data = json.loads(bytes(reply.readAll()).decode("utf-8", "replace"))
+            results = [str(item) for item in data[1]][:self.LIMIT]
+        except (ValueError, IndexError, TypeError):
+            return
+        self.remember(query, results)
+        if query == self.query:
+            self.suggestions.emit(query, results)
+
+class HeadlessRenderer(QObject):
+    # Пакетный рендер без окна: ограниченный пул вкладок, свои скрипты расширений
+    finished = pyqtSignal(int)
+
+    def __init__(self, urls, out_dir, fmt="png", jobs=4, timeout=30, size=QSize(1280, 900), parent=None):
+        super().__init__(parent)
+        self.queue = deque(enumerate(urls))
+        self.total = len(urls)
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.timeout_ms = int(timeout * 1000)
+        self.settle_ms = 150
+        self.results = []
+        self.failures = 0
+        self.active = {}
+        os.makedirs(out_dir, exist_ok=True)
+
+        self.profile = QWebEngineProfile.defaultProfile()
+        self.storage = ExtensionStorage(EXTENSION_STORAGE_FILE, self)
+        self.bridge = ExtensionStorageBridge(self.storage, self)
+        self.runtime = ExtensionRuntimeMonitor(self.bridge, parent=self)
+        self.channel = QWebChannel(self)
+        self.bridge.attach(self.channel)
+        self.channel.registerObject("extensionRuntime", self.runtime)
+        for script in extension_content_scripts(self.bridge):
+            self.profile.scripts().insert(script)
+
+        self.idle = []
+        for i in range(max(1, min(jobs, self.total))):
+            view = QWebEngineView()
+            view.setAttribute(Qt.WA_DontShowOnScreen)
+            view.resize(size)
+            view.page().setWebChannel(self.channel, EXTENSION_WORLD)
+            view.loadStarted.connect(lambda view=view: self.load_started(view))
+            view.loadFinished.connect(lambda ok, view=view: self.loaded(view, ok))
+            view.page().pdfPrintingFinished.connect(lambda path, ok, view=view: self.saved(view, path, ok))
+            view.show()
+            self.idle.append(view)
+
+    def start(self):
+        self.started = time.perf_counter()
+        if not self.queue:
+            self.finished.emit(0)
+            return
+        while self.idle and self.queue:
+            self.render_next(self.idle.pop())
+
+    def output_path(self, number, url):
+        qurl = QUrl(url)
+        slug = re.sub(r"[^\w.-]+", "_", qurl.host() + qurl.path()).strip("_")[:80] or "page"
+        return os.path.join(self.out_dir, f"{number + 1:04d}-{slug}.{self.fmt}")
+
+    def render_next(self, view):
+        if not self.queue:
+            self.idle.append(view)
+            if not self.active:
+                self.finish()
+            return
+        number, url = self.queue.popleft()
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.timeout.connect(lambda: self.done(view, False, "timeout"))
+        timer.start(self.timeout_ms)
+        self.active[view] = {"url": url, "path": self.output_path(number, url), "timer": timer,
+                             "started": time.perf_counter(), "loaded": None, "navigating": False}
+        view.setUrl(QUrl(url))
+
+    def load_started(self, view):
+        if view in self.active:
+            self.active[view]["navigating"] = True
+
+    def loaded(self, view, ok):
+        # loadFinished(false) от прерванной прошлой загрузки к новому заданию не относится
+        job = self.active.get(view)
+        if job is None or not job["navigating"] or job["loaded"] is not None:
+            return
+        if not ok:
+            self.done(view, False, "load failed")
+            return
+        job["loaded"] = time.perf_counter()
+        # Даём странице дорисоваться после loadFinished
+        QTimer.singleShot(self.settle_ms, lambda: self.save(view, job))
+
+    def save(self, view, job):
+        if self.active.get(view) is not job:
+            return
+        if self.fmt == "pdf":
+            view.page().printToPdf(job["path"])
+        else:
+            self.done(view, view.grab().save(job["path"], "PNG"), "")
+
+    def saved(self, view, path, ok):
+        # Печать задания, снятого по таймауту, может закончиться уже во время следующего на той же вкладке
+        job = self.active.get(view)
+        if job is None or os.path.normcase(os.path.abspath(path)) != os.path.normcase(os.path.abspath(job["path"])):
+            return
+        self.done(view, ok, "")
+
+    def done(self, view, ok, error):
+        job = self.active.pop(view, None)
+        if job is None:
+            return
+        job["timer"].stop()
+        job["timer"].deleteLater()
+        now = time.perf_counter()
+        result = {
+            "url": job["url"],
+            "ok": bool(ok),
+            "error": error or ("" if ok else "save failed"),
+            "load_ms": round(((job["loaded"] or now) - job["started"]) * 1000, 1),
+            "total_ms": round((now - job["started"]) * 1000, 1),
+            "file": job["path"] if ok else "",
+        }
+        self.results.append(result)
+        if not ok:
+            self.failures += 1
+            view.stop()
+        status = "ok" if ok else result["error"]
+        print(f"[{len(self.results)}/{self.total}] {result['total_ms']:.0f} мс  {status}  {job['url']}", flush=True)
+        self.render_next(view)
+
+    def finish(self):
+        elapsed = time.perf_counter() - self.started
+        report_path = os.path.join(self.out_dir, "timings.csv")
+        try:
+            with open(report_path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=["url", "ok", "error", "load_ms", "total_ms", "file"])
+                writer.writeheader()
+                writer.writerows(self.results)
+        except OSError as e:
+            print(f"Не удалось сохранить отчёт: {e}")
+        rate = len(self.results) / elapsed * 60 if elapsed > 0 else 0
+        print(f"Готово: {len(self.results) - self.failures} из {self.total} за {elapsed:.1f} с ({rate:.0f} стр./мин)")
+        self.finished.emit(1 if self.failures else 0)
+
+def parse_command_line(argv):
+    parser = argparse.ArgumentParser(prog="flykit.py")
+    parser.add_argument("--headless", action="store_true", help="рендер списка адресов без окна")
+    parser.add_argument("--urls", help="файл со списком адресов, по одному в строке")
+    parser.add_argument("--out", default="flykit-render", help="папка для результатов")
+    parser.add_argument("--format", choices=["png", "pdf"], default="png")
+    parser.add_argument("--jobs", type=int, default=4, help="сколько страниц рендерить одновременно")
+    parser.add_argument("--timeout", type=float, default=30, help="лимит на одну страницу, секунды")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=900)
+    args, unknown = parser.parse_known_args(argv)
+    if args.headless and not args.urls:
+        parser.error("--headless требует --urls")
+    return args
+
+def run_headless(app, args):
+    try:
+        with open(args.urls, "r", encoding="utf-8") as f:
+            urls = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    except OSError as e:
+        print(f"Не удалось прочитать список адресов: {e}")
+        return 2
+    renderer = HeadlessRenderer(urls, args.out, args.format, args.jobs, args.timeout,
+                                QSize(args.width, args.height))
+    renderer.finished.connect(app.exit)
+    QTimer.singleShot(0, renderer.start)
+    return app.exec_()
+
+HOMEPAGE_CACHE_DIR = os.path.join(CACHE_DIR, "homepage")
+
+class HomepageCache(QObject):
+    # Домашняя страница отдаётся из локальной копии сразу, а проверяется на сервере в фоне
+    REVALIDATE_INTERVAL = 60
+    # setContent передаёт страницу через data: URL, больше Chromium не примет
+    CONTENT_LIMIT = 2 * 1024 * 1024 - 1024
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.network = QNetworkAccessManager(self)
+        self.meta_path = os.path.join(HOMEPAGE_CACHE_DIR, "meta.json")
+        self.page_path = os.path.join(HOMEPAGE_CACHE_DIR, "index.html")
+        self.reply = None
+        self.checked = 0
+        self.content = None
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                self.meta = json.load(f)
+            with open(self.page_path, "rb") as f:
+                self.content = f.read()
+        except (OSError, ValueError, KeyError):
+            self.meta = {}
+
+    def has(self, url):
+        return self.content is not None and self.meta.get("url") == url and len(self.content) <= self.CONTENT_LIMIT
+
+    def show(self, browser, qurl):
+        # Копия открывается под настоящим адресом: у страницы остаются её origin, cookies и хранилище
+        if not self.has(qurl.toString()):
+            return False
+        browser.setContent(QByteArray(self.content), self.meta.get("content_type") or "text/html", qurl)
+        return True
+
+    def revalidate(self, url):
+        if self.reply is not None:
+            if self.reply.url() == QUrl(url):
+                return
+            # Домашнюю страницу сменили — старый запрос больше не нужен
+            reply = self.reply
+            self.reply = None
+            reply.abort()
+            reply.deleteLater()
+        if time.monotonic() - self.checked < self.REVALIDATE_INTERVAL and self.has(url):
+            return
+        self.checked = time.monotonic()
+        request = QNetworkRequest(QUrl(url))
+        request.setAttribute(QNetworkRequest.FollowRedirectsAttribute, True)
+        if self.meta.get("url") == url:
+            if self.meta.get("etag"):
+                request.setRawHeader(b"If-None-Match", self.meta["etag"].encode("latin-1"))
+            if self.meta.get("last_modified"):
+                request.setRawHeader(b"If-Modified-Since", self.meta["last_modified"].encode("latin-1"))
+        self.reply = self.network.get(request)
+        self.reply.finished.connect(lambda reply=self.reply: self.revalidated(reply, url))
+
+    def revalidated(self, reply, url):
+        if reply is not self.reply:
+            return
+        self.reply = None
+        reply.deleteLater()
+        status = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
+        if status == 304 or reply.error() != QNetworkReply.NoError or status != 200:
+            return
+        content = bytes(reply.readAll())
+        meta = {
+            "url": url,
+            "etag": bytes(reply.rawHeader(b"ETag")).decode("latin-1"),
+            "last_modified": bytes(reply.rawHeader(b"Last-Modified")).decode("latin-1"),
+            "content_type": bytes(reply.rawHeader(b"Content-Type")).decode("latin-1"),
+            "fetched": time.time(),
+        }
+        try:
+            os.makedirs(HOMEPAGE_CACHE_DIR, exist_ok=True)
+            write_file_atomic(self.page_path, content)
+            write_json_atomic(self.meta_path, meta)
+        except OSError as e:
+            print(f"Не удалось сохранить домашнюю страницу: {e}")
+            return
+        self.meta = meta
+        self.content = content
+
+class WebViewPool(QObject):
+    # Заранее созданные вкладки: виджет и процесс рендера уже готовы к первому переходу
+    def __init__(self, web_channel, size=2, busy=None, parent=None):
+        super().__init__(parent)
+        self.web_channel = web_channel
+        self.size = max(size, 0)
+        self.busy = busy
+        self.views = []
+        self.refill_timer = QTimer(self)
+        self.refill_timer.setSingleShot(True)
+        self.refill_timer.setInterval(1000)
+        self.refill_timer.timeout.connect(self.refill)
+        QApplication.instance().aboutToQuit.connect(self.clear)
+        self.schedule_refill()
+
+    def create(self):
+        view = QWebEngineView()
+        view.page().setWebChannel(self.web_channel, EXTENSION_WORLD)
+        return view
+
+    def take(self):
+        pooled = bool(self.views)
+        view = self.views.pop() if pooled else self.create()
+        if pooled:
+            self.forget_blank(view)
+        self.schedule_refill()
+        return view, pooled
+
+    @staticmethod
+    def forget_blank(view):
+        # about:blank из пула не должен оставаться в истории: первое «Назад» вело бы на пустую страницу
+        blank = QUrl("about:blank")
+        
+        def clear_history(*args):
+            history = view.history()
+            if view.url() != blank and history.count() > 1 and history.itemAt(0).url() == blank:
+                history.clear()
+        
+        def finished(ok):
+            if view.url() == blank:
+                return
+            clear_history()
+            view.urlChanged.disconnect(clear_history)
+            view.loadFinished.disconnect(finished)
+        
+        view.urlChanged.connect(clear_history)
+        view.loadFinished.connect(finished)
+
+    def schedule_refill(self):
+        if len(self.views) < self.size and not self.refill_timer.isActive():
+            self.refill_timer.start()
+
+    def refill(self):
+        # По одной вкладке и только пока ничего не грузится, чтобы не отнимать время у открытых страниц
+        if len(self.views) >= self.size:
+            return
+        if self.busy is not None and self.busy():
+            self.refill_timer.start()
+            return
+        view = self.create()
+        # about:blank запускает процесс рендера заранее
+        view.setUrl(QUrl("about:blank"))
+        self.views.append(view)
+        self.schedule_refill()
+
+    def clear(self):
+        self.refill_timer.stop()
+        for view in self.views:
+            view.deleteLater()
+        self.views = []
+
+def load_content_filter():
+    if not load_settings().get("content_blocking", True):
+        return None
+    filter_lists = [os.path.join(FILTERS_DIR, name) for name in os.listdir(FILTERS_DIR)
+                    if name.endswith(".txt")]
+    return ContentFilter.load(filter_lists)
+
+class StartupSignals(QObject):
+    done = pyqtSignal(object)
+
+class StartupJob(QRunnable):
+    # Настройки, списки фильтров и расширения читаются в фоне, пока главный поток рисует окно
+    def __init__(self, signals):
+        super().__init__()
+        self.signals = signals
+
+    def run(self):
+        started = time.perf_counter()
+        result = {"settings": load_settings(), "content_filter": None, "extensions": [], "suffixes": None}
+        try:
+            result["content_filter"] = load_content_filter()
+        except Exception as e:
+            print(f"Не удалось загрузить списки фильтров: {e}")
+        try:
+            result["extensions"] = scan_extensions()
+        except Exception as e:
+            print(f"Не удалось прочитать расширения: {e}")
+        if os.path.exists(PUBLIC_SUFFIX_FILE):
+            try:
+                result["suffixes"] = PublicSuffixIndex.load()
+            except Exception as e:
+                print(f"Не удалось загрузить список публичных суффиксов: {e}")
+        result["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        self.signals.done.emit(result)
+
+class Browser(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.startup_mark = time.perf_counter()
+        self.startup_timings = []
+        self.tab_load_times = {}
+        self.cache_sizes = ({}, 0)
+        self.setWindowTitle("Flykit Browser")
+        self.setWindowFlags(Qt.FramelessWindowHint)
+        self.resize(1280, 860)
+
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        main_layout = QVBoxLayout(central_widget)
+        main_layout.setContentsMargins(0, 0, 0, 0)
+        main_layout.setSpacing(0)
+
+        self.title_bar = CustomTitleBar(self)
+        main_layout.addWidget(self.title_bar)
+        
+        self.tab_widget = QTabWidget()
+        self.tab_widget.setTabBar(self.title_bar.tab_bar)
+        self.tab_widget.setDocumentMode(True)
+        self.tab_widget.setStyleSheet("""
+            QTabWidget::pane {
+                border: none;
+                background-color: white;
+            }
+        """)
+        
+        self.title_bar.new_tab_btn.clicked.connect(lambda: self.add_new_tab())
+        self.title_bar.tab_bar.tabCloseRequested.connect(self.close_tab)
+        self.title_bar.tab_bar.currentChanged.connect(self.tab_changed)
+        self.title_bar.tab_bar.tabMoved.connect(self.invalidate_tab_indices)
+        self.title_bar.tab_bar.tabBarClicked.connect(self.capture_current_thumbnail)
+        
+        # Обновления заголовков и адреса копятся и применяются раз в кадр
+        self.tab_indices = {}
+        self.tab_indices_dirty = True
+        self.pending_titles = {}
+        self.pending_url = None
+        self.tab_search_index = TabSearchIndex()
+        self.page_text_index = PageTextIndex(self)
+        self.thumbnail_cache = ThumbnailCache(parent=self)
+        self.favicon_store = FaviconStore(self)
+        app_icon = self.favicon_store.icon_for(QUrl(HOMEPAGE_URL).host())
+        if app_icon is not None:
+            self.setWindowIcon(app_icon)
+        self.title_bar.tab_bar.thumbnail_provider = self.tab_thumbnail
+        self.ui_update_timer = QTimer(self)
+        self.ui_update_timer.setSingleShot(True)
+        self.ui_update_timer.setInterval(16)
+        self.ui_update_timer.timeout.connect(self.flush_tab_updates)
+        self.background_update_timer = QTimer(self)
+        self.background_update_timer.setSingleShot(True)
+        self.background_update_timer.setInterval(1000)
+        self.background_update_timer.timeout.connect(self.flush_tab_updates)
+        
+        toolbar = QToolBar()
+        toolbar.setMovable(False)
+        toolbar.setStyleSheet("""
+            QToolBar {
+                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+                    stop:0 #ffffff, stop:1 #f8f9fa);
+                border: none;
+                border-bottom: 1px solid #e8eaed;
+                spacing: 4px;
+                padding: 12px 16px;
+                min-height: 56px;
+            }
+            QToolButton {
+                background-color: transparent;
+                border: none;
+                border-radius: 20px;
+                padding: 8px;
+                margin: 0px 2px;
+                color: #5f6368;
+                font-size: 20px;
+                min-width: 40px;
+                min-height: 40px;
+            }
+            QToolButton:hover {
+                background-color: #f1f3f4;
+                color: #202124;
+            }
+            QToolButton:pressed {
+                background-color: #e8eaed;
+            }
+        """)
+        self.addToolBar(toolbar)
+
+        back_action = QAction("←", self)
+        back_action.triggered.connect(self.browser_back)
+        toolbar.addAction(back_action)
+
+        forward_action = QAction("→", self)
+        forward_action.triggered.connect(self.browser_forward)
+        toolbar.addAction(forward_action)
+
+        reload_action = QAction("⟳", self)
+        reload_action.triggered.connect(self.browser_reload)
+        toolbar.addAction(reload_action)
+
+        toolbar.addSeparator()
+
+        self.urlbar = QLineEdit()
+        self.urlbar.setPlaceholderText("Поиск в Google или введите URL")
+        self.urlbar.setMinimumHeight(44)
+        self.urlbar.setStyleSheet("""
+            QLineEdit {
+                border: 1px solid #e8eaed;
+                border-radius: 22px;
+                padding: 0px 20px;
+                background-color: white;
+                font-size: 14px;
+                color: #202124;
+                font-family: 'Segoe UI', Arial, sans-serif;
+                selection-background-color: #d2e3fc;
+            }
+            QLineEdit:hover {
+                border-color: #dadce0;
+            }
+            QLineEdit:focus {
+                border: 2px solid #1a73e8;
+                padding: 0px 19px;
+                background-color: white;
+            }
+        """)
+        self.urlbar.returnPressed.connect(self.urlbar_return_pressed)
+        toolbar.addWidget(self.urlbar)
+        
+        # Подсказки поиска приходят асинхронно и не мешают вводу
+        self.suggestion_model = QStringListModel(self)
+        self.completer = QCompleter(self.suggestion_model, self)
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.completer.setMaxVisibleItems(SearchSuggestions.LIMIT)
+        self.completer.activated[str].connect(self.suggestion_activated)
+        self.suggestion_navigated = False
+        self.urlbar.setCompleter(self.completer)
+        self.search_suggestions = SearchSuggestions(load_settings().get("suggest_url", SUGGEST_URL), self)
+        self.search_suggestions.suggestions.connect(self.show_suggestions)
+        self.urlbar.textEdited.connect(self.search_suggestions.request)
+        # Полный список суффиксов подгружается в фоне, до этого работает встроенный
+        self.input_classifier = InputClassifier(PublicSuffixIndex.builtin(), load_settings().get("intranet_hosts", []))
+
+        toolbar.addSeparator()
+
+        offline_action = QAction("⤓", self)
+        offline_action.setToolTip("Сохранить для офлайн-доступа")
+        offline_action.triggered.connect(self.keep_offline)
+        toolbar.addAction(offline_action)
+
+        tab_search_action = QAction("⌕", self)
+        tab_search_action.setShortcut("Ctrl+Shift+A")
+        tab_search_action.triggered.connect(self.show_tab_switcher)
+        toolbar.addAction(tab_search_action)
+
+        text_search_action = QAction("¶", self)
+        text_search_action.setShortcut("Ctrl+Shift+F")
+        text_search_action.setToolTip("Поиск по тексту вкладок")
+        text_search_action.triggered.connect(self.show_text_search)
+        toolbar.addAction(text_search_action)
+
+        tab_overview_action = QAction("▦", self)
+        tab_overview_action.setShortcut("Ctrl+Shift+O")
+        tab_overview_action.triggered.connect(self.show_tab_overview)
+        toolbar.addAction(tab_overview_action)
+
+        extensions_action = QAction("⋮", self)
+        extensions_action.triggered.connect(self.show_extensions_manager)
+        toolbar.addAction(extensions_action)
+
+        self.current_browser = None
+        
+        main_layout.addWidget(toolbar)
+        main_layout.addWidget(self.tab_widget)
+        self.mark_startup("ui")
+
+        # Движок запускается после первой отрисовки окна, файлы читаются в фоне
+        self.engine_ready = False
+        self.startup_result = None
+        self.startup_complete = False
+        self.deferred_navigations = []
+        self.time_to_first_paint = None
+        self.startup_signals = StartupSignals(self)
+        self.startup_signals.done.connect(self.startup_loaded)
+        QThreadPool.globalInstance().start(StartupJob(self.startup_signals))
+        self.urlbar.installEventFilter(self)
+        QTimer.singleShot(500, self.start_engine)
+    
+    def eventFilter(self, obj, event):
+        if obj is self.urlbar and event.type() == QEvent.Paint and self.time_to_first_paint is None:
+            self.time_to_first_paint = round((time.perf_counter() - PROCESS_STARTED) * 1000, 1)
+            self.mark_startup("first_paint")
+            QTimer.singleShot(0, self.start_engine)
+        return super().eventFilter(obj, event)
+    
+    def start_engine(self):
+        if self.engine_ready:
+            return
+        self.profile = QWebEngineProfile.defaultProfile()
+        self.apply_web_settings()
+        settings = load_settings()
+        self.offline_store = OfflineStore(self.profile, settings.get("offline_budget_mb", 200),
+                                          settings.get("offline_refresh_hours", 12), self)
+        self.offline_slow_ms = settings.get("offline_slow_timeout_ms", 4000)
+        self.offline_watch = {}
+        self.network_state = QNetworkConfigurationManager(self)
+        self.request_interceptor = RequestInterceptorChain(self)
+        self.content_filter = None
+        self.network_log = NetworkLog(self)
+        if settings.get("network_log", True):
+            self.network_log.attach(self.request_interceptor)
+            self.profile.scripts().insert(network_timing_script())
+        self.profile.setUrlRequestInterceptor(self.request_interceptor)
+        self.scheme_handler = InternalSchemeHandler(self)
+        self.scheme_handler.register_page("performance", PERFORMANCE_PAGE)
+        self.scheme_handler.register_endpoint("performance/data.json", self.performance_data)
+        self.stall_watchdog = StallWatchdog(load_settings().get("stall_threshold_ms", 500), parent=self)
+        self.scheme_handler.register_endpoint("stalls", self.stall_watchdog.summary_page,
+                                              b"text/html; charset=utf-8")
+        self.homepage_cache = HomepageCache(self)
+        self.homepage_tabs = set()
+        self.page_metrics = PageMetricsStore(parent=self)
+        self.page_metrics_origins = {}
+        self.scheme_handler.register_endpoint("metrics", self.page_metrics.summary_page,
+                                              b"text/html; charset=utf-8")
+        self.scheme_handler.register_endpoint("metrics/data.json", self.page_metrics.export_json)
+        self.scheme_handler.register_endpoint("metrics/data.csv", self.page_metrics.export_csv,
+                                              b"text/csv; charset=utf-8")
+        self.scheme_handler.register_endpoint("network", lambda: self.network_log.summary_page(self.tab_pages()),
+                                              b"text/html; charset=utf-8")
+        self.scheme_handler.register_endpoint("network/har.json", lambda: json.dumps(
+            self.network_log.har(self.tab_pages()), ensure_ascii=False).encode("utf-8"))
+        for scheme in INTERNAL_SCHEMES:
+            self.profile.installUrlSchemeHandler(scheme, self.scheme_handler)
+        self.mark_startup("scheme_handler")
+        self.setup_extension_api()
+        self.new_tab_started = {}
+        self.new_tab_times = deque(maxlen=50)
+        self.view_pool = WebViewPool(self.web_channel, load_settings().get("view_pool_size", 2),
+                                     lambda: not self.startup_complete or
+                                     any(timing["ms"] is None for timing in self.tab_load_times.values()),
+                                     self)
+        self.profile.downloadRequested.connect(self.handle_download)
+        self.engine_ready = True
+        self.mark_startup("engine")
+        
+        # Вкладка создаётся, пока фоновый поток читает расширения; переход начнётся после регистрации скриптов
+        self.add_new_tab()
+        self.mark_startup("first_tab")
+        self.finish_startup()
+        self.stall_watchdog.start()
+    
+    def refresh_public_suffixes(self):
+        # Список обновляется раз в месяц
+        try:
+            if time.time() - os.path.getmtime(PUBLIC_SUFFIX_FILE) < 30 * 24 * 3600:
+                return
+        except OSError:
+            pass
+        self.suffix_network = QNetworkAccessManager(self)
+        request = QNetworkRequest(QUrl(PUBLIC_SUFFIX_URL))
+        request.setAttribute(QNetworkRequest.FollowRedirectsAttribute, True)
+        reply = self.suffix_network.get(request)
+        reply.finished.connect(lambda: self.public_suffixes_fetched(reply))
+    
+    def public_suffixes_fetched(self, reply):
+        reply.deleteLater()
+        if reply.error() != QNetworkReply.NoError:
+            print(f"Не удалось скачать список публичных суффиксов: {reply.errorString()}")
+            return
+        try:
+            write_file_atomic(PUBLIC_SUFFIX_FILE, bytes(reply.readAll()))
+            self.set_public_suffixes(PublicSuffixIndex.load())
+        except OSError as e:
+            print(f"Не удалось сохранить список публичных суффиксов: {e}")
+    
+    def set_public_suffixes(self, suffixes):
+        self.input_classifier.suffixes = suffixes
+        if self.content_filter is not None:
+            self.content_filter.set_suffixes(suffixes)
+    
+    def startup_loaded(self, result):
+        self.startup_result = result
+        self.finish_startup()
+    
+    def finish_startup(self):
+        if self.startup_complete or not self.engine_ready or self.startup_result is None:
+            return
+        result = self.startup_result
+        self.startup_timings.append(("background_load", result["ms"]))
+        self.setup_content_blocking(result["content_filter"])
+        self.load_extensions(result["extensions"])
+        if result["suffixes"] is not None:
+            self.set_public_suffixes(result["suffixes"])
+        self.mark_startup("extensions")
+        self.startup_complete = True
+        QTimer.singleShot(60000, self.refresh_public_suffixes)
+        
+        for browser, qurl in self.deferred_navigations:
+            if self.tab_index(browser) >= 0:
+                self.load_url(browser, qurl)
+        self.deferred_navigations = []
+        self.homepage_tabs.clear()
+    
+    def mark_startup(self, phase):
+        now = time.perf_counter()
+        self.startup_timings.append((phase, round((now - self.startup_mark) * 1000, 1)))
+        self.startup_mark = now
+    
+    def performance_data(self):
+        tabs = []
+        pids = set()
+        for i in range(self.tab_widget.count()):
+            view = self.tab_widget.widget(i)
+            pid = view.page().renderProcessPid() if isinstance(view, QWebEngineView) else 0
+            if pid:
+                pids.add(pid)
+            title, url = self.tab_search_index.entry(view) if view in self.tab_search_index.entries else ("", "")
+            tabs.append({"title": title, "url": url, "load_ms": self.tab_load_times.get(view, {}).get("ms"),
+                         "pid": pid or None})
+        
+        scripts = {}
+        for script in self.profile.scripts().toList():
+            scripts[script.name()] = scripts.get(script.name(), 0) + 1
+        
+        # Размер кэша пересчитываем не чаще раза в 10 секунд
+        cache, measured = self.cache_sizes
+        if time.monotonic() - measured > 10:
+            cache = {"cache": 0}
+            for entry in os.scandir(CACHE_DIR):
+                if entry.is_dir(follow_symlinks=False):
+                    cache[entry.name] = directory_size(entry.path)
+                else:
+                    cache["cache"] += entry.stat(follow_symlinks=False).st_size
+            self.cache_sizes = (cache, time.monotonic())
+        
+        return json.dumps({
+            "startup": [{"phase": phase, "ms": ms} for phase, ms in self.startup_timings],
+            "time_to_first_paint_ms": self.time_to_first_paint,
+            "tabs": tabs,
+            "new_tabs": list(self.new_tab_times),
+            "renderers": [{"pid": pid, "memory": process_memory(pid)} for pid in sorted(pids)],
+            "scripts": scripts,
+            "cache": cache,
+            "engine": {"settings": engine_settings(),
+                       "flags": os.environ.get("QTWEBENGINE_CHROMIUM_FLAGS", "").split()},
+        }).encode("utf-8")
+    
+    def apply_web_settings(self):
+        engine = engine_settings()
+        web_settings = self.profile.settings()
+        gpu_enabled = engine["gpu"] == "auto"
+        web_settings.setAttribute(QWebEngineSettings.WebGLEnabled, gpu_enabled)
+        web_settings.setAttribute(QWebEngineSettings.Accelerated2dCanvasEnabled, gpu_enabled)
+        web_settings.setAttribute(QWebEngineSettings.DnsPrefetchEnabled, bool(engine["dns_prefetch"]))
+    
+    def setup_extension_api(self):
+        self.extension_files = ExtensionFileStore()
+        self.extension_scripts = []
+        self.extension_updater = ExtensionUpdater(self.extension_files, self)
+        self.extension_updater.updated.connect(lambda ext_id, version: self.load_extensions())
+        
+        # Первая проверка обновлений — после запуска, затем по расписанию
+        interval_hours = load_settings().get("extension_update_interval_hours", 6)
+        self.extension_update_timer = QTimer(self)
+        self.extension_update_timer.setInterval(int(interval_hours * 3600 * 1000))
+        self.extension_update_timer.timeout.connect(self.extension_updater.check_all)
+        if interval_hours > 0:
+            self.extension_update_timer.start()
+            QTimer.singleShot(30000, self.extension_updater.check_all)
+        self.extension_storage = ExtensionStorage(EXTENSION_STORAGE_FILE, self)
+        self.extension_storage_bridge = ExtensionStorageBridge(self.extension_storage, self)
+        self.web_channel = QWebChannel(self)
+        self.extension_storage_bridge.attach(self.web_channel)
+        
+        settings = load_settings()
+        self.extension_runtime = ExtensionRuntimeMonitor(self.extension_storage_bridge,
+                                                         settings.get("extension_time_budget_ms", 50),
+                                                         settings.get("extension_budget_strikes", 3), self)
+        self.extension_runtime.over_budget.connect(self.extension_over_budget)
+        self.web_channel.registerObject("extensionRuntime", self.extension_runtime)
+    
+    def setup_content_blocking(self, content_filter):
+        if content_filter is None:
+            return
+        self.content_filter = content_filter
+        self.ad_block_filter = AdBlockFilter(self.content_filter)
+        self.request_interceptor.filters.append(self.ad_block_filter)
+    
+    def add_new_tab(self, url=None):
+        started = time.time()
+        browser, pooled = self.view_pool.take()
+        self.new_tab_started[browser] = (started, pooled)
+        self.network_log.add_tab(browser)
+        
+        if url is None:
+            url = load_settings().get("homepage", HOMEPAGE_URL)
+            # Локальная копия открывается сразу, свежая версия достанется следующей вкладке
+            if url.startswith("http"):
+                self.homepage_tabs.add(browser)
+                self.homepage_cache.revalidate(url)
+        
+        self.load_url(browser, QUrl(url))
+        browser.urlChanged.connect(lambda q: self.tab_search_index.update(browser, url=q.toString()))
+        browser.urlChanged.connect(lambda q: self.schedule_urlbar_update(browser, q))
+        browser.urlChanged.connect(lambda q: self.network_log.track(browser, q.toString()))
+        browser.titleChanged.connect(lambda title: self.update_tab_title(browser, title))
+        browser.iconChanged.connect(lambda icon: self.update_tab_icon(browser, icon))
+        browser.loadStarted.connect(lambda: self.tab_load_started(browser))
+        browser.loadFinished.connect(lambda ok: self.tab_load_finished(browser, ok))
+        
+        self.capture_current_thumbnail()
+        index = self.tab_widget.addTab(browser, "Новая вкладка")
+        self.invalidate_tab_indices()
+        self.tab_search_index.update(browser, title="", url=url)
+        cached_icon = self.favicon_store.icon_for(QUrl(url).host())
+        if cached_icon is not None:
+            self.tab_widget.setTabIcon(index, cached_icon)
+        self.tab_widget.setCurrentIndex(index)
+        self.current_browser = browser
+        
+        return browser
+    
+    def close_tab(self, index):
+        if self.tab_widget.count() > 1:
+            widget = self.tab_widget.widget(index)
+            if widget is not self.current_browser:
+                self.capture_current_thumbnail()
+            self.invalidate_tab_indices()
+            self.tab_widget.removeTab(index)
+            self.pending_titles.pop(widget, None)
+            self.tab_search_index.remove(widget)
+            self.page_text_index.remove(widget)
+            self.page_metrics_origins.pop(widget, None)
+            self.new_tab_started.pop(widget, None)
+            self.network_log.remove_tab(widget)
+            self.tab_load_times.pop(widget, None)
+            self.offline_watch.pop(widget, None)
+            widget.deleteLater()
+        else:
+            self.close()
+    
+    def tab_changed(self, index):
+        if index >= 0:
+            self.current_browser = self.tab_widget.widget(index)
+            self.pending_url = None
+            self.update_window_icon(self.tab_widget.tabIcon(index))
+            if self.current_browser:
+                self.update_urlbar(self.current_browser.url())
+                if self.current_browser in self.pending_titles:
+                    self.ui_update_timer.start()
+    
+    def tab_load_started(self, browser):
+        self.tab_load_times[browser] = {"started": time.perf_counter(), "ms": None}
+    
+    def tab_load_finished(self, browser, ok=True):
+        timing = self.tab_load_times.get(browser)
+        if timing and timing["ms"] is None:
+            timing["ms"] = round((time.perf_counter() - timing["started"]) * 1000, 1)
+        new_tab = self.new_tab_started.pop(browser, None)
+        if new_tab is not None:
+            self.measure_new_tab(browser, *new_tab)
+        
+        # Сеть не ответила — показываем сохранённую копию
+        url = self.offline_watch.pop(browser, None) or browser.url().toString()
+        if not ok and self.offline_store.is_kept(url):
+            browser.setUrl(self.offline_store.snapshot_url(url))
+        elif ok:
+            self.page_text_index.schedule(browser)
+            if browser.url().scheme() in ("http", "https"):
+                # loadEventEnd и отрисовка заполняются чуть позже loadFinished
+                QTimer.singleShot(500, lambda: self.collect_page_metrics(browser))
+    
+    def measure_new_tab(self, browser, started, pooled, attempts=10):
+        # Задержка новой вкладки — от нажатия до первой отрисовки страницы
+        def painted(result):
+            if isinstance(result, (int, float)):
+                self.new_tab_times.append({"ms": round(result - started * 1000, 1), "pooled": pooled})
+            elif attempts > 1:
+                QTimer.singleShot(100, lambda: self.measure_new_tab(browser, started, pooled, attempts - 1))
+        
+        if self.tab_index(browser) >= 0:
+            browser.page().runJavaScript(FIRST_PAINT_JS, QWebEngineScript.ApplicationWorld, painted)
+    
+    def tab_pages(self):
+        return {view: self.tab_search_index.entry(view) for view in self.network_log.tab_ids
+                if view in self.tab_search_index.entries}
+    
+    def collect_page_metrics(self, browser):
+        if self.tab_index(browser) < 0:
+            return
+        url = browser.url()
+        settings = load_settings()
+        if settings.get("page_metrics", True):
+            browser.page().runJavaScript(PAGE_METRICS_JS, QWebEngineScript.ApplicationWorld,
+                                         lambda result: self.page_metrics_collected(browser, url, result))
+        if settings.get("network_log", True):
+            browser.page().runJavaScript(NETWORK_TIMING_JS, QWebEngineScript.ApplicationWorld,
+                                         lambda result: self.network_log.merge_timings(browser, result))
+    
+    def page_metrics_collected(self, browser, url, result):
+        if not result:
+            return
+        try:
+            sample = json.loads(result)
+        except ValueError:
+            return
+        # Один и тот же переход учитываем один раз
+        if self.page_metrics_origins.get(browser) == sample.get("origin"):
+            return
+        self.page_metrics_origins[browser] = sample.get("origin")
+        self.page_metrics.add(url.host(), url.toString(QUrl.RemoveQuery | QUrl.RemoveFragment), sample)
+    
+    def load_url(self, browser, qurl):
+        if not self.startup_complete:
+            # Скрипты расширений и фильтры должны быть готовы до первого перехода
+            self.deferred_navigations.append((browser, qurl))
+            return
+        url = qurl.toString()
+        self.network_log.track(browser, url)
+        if browser in self.homepage_tabs:
+            self.homepage_tabs.discard(browser)
+            if self.homepage_cache.show(browser, qurl):
+                return
+        if not self.offline_store.is_kept(url):
+            browser.setUrl(qurl)
+            return
+        if not self.network_state.isOnline():
+            browser.setUrl(self.offline_store.snapshot_url(url))
+            return
+        browser.setUrl(qurl)
+        self.offline_watch[browser] = url
+        QTimer.singleShot(self.offline_slow_ms, lambda: self.offline_timeout(browser, url))
+    
+    def offline_timeout(self, browser, url):
+        # Страница грузится слишком долго — переключаемся на локальную копию
+        if self.offline_watch.get(browser) == url:
+            del self.offline_watch[browser]
+            # Копию могли вытеснить, пока страница грузилась
+            if self.offline_store.is_kept(url):
+                browser.setUrl(self.offline_store.snapshot_url(url))
+    
+    def keep_offline(self):
+        if not self.current_browser:
+            return
+        url = self.current_browser.url().toString()
+        if not url.startswith("http"):
+            return
+        if self.offline_store.is_kept(url):
+            reply = QMessageBox.question(self, "Офлайн-копия", "Удалить сохранённую копию страницы?",
+                                         QMessageBox.Yes | QMessageBox.No)
+            if reply == QMessageBox.Yes:
+                self.offline_store.remove(url)
+            return
+        self.offline_store.keep(self.current_browser.page(), url, self.current_browser.title())
+    
+    def update_tab_icon(self, browser, icon):
+        if icon.isNull():
+            return
+        host = browser.url().host()
+        icon = self.favicon_store.store(host, icon)
+        if host == QUrl(HOMEPAGE_URL).host():
+            self.setWindowIcon(icon)
+        index = self.tab_index(browser)
+        if index >= 0:
+            self.tab_widget.setTabIcon(index, icon)
+        if browser is self.current_browser:
+            self.update_window_icon(icon)
+    
+    def update_window_icon(self, icon):
+        if icon.isNull():
+            self.title_bar.icon_label.clear()
+        else:
+            self.title_bar.icon_label.setPixmap(icon.pixmap(16, 16))
+    
+    def tab_url(self, view):
+        if view in self.tab_search_index.entries:
+            return self.tab_search_index.entry(view)[1]
+        return ""
+    
+    def capture_current_thumbnail(self, *args):
+        # Снимок делается, пока вкладка ещё видима: после переключения она уже скрыта
+        if self.current_browser is not None and self.current_browser.isVisible():
+            self.thumbnail_cache.capture(self.tab_url(self.current_browser), self.current_browser)
+    
+    def switch_to_tab(self, index):
+        if index >= 0 and index != self.tab_widget.currentIndex():
+            self.capture_current_thumbnail()
+            self.tab_widget.setCurrentIndex(index)
+    
+    def tab_thumbnail(self, index):
+        return self.thumbnail_cache.get(self.tab_url(self.tab_widget.widget(index)))
+    
+    def invalidate_tab_indices(self, *args):
+        self.tab_indices_dirty = True
+    
+    def tab_index(self, browser):
+        if self.tab_indices_dirty:
+            self.tab_indices = {self.tab_widget.widget(i): i for i in range(self.tab_widget.count())}
+            self.tab_indices_dirty = False
+        return self.tab_indices.get(browser, -1)
+    
+    def update_tab_title(self, browser, title):
+        self.pending_titles[browser] = title
+        if browser is self.current_browser:
+            if not self.ui_update_timer.isActive():
+                self.ui_update_timer.start()
+        elif not self.background_update_timer.isActive():
+            # Фоновые вкладки с «тикающими» заголовками обновляем редко
+            self.background_update_timer.start()
+    
+    def schedule_urlbar_update(self, browser, q):
+        if browser is not self.current_browser:
+            return
+        self.pending_url = q
+        if not self.ui_update_timer.isActive():
+            self.ui_update_timer.start()
+    
+    def flush_tab_updates(self):
+        if self.pending_url is not None:
+            self.update_urlbar(self.pending_url)
+            self.pending_url = None
+        
+        if self.background_update_timer.isActive():
+            pending = [(self.current_browser, self.pending_titles.pop(self.current_browser))] \
+                if self.current_browser in self.pending_titles else []
+        else:
+            pending = list(self.pending_titles.items())
+            self.pending_titles.clear()
+        
+        for browser, title in pending:
+            index = self.tab_index(browser)
+            if index < 0:
+                continue
+            self.tab_search_index.update(browser, title=title)
+            # Truncate long titles
+            if len(title) > 20:
+                title = title[:20] + "..."
+            if self.tab_widget.tabText(index) != title:
+                self.tab_widget.setTabText(index, title)
+
+    def browser_back(self):
+        if self.current_browser:
+            self.current_browser.back()
+    
+    def browser_forward(self):
+        if self.current_browser:
+            self.current_browser.forward()
+    
+    def browser_reload(self):
+        if self.current_browser:
+            self.current_browser.reload()
+
+    def handle_download(self, download):
+        file_path = download.path()
+        if file_path.endswith('.ebx'):
+            download.accept()
             download.finished.connect(lambda: self.install_extension(download.path()))
         else:
             download.accept()
     
     def install_extension(self, ebx_path):
+        icon_path = None
         try:
-            temp_dir = os.path.join(EXTENSIONS_DIR, "temp_extract")
-            os.makedirs(temp_dir, exist_ok=True)
-            
             with zipfile.ZipFile(ebx_path, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
-            
-            manifest_path = os.path.join(temp_dir, "manifest.json")
-            if not os.path.exists(manifest_path):
-                QMessageBox.warning(self, "Ошибка", "Неверный формат расширения: отсутствует manifest.json")
-                shutil.rmtree(temp_dir)
-                return
-            
-            with open(manifest_path, "r", encoding="utf-8") as f:
-                manifest = json.load(f)
-            
-            ext_name = manifest.get("name", "Unknown Extension")
-            ext_id = manifest.get("id", ext_name.lower().replace(" ", "_"))
-            
-            final_dir = os.path.join(EXTENSIONS_DIR, ext_id)
-            if os.path.exists(final_dir):
-                reply = QMessageBox.question(self, "Расширение установлено", 
-                                            f"Расширение '{ext_name}' уже установлено. Удалить его?",
-                                            QMessageBox.Yes | QMessageBox.No)
-                if reply == QMessageBox.Yes:
-                    try:
-                        shutil.rmtree(final_dir)
-                        QMessageBox.information(self, "Успех", "Расширение удалено!")
-                    except PermissionError:
-                        QMessageBox.warning(self, "Ошибка", "Не удалось удалить расширение. Закройте браузер и попробуйте снова.")
-                shutil.rmtree(temp_dir)
-                return
-            
-            icon_path = os.path.join(temp_dir, "icons", "icon48.png")
-            if not os.path.exists(icon_path):
-                icon_path = None
-            
-            dialog = ExtensionInstallDialog(ext_name, icon_path, self)
-            if dialog.exec_() == QDialog.Accepted:
-                shutil.move(temp_dir, final_dir)
-                QMessageBox.information(self, "Успех", f"Расширение '{ext_name}' установлено!")
-                self.load_extensions()
-            else:
-                shutil.rmtree(temp_dir)
+                names = set(zip_ref.namelist())
+                if "manifest.json" not in names:
+                    QMessageBox.warning(self, "Ошибка", "Неверный формат расширения: отсутствует manifest.json")
+                    return
+                
+                manifest = json.loads(zip_ref.read("manifest.json").decode("utf-8"))
+                
+                ext_name = manifest.get("name", "Unknown Extension")
+                ext_id = manifest.get("id", ext_name.lower().replace(" ", "_"))
+                
+                final_dir = os.path.join(EXTENSIONS_DIR, ext_id)
+                if os.path.exists(final_dir):
+                    reply = QMessageBox.question(self, "Расширение установлено", 
+                                                f"Расширение '{ext_name}' уже установлено. Удалить его?",
+                                                QMessageBox.Yes | QMessageBox.No)
+                    if reply == QMessageBox.Yes:
+                        try:
+                            self.extension_files.remove(ext_id)
+                            self.extension_storage.clear(ext_id)
+                            QMessageBox.information(self, "Успех", "Расширение удалено!")
+                        except PermissionError:
+                            QMessageBox.warning(self, "Ошибка", "Не удалось удалить расширение. Закройте браузер и попробуйте снова.")
+                    return
+                
+                # Для диалога достаём только иконку, остальное пишется сразу в хранилище
+                if "icons/icon48.png" in names:
+                    icon_path = os.path.join(CACHE_DIR, "install_icon48.png")
+                    with open(icon_path, "wb") as f:
+                        f.write(zip_ref.read("icons/icon48.png"))
+                
+                dialog = ExtensionInstallDialog(ext_name, icon_path, self)
+                if dialog.exec_() == QDialog.Accepted:
+                    self.extension_files.install_from_zip(ext_id, zip_ref)
+                    QMessageBox.information(self, "Успех", f"Расширение '{ext_name}' установлено!")
+                    self.load_extensions()
         
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось установить расширение: {str(e)}")
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
+        finally:
+            if icon_path and os.path.exists(icon_path):
+                os.remove(icon_path)
+    
+    def set_extension_enabled(self, ext_id, enabled):
+        settings = load_settings()
+        disabled = settings.get("disabled_extensions", [])
+        if enabled and ext_id in disabled:
+            disabled.remove(ext_id)
+            self.extension_runtime.reset(ext_id)
+        elif not enabled and ext_id not in disabled:
+            disabled.append(ext_id)
+        settings["disabled_extensions"] = disabled
+        save_settings(settings)
+        self.load_extensions()
+    
+    def extension_over_budget(self, ext_id):
+        budget = self.extension_runtime.budget_ms
+        if load_settings().get("extension_budget_policy", "warn") == "disable":
+            self.set_extension_enabled(ext_id, False)
+            message = f"Расширение '{ext_id}' превысило лимит {budget} мс на страницу и было отключено."
+        else:
+            message = f"Расширение '{ext_id}' замедляет страницы: больше {budget} мс на страницу."
+        notice = QMessageBox(QMessageBox.Warning, "Медленное расширение", message, QMessageBox.Ok, self)
+        notice.setAttribute(Qt.WA_DeleteOnClose)
+        notice.show()
+    
+    def show_tab_switcher(self):
+        # Диалог читает только индекс, спящие вкладки не трогаются
+        switcher = TabSwitcherDialog(self, self)
+        switcher.exec_()
+    
+    def show_text_search(self):
+        search = PageTextSearchDialog(self, self)
+        search.exec_()
+    
+    def show_tab_overview(self):
+        self.capture_current_thumbnail()
+        overview = TabOverviewDialog(self, self)
+        overview.exec_()
     
     def show_extensions_manager(self):
         manager = ExtensionsManager(self, self)
@@ -805,49 +4980,70 @@ class Browser(QMainWindow):
         url = self.urlbar.text()
 
         if url.startswith("flykit:"):
-            redirect = url.split(":", 1)[1]
-            self.current_browser.setUrl(QUrl(f"https://flykit.itrypro.ru/?data={redirect}"))
+            page = url.split(":", 1)[1].lstrip("/")
+            self.current_browser.setUrl(QUrl(f"flykit://{page}"))
             return
 
         if url.startswith("ut://"):
-            code = url.split("://", 1)[1]
-            self.current_browser.setHtml(f"<h1>Ошибка {code}</h1><p>Служебная страница Flykit</p>")
+            self.current_browser.setUrl(QUrl(url))
             return
 
-        if not url.startswith("http"):
-            url = "https://" + url
+        self.search_suggestions.request("")
+        kind, target = self.input_classifier.classify(url)
+        if kind == "search":
+            if not target:
+                return
+            url = search_url(target)
+        else:
+            url = target
 
-        self.current_browser.setUrl(QUrl(url))
+        self.load_url(self.current_browser, QUrl(url))
+    
+    def show_suggestions(self, query, results):
+        if query != self.urlbar.text().strip() or not self.urlbar.hasFocus():
+            return
+        self.suggestion_model.setStringList(results)
+        if results:
+            self.completer.complete()
+        else:
+            self.completer.popup().hide()
+    
+    def suggestion_activated(self, text):
+        # Enter в списке подсказок дойдёт и до строки адреса — переходим один раз
+        self.urlbar.setText(text)
+        self.suggestion_navigated = True
+        QTimer.singleShot(0, lambda: setattr(self, "suggestion_navigated", False))
+        self.navigate_to_url()
+    
+    def urlbar_return_pressed(self):
+        if not self.suggestion_navigated:
+            self.navigate_to_url()
 
     def update_urlbar(self, q):
-        self.urlbar.setText(q.toString())
+        text = q.toString()
+        if self.urlbar.text() != text:
+            self.urlbar.setText(text)
 
-    def load_extensions(self):
-        for ext_name in os.listdir(EXTENSIONS_DIR):
-            ext_path = os.path.join(EXTENSIONS_DIR, ext_name)
-            if os.path.isdir(ext_path) and ext_name != "temp_extract":
-                manifest_path = os.path.join(ext_path, "manifest.json")
-                if os.path.exists(manifest_path):
-                    with open(manifest_path, "r", encoding="utf-8") as f:
-                        manifest = json.load(f)
-                    
-                    content_js_path = os.path.join(ext_path, "content.js")
-                    if os.path.exists(content_js_path):
-                        with open(content_js_path, "r", encoding="utf-8") as f:
-                            content_js = f.read()
-                        
-                        script = QWebEngineScript()
-                        script.setName(manifest.get("name", ext_name))
-                        script.setSourceCode(content_js)
-                        script.setInjectionPoint(QWebEngineScript.DocumentReady)
-                        script.setWorldId(QWebEngineScript.MainWorld)
-                        script.setRunsOnSubFrames(True)
-                        
-                        self.profile.scripts().insert(script)
+    def load_extensions(self, extensions=None):
+        # Повторная загрузка не должна дублировать скрипты
+        for script in self.extension_scripts:
+            self.profile.scripts().remove(script)
+        self.extension_scripts = extension_content_scripts(self.extension_storage_bridge, extensions)
+        for script in self.extension_scripts:
+            self.profile.scripts().insert(script)
 
 if __name__ == "__main__":
+    prepare_install_dirs()
+    args = parse_command_line(sys.argv[1:])
+    if args.headless:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    apply_engine_settings()
+    register_internal_schemes()
     app = QApplication(sys.argv)
     
+    if args.headless:
+        sys.exit(run_headless(app, args))
+    
     app.setFont(QFont("Segoe UI", 10))
     
     window = Browser()
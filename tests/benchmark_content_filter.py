@@ -0,0 +1,99 @@
+# Замер ContentFilter.should_block на ~100 тыс. правил.
+# Запуск: python tests/benchmark_content_filter.py [easylist.txt ...]
+# Без аргументов строится синтетический список с пропорциями EasyList.
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import flykit
+
+WORDS = ["ad", "ads", "banner", "track", "pixel", "promo", "stat", "metrics", "analytics", "adserver",
+         "sponsor", "beacon", "tag", "pop", "click", "count", "affiliate", "partner", "widget", "advert"]
+
+def name(n):
+    # Буквенные имена, чтобы правила не совпадали с числами в адресах
+    letters = ""
+    while True:
+        n, rest = divmod(n, 26)
+        letters += "abcdefghijklmnopqrstuvwxyz"[rest]
+        if not n:
+            return letters
+
+def synthetic_rules(count=100000, seed=1):
+    random.seed(seed)
+    rules = []
+    while len(rules) < count:
+        n = name(len(rules))
+        word = random.choice(WORDS)
+        roll = random.random()
+        if roll < 0.55:
+            rules.append(f"||host{n}.example{len(rules) % 97}.com^")
+        elif roll < 0.70:
+            rules.append(f"||cdn{n}.net^$third-party,script")
+        elif roll < 0.85:
+            rules.append(random.choice([f"/{word}/{n}/*", f"-{word}-{n}.", f"&{word}{n}=", f"/{word}/{n}_"]))
+        elif roll < 0.95:
+            # Токен только на краю шаблона
+            rules.append(random.choice([f"{word}{n}.", f"/{word}{n}", f"{word}{n}_", f"_{word}{n}"]))
+        elif roll < 0.98:
+            rules.append(f"^{word}^$domain=site{len(rules) % 500}.com")
+        elif roll < 0.995:
+            rules.append(f"@@||host{n}.example{len(rules) % 97}.com/{word}$image")
+        elif roll < 0.9995:
+            rules.append(f"/\\/{word}\\/{n}[0-9]{{{len(rules) % 5 + 1}}}\\.gif$/")
+        else:
+            # Альтернативы не индексируются и проверяются общим списком
+            rules.append(f"/{word}{n}[0-9]+\\.(js|gif)/")
+    return rules
+
+def sample_urls(count=20000, seed=2):
+    random.seed(seed)
+    urls = []
+    for i in range(count):
+        host = random.choice([f"host{name(random.randint(0, 200000))}.example{random.randint(0, 96)}.com",
+                              "www.news-site.ru", "static.cdn-provider.net", f"cdn{name(random.randint(0, 200000))}.net"])
+        path = "/".join(random.choice(WORDS + ["static", "img", "app", "main", "v2"]) + random.choice(["", "_x", ".min", "-1"])
+                        for _ in range(random.randint(1, 5)))
+        url = f"https://{host}/{path}.{random.choice(['js', 'png', 'css', 'html'])}?v={i}&{random.choice(WORDS)}=1"
+        urls.append((url, host, random.choice(["www.news-site.ru", f"site{random.randint(0, 600)}.com", ""]),
+                     random.choice(["script", "image", "stylesheet", "xmlhttprequest", "other"])))
+    return urls
+
+def main(paths):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        flykit.CACHE_DIR = temp_dir
+        if not paths:
+            path = os.path.join(temp_dir, "synthetic.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n".join(synthetic_rules()))
+            paths = [path]
+
+        started = time.perf_counter()
+        engine = flykit.ContentFilter.load(paths)
+        print(f"разбор и компиляция: {(time.perf_counter() - started) * 1000:.0f} мс, правил: {engine.rule_count}")
+        started = time.perf_counter()
+        engine = flykit.ContentFilter.load(paths)
+        print(f"загрузка из кэша: {(time.perf_counter() - started) * 1000:.0f} мс")
+        print(f"правил без индекса: блок {len(engine.block.fallback)}, исключения {len(engine.allow.fallback)}")
+
+        urls = sample_urls()
+        # Первый проход компилирует регулярные выражения встреченных правил
+        for url, host, source_host, resource_type in urls:
+            engine.should_block(url, host, source_host, resource_type)
+        timings = []
+        blocked = 0
+        for url, host, source_host, resource_type in urls:
+            started = time.perf_counter()
+            blocked += engine.should_block(url, host, source_host, resource_type)
+            timings.append((time.perf_counter() - started) * 1e6)
+        timings.sort()
+        print(f"запросов: {len(urls)}, заблокировано: {blocked}")
+        print(f"среднее {statistics.mean(timings):.1f} мкс, медиана {timings[len(timings) // 2]:.1f} мкс, "
+              f"p99 {timings[int(len(timings) * 0.99)]:.1f} мкс")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
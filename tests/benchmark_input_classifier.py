@@ -0,0 +1,62 @@
+# Замер InputClassifier.classify на смеси адресов и запросов.
+# Запуск: python tests/benchmark_input_classifier.py [public_suffix_list.dat]
+# Без аргумента используется встроенный список зон.
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import flykit
+
+from test_input_classifier import CASES
+
+WORDS = ["погода", "quarterly", "report", "python", "курс", "доллара", "news", "how", "to", "recipe", "карта"]
+ZONES = ["com", "ru", "org", "co.uk", "рф", "io", "de", "net", "github.io", "local", "corp"]
+
+def sample_inputs(count=50000):
+    random.seed(1)
+    inputs = [text for text, _, _ in CASES]
+    while len(inputs) < count:
+        choice = random.random()
+        if choice < 0.4:
+            inputs.append(" ".join(random.choice(WORDS) for _ in range(random.randint(1, 4))))
+        elif choice < 0.8:
+            labels = [random.choice(WORDS) for _ in range(random.randint(1, 3))]
+            inputs.append(".".join(labels) + "." + random.choice(ZONES) + random.choice(["", "/", "/path?q=1"]))
+        elif choice < 0.9:
+            inputs.append(".".join(str(random.randint(0, 300)) for _ in range(4)) + random.choice(["", ":8080"]))
+        else:
+            inputs.append(random.choice(["localhost", "server", "printer.local"]) + f":{random.randint(1, 70000)}")
+    return inputs
+
+def main(paths):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        flykit.CACHE_DIR = temp_dir
+        if paths:
+            started = time.perf_counter()
+            suffixes = flykit.PublicSuffixIndex.load(paths[0])
+            print(f"компиляция списка: {(time.perf_counter() - started) * 1000:.0f} мс")
+            started = time.perf_counter()
+            suffixes = flykit.PublicSuffixIndex.load(paths[0])
+            print(f"загрузка из кэша: {(time.perf_counter() - started) * 1000:.0f} мс")
+        else:
+            suffixes = flykit.PublicSuffixIndex.builtin()
+        classifier = flykit.InputClassifier(suffixes)
+
+        inputs = sample_inputs()
+        timings = []
+        urls = 0
+        for text in inputs:
+            started = time.perf_counter()
+            urls += classifier.classify(text)[0] == "url"
+            timings.append((time.perf_counter() - started) * 1e6)
+        timings.sort()
+        print(f"вводов: {len(inputs)}, адресов: {urls}")
+        print(f"среднее {statistics.mean(timings):.1f} мкс, медиана {timings[len(timings) // 2]:.1f} мкс, "
+              f"p99 {timings[int(len(timings) * 0.99)]:.1f} мкс")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
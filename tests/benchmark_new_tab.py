@@ -0,0 +1,81 @@
+# Замер задержки новой вкладки: от add_new_tab до первой отрисовки страницы, с пулом и без.
+# Запуск: python tests/benchmark_new_tab.py [число вкладок]
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication
+
+import flykit
+
+PAGE = "data:text/html,<h1>FlyKit</h1>"
+POOL_SIZE = 2
+TIMEOUT = 30
+
+def main(rounds):
+    flykit.prepare_install_dirs()
+    flykit.apply_engine_settings()
+    flykit.register_internal_schemes()
+    app = QApplication(sys.argv)
+    window = flykit.Browser()
+    window.show()
+
+    steps = [False] * rounds + [True] * rounds
+    results = {False: [], True: []}
+    deadline = time.monotonic() + TIMEOUT
+
+    def next_tab():
+        nonlocal deadline
+        if time.monotonic() > deadline:
+            print("Превышено время ожидания")
+            app.exit(1)
+            return
+        pool = window.view_pool
+        if not window.startup_complete or not steps:
+            if steps:
+                QTimer.singleShot(100, next_tab)
+            else:
+                report()
+            return
+        pooled = steps[0]
+        pool.size = POOL_SIZE if pooled else 0
+        if not pooled:
+            pool.clear()
+        elif not pool.views:
+            # Ждём, пока пул наполнится в простое
+            pool.schedule_refill()
+            QTimer.singleShot(100, next_tab)
+            return
+        steps.pop(0)
+        deadline = time.monotonic() + TIMEOUT
+        last = window.new_tab_times[-1] if window.new_tab_times else None
+        browser = window.add_new_tab(PAGE)
+        wait_paint(browser, last, pooled)
+
+    def wait_paint(browser, last, pooled):
+        if time.monotonic() > deadline:
+            print("Вкладка не отрисовалась")
+            app.exit(1)
+            return
+        if not window.new_tab_times or window.new_tab_times[-1] is last:
+            QTimer.singleShot(20, lambda: wait_paint(browser, last, pooled))
+            return
+        results[pooled].append(window.new_tab_times[-1]["ms"])
+        window.close_tab(window.tab_index(browser))
+        QTimer.singleShot(300, next_tab)
+
+    def report():
+        for pooled, label in ((False, "без пула"), (True, f"пул из {POOL_SIZE}")):
+            values = results[pooled]
+            print(f"{label}: вкладок {len(values)}, среднее {statistics.mean(values):.1f} мс, "
+                  f"медиана {statistics.median(values):.1f} мс, макс. {max(values):.1f} мс")
+        app.exit(0)
+
+    QTimer.singleShot(0, next_tab)
+    return app.exec_()
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
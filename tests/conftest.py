@@ -0,0 +1,90 @@
+import os
+import sys
+
+# Тесты импортируют flykit.py из корня репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PyQt5.QtCore import QCoreApplication, QEventLoop, QTimer
+
+
+@pytest.fixture(scope="session")
+def qt_app():
+    # QNetworkAccessManager работает только при созданном приложении
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+@pytest.fixture
+def wait_signal(qt_app):
+    # Крутит цикл событий, пока сигнал не придёт; возвращает его аргументы
+    def wait(signal, timeout=5000):
+        received = []
+        loop = QEventLoop()
+
+        def handler(*args):
+            received.append(args)
+            loop.quit()
+
+        signal.connect(handler)
+        QTimer.singleShot(timeout, loop.quit)
+        if not received:
+            loop.exec_()
+        signal.disconnect(handler)
+        assert received, "сигнал не пришёл"
+        return received[0]
+    return wait
+
+
+class LocalServer:
+    # Маршруты: путь -> функция(заголовки запроса) -> (код, заголовки, тело)
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append((self.path, dict(self.headers)))
+                route = server.routes.get(self.path.split("?")[0])
+                status, headers, body = route(self) if route else (404, {}, b"")
+                try:
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except ConnectionError:
+                    # Клиент отменил запрос
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}{path}"
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture(scope="session")
+def shared_server():
+    server = LocalServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def local_server(shared_server):
+    shared_server.routes.clear()
+    shared_server.requests.clear()
+    return shared_server
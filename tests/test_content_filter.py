@@ -0,0 +1,154 @@
+import json
+import os
+import random
+
+import pytest
+
+import flykit
+
+def make_filter(*lines):
+    engine = flykit.ContentFilter()
+    engine.add_rules([line + "\n" for line in lines])
+    return engine
+
+def test_domain_rules():
+    engine = make_filter("||ads.example.com^", "@@||ok.ads.example.com^")
+    assert engine.should_block("https://ads.example.com/a.js", "ads.example.com")
+    assert engine.should_block("https://x.ads.example.com/a.js", "x.ads.example.com")
+    assert not engine.should_block("https://ok.ads.example.com/a.js", "ok.ads.example.com")
+    assert not engine.should_block("https://example.com/ads.js", "example.com")
+
+@pytest.mark.parametrize("rule, url, blocked", [
+    # Литерал внутри шаблона совпадает с токеном URL целиком
+    ("/banner/ad.", "https://site.ru/banner/ad.gif", True),
+    ("/banner/ad.", "https://site.ru/banners/ad.gif", False),
+    # Литерал в начале шаблона — конец токена URL
+    ("adbanner.", "https://site.ru/img/topadbanner.gif", True),
+    ("adbanner.", "https://site.ru/img/adbanners.gif", False),
+    # Литерал в конце шаблона — начало токена URL
+    ("/adbanner", "https://site.ru/adbanners.js", True),
+    ("/adbanner", "https://site.ru/myadbanner.js", False),
+    # Шаблон из одного литерала
+    ("adbanner", "https://site.ru/x_myadbanners_y", True),
+    ("|https://track.", "https://track.site.ru/p", True),
+    ("|https://track.", "http://track.site.ru/p", False),
+    ("swf|", "https://site.ru/movie.swf", True),
+    ("swf|", "https://site.ru/movie.swf?x=1", False),
+    ("/ad*/pixel.", "https://site.ru/adverts/pixel.png", True),
+    # Разделитель в начале: проверяются все вхождения литерала, а не только первое
+    ("^adserver^", "https://site.ru/adserver/1.js", True),
+    ("^adserver^", "https://site.ru/myadserver/1.js", False),
+    ("^adserver^", "https://site.ru/adserver2/x?adserver", True),
+    # Регулярные выражения: с обязательным литералом и без
+    (r"/\/adtech\/[0-9]+\.js/", "https://cdn.site.ru/adtech/123.js", True),
+    (r"/\/adtech\/[0-9]+\.js/", "https://cdn.site.ru/adtech/abc.js", False),
+    (r"/^https?:\/\/[0-9]+\.[0-9]+\./", "https://10.20.30.40/x", True),
+    (r"/^https?:\/\/[0-9]+\.[0-9]+\./", "https://site.ru/1.2.3", False),
+    # Регистр тела регулярного выражения сохраняется: \D не становится \d
+    (r"/\/ads\/\D+\.gif/", "https://site.ru/ads/banner.gif", True),
+    (r"/\/ads\/\D+\.gif/", "https://site.ru/ads/123.gif", False),
+    (r"/\/track\W\d+/", "https://site.ru/track-42", True),
+    (r"/\/track\W\d+/", "https://site.ru/track_42", False),
+    (r"/\/Promo\/\S+$/", "https://site.ru/promo/spring", True),
+])
+def test_patterns(rule, url, blocked):
+    engine = make_filter(rule)
+    host = url.split("/")[2]
+    assert engine.should_block(url, host, "page.ru") == blocked
+
+def test_options():
+    engine = make_filter("/promo/*$script,third-party", "/counter.$domain=news.ru|~sport.news.ru",
+                         "/popup.$~image")
+    assert engine.should_block("https://ads.net/promo/a.js", "ads.net", "site.ru", "script")
+    assert not engine.should_block("https://ads.net/promo/a.js", "ads.net", "site.ru", "image")
+    assert not engine.should_block("https://site.ru/promo/a.js", "site.ru", "www.site.ru", "script")
+    assert engine.should_block("https://c.net/counter.js", "c.net", "www.news.ru")
+    assert not engine.should_block("https://c.net/counter.js", "c.net", "sport.news.ru")
+    assert not engine.should_block("https://c.net/counter.js", "c.net", "site.ru")
+    assert engine.should_block("https://a.net/popup.js", "a.net", "", "script")
+    assert not engine.should_block("https://a.net/popup.png", "a.net", "", "image")
+
+@pytest.mark.parametrize("host, source_host, third_party", [
+    ("ads.example.co.uk", "www.other.co.uk", True),
+    ("ads.example.co.uk", "www.example.co.uk", False),
+    ("cdn.site.com.ru", "shop.site.com.ru", False),
+    ("cdn.site.com.ru", "shop.other.com.ru", True),
+    ("alice.github.io", "bob.github.io", True),
+    ("static.news.ru", "news.ru", False),
+])
+def test_third_party_uses_public_suffixes(host, source_host, third_party):
+    engine = make_filter("/pixel.$third-party")
+    assert engine.should_block(f"https://{host}/pixel.gif", host, source_host) == third_party
+
+def test_exceptions():
+    engine = make_filter("/ads/*", "@@/ads/allowed.", "@@/ads/*$domain=friend.ru")
+    assert engine.should_block("https://a.net/ads/x.js", "a.net", "site.ru")
+    assert not engine.should_block("https://a.net/ads/allowed.js", "a.net", "site.ru")
+    assert not engine.should_block("https://a.net/ads/x.js", "a.net", "friend.ru")
+
+def test_unsupported_rules_are_skipped():
+    engine = make_filter("! comment", "[Adblock Plus 2.0]", "site.ru##.banner", "/x.$popup", "/y.$csp=none")
+    assert engine.rule_count == 0
+
+def brute_force(engine, url, host, source_host, resource_type):
+    # Эталон: каждое правило проверяется по очереди, без индексов
+    def rules(rule_set):
+        found = []
+        for index in (rule_set.tokens, rule_set.prefixes, rule_set.suffixes, rule_set.contains, rule_set.domains):
+            for bucket in index.values():
+                found.extend(bucket)
+        return found + rule_set.fallback
+
+    url = url.lower()
+    base = engine._base_domain(host)
+    third_party = bool(source_host) and base != engine._base_domain(source_host)
+    source_domains = engine._parent_domains(source_host)
+    host_domains = engine._parent_domains(host)
+    blocked = not host_domains.isdisjoint(engine.blocked_domains) or any(
+        engine._rule_matches(rule, url, resource_type, third_party, source_domains) for rule in rules(engine.block))
+    if not blocked or not host_domains.isdisjoint(engine.allowed_domains):
+        return False
+    return not any(engine._rule_matches(rule, url, resource_type, third_party, source_domains)
+                   for rule in rules(engine.allow))
+
+def test_index_agrees_with_brute_force():
+    random.seed(7)
+    words = ["ads", "banner", "track", "pixel", "promo", "stat", "adserver", "beacon", "ad", "pop", "click"]
+    hosts = ["example.com", "news.site.org", "cdn.foo.net", "ads.bar.io", "shop.qux.com"]
+    forms = ["||{h}^", "/{w}/", "{w}.", "-{w}-", "{w}_", "/{w}", "&{w}=", "{w}", "||{h}/{w}", "/{w}*{v}.",
+             "|https://{h}/{w}", "{w}$domain={h}", "_{w}.$script,third-party", r"/\/{w}[0-9]+\.js/", "{w}$image",
+             ".{w}^", "{v}{w}"]
+    lines = []
+    for i in range(2000):
+        line = random.choice(forms).format(h=random.choice(hosts), w=random.choice(words), v=random.choice(words))
+        lines.append(("@@" if random.random() < 0.02 else "") + line)
+    engine = make_filter(*lines)
+
+    for i in range(2000):
+        host = random.choice(hosts + ["good.org"])
+        path = "/".join(random.choice(words + ["a", "x1"]) + random.choice(["", "_" + random.choice(words), ".js", "-x"])
+                        for _ in range(random.randint(1, 4)))
+        url = f"https://{host}/{path}?{random.choice(words)}=1"
+        source_host = random.choice(hosts + [""])
+        resource_type = random.choice(["script", "image", "other"])
+        assert engine.should_block(url, host, source_host, resource_type) == \
+            brute_force(engine, url, host, source_host, resource_type), url
+
+def test_compiled_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(flykit, "CACHE_DIR", str(tmp_path))
+    filter_path = tmp_path / "list.txt"
+    filter_path.write_text("||ads.example.com^\n/banner/ad.$image\n@@/banner/ad.ok\nadbanner.\n", encoding="utf-8")
+
+    built = flykit.ContentFilter.load([str(filter_path)])
+    cache_files = [name for name in os.listdir(tmp_path) if name.startswith("filters-")]
+    assert len(cache_files) == 1 and cache_files[0].endswith(".json")
+    with open(tmp_path / cache_files[0], encoding="utf-8") as f:
+        assert json.load(f)["version"] == flykit.ContentFilter.FORMAT_VERSION
+
+    cached = flykit.ContentFilter.load([str(filter_path)])
+    assert cached.rule_count == built.rule_count == 4
+    for url, resource_type in [("https://ads.example.com/x", "script"), ("https://a.ru/banner/ad.png", "image"),
+                               ("https://a.ru/banner/ad.ok", "image"), ("https://a.ru/banner/ad.png", "script"),
+                               ("https://a.ru/topadbanner.gif", "image")]:
+        host = url.split("/")[2]
+        assert cached.should_block(url, host, "", resource_type) == built.should_block(url, host, "", resource_type)
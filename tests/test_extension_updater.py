@@ -0,0 +1,169 @@
+import hashlib
+import io
+import json
+import zipfile
+
+import pytest
+
+import flykit
+
+VERSIONS = [
+    ("1.10", "1.9", True),
+    ("2.0", "1.99.9", True),
+    ("1.0.1", "1.0", True),
+    ("1.0", "1.0.0", False),
+    ("1.0.0", "1.0", False),
+    ("1.0", "1.0", False),
+    ("1.2-beta", "1.2", False),
+    ("v3", "2.9", True),
+    ("", "0.1", False),
+]
+
+
+@pytest.mark.parametrize("newer, older, expected", VERSIONS)
+def test_parse_version(newer, older, expected):
+    assert (flykit.parse_version(newer) > flykit.parse_version(older)) is expected
+
+
+class FakeFileStore:
+    # Вместо распаковки на диск запоминаем, что пришло в архиве
+    def __init__(self):
+        self.installed = {}
+
+    def install_from_zip(self, ext_id, zip_ref):
+        self.installed[ext_id] = json.loads(zip_ref.read("manifest.json"))
+
+
+def package(manifest=True, version="2.0"):
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w") as zip_file:
+        if manifest:
+            zip_file.writestr("manifest.json", json.dumps({"name": "Test", "version": version}))
+        zip_file.writestr("content.js", "console.log(1);")
+    return data.getvalue()
+
+
+@pytest.fixture
+def updater(qt_app, tmp_path, monkeypatch):
+    monkeypatch.setattr(flykit, "EXTENSIONS_DIR", str(tmp_path / "extensions"))
+    monkeypatch.setattr(flykit, "EXTENSION_STORE_DIR", str(tmp_path / "store"))
+    (tmp_path / "extensions").mkdir()
+    (tmp_path / "store").mkdir()
+    # Как и в браузере, updater живёт до конца работы приложения
+    updater = flykit.ExtensionUpdater(FakeFileStore(), qt_app)
+    yield updater
+    updater.pool.waitForDone()
+
+
+def install(tmp_path, ext_id, update_url, version="1.0"):
+    directory = tmp_path / "extensions" / ext_id
+    directory.mkdir()
+    (directory / "manifest.json").write_text(json.dumps({"name": ext_id, "version": version,
+                                                         "update_url": update_url}), encoding="utf-8")
+
+
+def serve_update(local_server, version, data, sha256=None, etag='"v1"'):
+    info = {"version": version, "url": local_server.url("/ext.zip")}
+    if sha256 is not None:
+        info["sha256"] = sha256
+
+    def update(handler):
+        if handler.headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, b""
+        return 200, {"ETag": etag, "Content-Type": "application/json"}, json.dumps(info).encode("utf-8")
+
+    local_server.routes["/update.json"] = update
+    local_server.routes["/ext.zip"] = lambda handler: (200, {"Content-Type": "application/zip"}, data)
+
+
+def requested(local_server, path):
+    return [headers for request_path, headers in local_server.requests if request_path == path]
+
+
+def test_newer_version_downloaded_and_installed(updater, local_server, wait_signal, tmp_path):
+    data = package()
+    serve_update(local_server, "2.0", data, sha256=hashlib.sha256(data).hexdigest().upper())
+    install(tmp_path, "ext", local_server.url("/update.json"))
+    updated = []
+    updater.updated.connect(lambda ext_id, version: updated.append((ext_id, version)))
+    updater.check_all()
+    assert wait_signal(updater.finished) == (1,)
+    assert updated == [("ext", "2.0")]
+    assert updater.file_store.installed["ext"]["version"] == "2.0"
+    # Валидаторы сохранены на диск, следующая проверка получает 304
+    with open(updater.state_path, encoding="utf-8") as f:
+        assert json.load(f)["ext"]["etag"] == '"v1"'
+    updater.check_all()
+    assert wait_signal(updater.finished) == (0,)
+    assert requested(local_server, "/update.json")[-1]["If-None-Match"] == '"v1"'
+    assert len(requested(local_server, "/ext.zip")) == 1
+
+
+@pytest.mark.parametrize("version", ["1.0", "0.9", "1.0.0"])
+def test_same_or_older_version_not_downloaded(updater, local_server, wait_signal, tmp_path, version):
+    serve_update(local_server, version, package())
+    install(tmp_path, "ext", local_server.url("/update.json"))
+    updater.check_all()
+    assert wait_signal(updater.finished) == (0,)
+    assert requested(local_server, "/ext.zip") == []
+    assert updater.state["ext"]["etag"] == '"v1"'
+
+
+def test_hash_mismatch_rejected(updater, local_server, wait_signal, tmp_path):
+    serve_update(local_server, "2.0", package(), sha256="0" * 64)
+    install(tmp_path, "ext", local_server.url("/update.json"))
+    updater.check_all()
+    assert wait_signal(updater.finished) == (0,)
+    assert updater.file_store.installed == {}
+    # Без установки валидаторы не сохраняются, иначе обновление потеряется за 304
+    assert "ext" not in updater.state
+
+
+def test_package_without_manifest_rejected(updater, local_server, wait_signal, tmp_path):
+    serve_update(local_server, "2.0", package(manifest=False))
+    install(tmp_path, "ext", local_server.url("/update.json"))
+    updater.check_all()
+    assert wait_signal(updater.finished) == (0,)
+    assert updater.file_store.installed == {}
+    assert "ext" not in updater.state
+
+
+@pytest.mark.parametrize("route", [
+    lambda handler: (404, {}, b""),
+    lambda handler: (500, {}, b"error"),
+    lambda handler: (200, {}, b"not json"),
+])
+def test_failed_check(updater, local_server, wait_signal, tmp_path, route):
+    local_server.routes["/update.json"] = route
+    install(tmp_path, "ext", local_server.url("/update.json"))
+    updater.check_all()
+    assert wait_signal(updater.finished) == (0,)
+    assert requested(local_server, "/ext.zip") == []
+    assert updater.state == {}
+
+
+def test_failed_download(updater, local_server, wait_signal, tmp_path):
+    serve_update(local_server, "2.0", b"")
+    local_server.routes["/ext.zip"] = lambda handler: (404, {}, b"")
+    install(tmp_path, "ext", local_server.url("/update.json"))
+    updater.check_all()
+    assert wait_signal(updater.finished) == (0,)
+    assert updater.file_store.installed == {}
+
+
+def test_several_extensions_checked_together(updater, local_server, wait_signal, tmp_path):
+    data = package()
+    serve_update(local_server, "2.0", data)
+    install(tmp_path, "first", local_server.url("/update.json"))
+    install(tmp_path, "second", local_server.url("/update.json"), version="3.0")
+    install(tmp_path, "broken", local_server.url("/missing.json"))
+    updater.check_all()
+    assert wait_signal(updater.finished) == (1,)
+    assert list(updater.file_store.installed) == ["first"]
+
+
+def test_nothing_to_check(updater, wait_signal, qt_app):
+    finished = []
+    updater.finished.connect(finished.append)
+    updater.check_all()
+    assert finished == [0]
@@ -0,0 +1,156 @@
+import pytest
+
+import flykit
+
+CASES = [
+    # Пустой ввод и явный поиск
+    ("", "search", ""),
+    ("   ", "search", ""),
+    ("?example.com", "search", "example.com"),
+    ("? localhost", "search", "localhost"),
+    # Текст с пробелами — всегда запрос
+    ("quarterly report", "search", "quarterly report"),
+    ("example.com is down", "search", "example.com is down"),
+    ("how to use localhost:8080", "search", "how to use localhost:8080"),
+    ("погода москва", "search", "погода москва"),
+    # Явная схема
+    ("http://example.com", "url", "http://example.com"),
+    ("HTTPS://Example.com/Path", "url", "HTTPS://Example.com/Path"),
+    ("ftp://files.example.org", "url", "ftp://files.example.org"),
+    ("file:///C:/docs/a.html", "url", "file:///C:/docs/a.html"),
+    ("about:blank", "url", "about:blank"),
+    ("view-source:https://example.com", "url", "view-source:https://example.com"),
+    ("mailto:user@example.com", "url", "mailto:user@example.com"),
+    ("data:text/html,hi", "url", "data:text/html,hi"),
+    ("flykit://settings", "url", "flykit://settings"),
+    ("javascript:alert(1)", "search", "javascript:alert(1)"),
+    ("foo:bar", "search", "foo:bar"),
+    # Обычные домены из списка суффиксов
+    ("example.com", "url", "https://example.com"),
+    ("Example.COM", "url", "https://Example.COM"),
+    ("example.com.", "url", "https://example.com."),
+    ("www.example.com/path?q=1#top", "url", "https://www.example.com/path?q=1#top"),
+    ("example.com:8443/admin", "url", "https://example.com:8443/admin"),
+    ("sub.domain.example.co.uk", "url", "https://sub.domain.example.co.uk"),
+    ("yandex.ru", "url", "https://yandex.ru"),
+    ("site.com.ru", "url", "https://site.com.ru"),
+    ("user.github.io", "url", "https://user.github.io"),
+    ("my-site.dev", "url", "https://my-site.dev"),
+    ("news.example.xyz", "url", "https://news.example.xyz"),
+    # Неизвестная двухбуквенная зона считается национальной
+    ("example.zz", "url", "https://example.zz"),
+    # Сам публичный суффикс — не адрес
+    ("com", "search", "com"),
+    ("co.uk", "search", "co.uk"),
+    ("github.io", "search", "github.io"),
+    # Неизвестная зона — запрос
+    ("file.txt", "search", "file.txt"),
+    ("readme.md", "url", "https://readme.md"),
+    ("version1.2", "search", "version1.2"),
+    ("asp.net", "url", "https://asp.net"),
+    # Кириллические домены и punycode
+    ("пример.рф", "url", "https://пример.рф"),
+    ("сайт.рус/страница", "url", "https://сайт.рус/страница"),
+    ("xn--e1afmkfd.xn--p1ai", "url", "https://xn--e1afmkfd.xn--p1ai"),
+    ("xn--zz.com", "search", "xn--zz.com"),
+    ("xn--.com", "search", "xn--.com"),
+    ("a.xn--zz", "search", "a.xn--zz"),
+    # Неверные метки
+    ("-example.com", "search", "-example.com"),
+    ("example-.com", "search", "example-.com"),
+    ("exa mple.com", "search", "exa mple.com"),
+    ("example..com", "search", "example..com"),
+    (".example.com", "search", ".example.com"),
+    ("a" * 64 + ".com", "search", "a" * 64 + ".com"),
+    ("a" * 63 + ".com", "url", "https://" + "a" * 63 + ".com"),
+    ("exa!mple.com", "search", "exa!mple.com"),
+    # Учётные данные в адресе без схемы не принимаются
+    ("user@example.com", "search", "user@example.com"),
+    ("user:pass@example.com", "search", "user:pass@example.com"),
+    # Порты
+    ("localhost:8080", "url", "http://localhost:8080"),
+    ("localhost:8080/api", "url", "http://localhost:8080/api"),
+    ("example.com:0", "search", "example.com:0"),
+    ("example.com:65536", "search", "example.com:65536"),
+    ("example.com:65535", "url", "https://example.com:65535"),
+    ("example.com:http", "search", "example.com:http"),
+    ("server:3000", "url", "http://server:3000"),
+    ("server:", "search", "server:"),
+    # localhost и внутренние имена
+    ("localhost", "url", "http://localhost"),
+    ("LOCALHOST/", "url", "http://LOCALHOST/"),
+    ("app.localhost", "url", "http://app.localhost"),
+    ("printer.local", "url", "http://printer.local"),
+    ("nas.lan/share", "url", "http://nas.lan/share"),
+    ("wiki.corp", "url", "http://wiki.corp"),
+    ("git.internal:8080", "url", "http://git.internal:8080"),
+    ("portal.intranet", "url", "http://portal.intranet"),
+    ("router.home.arpa", "url", "http://router.home.arpa"),
+    ("site.test", "url", "http://site.test"),
+    # Одно слово, совпадающее с внутренним суффиксом, — запрос
+    ("test", "search", "test"),
+    ("local", "search", "local"),
+    ("corp", "search", "corp"),
+    ("lan", "search", "lan"),
+    ("internal", "search", "internal"),
+    ("intranet", "search", "intranet"),
+    (".test", "search", ".test"),
+    ("a..local", "search", "a..local"),
+    # Имена без точки
+    ("router", "search", "router"),
+    ("router/", "search", "router/"),
+    ("python", "search", "python"),
+    # IPv4
+    ("192.168.0.1", "url", "http://192.168.0.1"),
+    ("10.0.0.1:8080/status", "url", "http://10.0.0.1:8080/status"),
+    ("127.0.0.1", "url", "http://127.0.0.1"),
+    ("256.1.1.1", "search", "256.1.1.1"),
+    ("1.2.3", "search", "1.2.3"),
+    ("1.2.3.4.5", "search", "1.2.3.4.5"),
+    ("3.14", "search", "3.14"),
+    ("2024.10.19", "search", "2024.10.19"),
+    # IPv6
+    ("[::1]", "url", "http://[::1]"),
+    ("[::1]:8080/x", "url", "http://[::1]:8080/x"),
+    ("[fe80::1", "search", "[fe80::1"),
+    ("[::1]x", "search", "[::1]x"),
+    ("[::1]:port", "search", "[::1]:port"),
+    # Прочее
+    ("/usr/share/doc", "search", "/usr/share/doc"),
+    ("#hashtag", "search", "#hashtag"),
+    ("c++", "search", "c++"),
+    ("1+1", "search", "1+1"),
+]
+
+@pytest.fixture(scope="module")
+def classifier():
+    return flykit.InputClassifier(flykit.PublicSuffixIndex.builtin())
+
+@pytest.mark.parametrize("text, kind, value", CASES)
+def test_classify(classifier, text, kind, value):
+    assert classifier.classify(text) == (kind, value)
+
+def test_intranet_hosts():
+    classifier = flykit.InputClassifier(flykit.PublicSuffixIndex.builtin(), ["NAS", "jira"])
+    assert classifier.classify("nas") == ("url", "http://nas")
+    assert classifier.classify("jira/browse/X-1") == ("url", "http://jira/browse/X-1")
+    assert classifier.classify("confluence") == ("search", "confluence")
+
+def test_full_suffix_list(tmp_path, monkeypatch):
+    monkeypatch.setattr(flykit, "CACHE_DIR", str(tmp_path))
+    path = tmp_path / "public_suffix_list.dat"
+    path.write_text("// ===BEGIN ICANN DOMAINS===\ncom\nuk\nco.uk\n*.ck\n!www.ck\nрф\n"
+                    "// ===BEGIN PRIVATE DOMAINS===\ngithub.io\n", encoding="utf-8")
+    for _ in range(2):
+        # Второй проход читает скомпилированный список из кэша
+        classifier = flykit.InputClassifier(flykit.PublicSuffixIndex.load(str(path)))
+        assert classifier.classify("example.com") == ("url", "https://example.com")
+        assert classifier.classify("example.zz") == ("search", "example.zz")
+        assert classifier.classify("node.js") == ("search", "node.js")
+        assert classifier.classify("example.co.uk") == ("url", "https://example.co.uk")
+        assert classifier.classify("co.uk") == ("search", "co.uk")
+        assert classifier.classify("foo.ck") == ("search", "foo.ck")
+        assert classifier.classify("bar.foo.ck") == ("url", "https://bar.foo.ck")
+        assert classifier.classify("www.ck") == ("url", "https://www.ck")
+        assert classifier.classify("пример.рф") == ("url", "https://пример.рф")
+    assert [name for name in tmp_path.iterdir() if name.name.startswith("suffixes-")][0].suffix == ".json"
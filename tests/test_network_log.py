@@ -0,0 +1,91 @@
+from PyQt5.QtCore import QObject, QUrl
+
+import flykit
+
+
+class FakeInfo:
+    def __init__(self, url, first_party):
+        self.url = QUrl(url)
+        self.first_party = QUrl(first_party)
+
+    def requestUrl(self):
+        return self.url
+
+    def firstPartyUrl(self):
+        return self.first_party
+
+    def requestMethod(self):
+        return b"GET"
+
+    def resourceType(self):
+        return -1
+
+
+class FakePage:
+    interceptor = None
+
+    def setUrlRequestInterceptor(self, interceptor):
+        self.interceptor = interceptor
+
+    def runJavaScript(self, source, world, callback):
+        callback(None)
+
+
+class FakeView(QObject):
+    def __init__(self):
+        super().__init__()
+        self.fake_page = FakePage()
+
+    def page(self):
+        return self.fake_page
+
+
+class FakeChain:
+    def __init__(self):
+        self.observers = []
+
+
+def request(chain, view, url, first_party, blocked=False):
+    # Порядок вызовов как в QtWebEngine: цепочка профиля, затем перехватчик страницы
+    info = FakeInfo(url, first_party)
+    for observer in chain.observers:
+        observer(info, blocked)
+    view.page().interceptor.interceptRequest(info)
+
+
+def make_log(count):
+    network_log = flykit.NetworkLog()
+    chain = FakeChain()
+    network_log.attach(chain)
+    views = [FakeView() for _ in range(count)]
+    for view in views:
+        network_log.add_tab(view)
+        network_log.track(view, "https://example.com/")
+    return network_log, chain, views
+
+
+def urls(network_log, view):
+    return [entry["url"] for entry in network_log.tabs[network_log.tab_ids[view]]]
+
+
+def test_same_document_in_two_tabs():
+    network_log, chain, (first, second) = make_log(2)
+    request(chain, first, "https://cdn.example.com/a.js", "https://example.com/")
+    request(chain, second, "https://cdn.example.com/b.js", "https://example.com/")
+    assert urls(network_log, first) == ["https://cdn.example.com/a.js"]
+    assert urls(network_log, second) == ["https://cdn.example.com/b.js"]
+
+
+def test_blocked_request_recorded_once():
+    network_log, chain, (first, second) = make_log(2)
+    network_log.remove_tab(second)
+    request(chain, first, "https://ads.example.net/x.js", "https://example.com/", blocked=True)
+    entries = list(network_log.tabs[network_log.tab_ids[first]])
+    assert [(entry["url"], entry["blocked"]) for entry in entries] == [("https://ads.example.net/x.js", True)]
+    assert network_log.documents == {"https://example.com/": {network_log.tab_ids[first]}}
+
+
+def test_closed_tab_forgets_documents():
+    network_log, chain, (first,) = make_log(1)
+    network_log.remove_tab(first)
+    assert network_log.documents == {}
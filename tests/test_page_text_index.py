@@ -0,0 +1,64 @@
+import pytest
+
+import flykit
+
+PAGES = {
+    "news": "Погода в Москве: завтра дождь. Погода на выходные — солнце, погода отличная.",
+    "blog": "Заметки о Python. Погода не мешает писать код на Python, Python и ещё раз Python в любую погоду, погода.",
+    "shop": "Каталог: зонты от дождя, python-книги, погода не важна.",
+}
+
+
+def make_index(pages, indexed_at=None):
+    index = flykit.PageTextIndex()
+    for key, text in pages.items():
+        index.versions[key] = 1
+        index.add(key, 1, text)
+        index.indexed_at[key] = (indexed_at or {}).get(key, 0)
+    return index
+
+
+def keys(results):
+    return [key for key, snippet, term in results]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("python", ["blog", "shop"]),
+    ("погода", ["news", "blog", "shop"]),
+    ("дождь", ["news"]),
+    ("python погода", ["blog", "shop"]),
+    ("ПОГОДА Python", ["blog", "shop"]),
+    ("телевизор", []),
+    ("", []),
+])
+def test_ranked_by_match_count(query, expected):
+    assert keys(make_index(PAGES).search(query)) == expected
+
+
+def test_ties_ranked_by_recency():
+    pages = {"old": "один два", "new": "два три", "middle": "два"}
+    index = make_index(pages, {"old": 10, "new": 30, "middle": 20})
+    assert keys(index.search("два")) == ["new", "middle", "old"]
+
+
+def test_limit():
+    pages = {f"page{n}": "слово " * n for n in range(1, 8)}
+    assert keys(make_index(pages).search("слово", limit=3)) == ["page7", "page6", "page5"]
+
+
+def test_term_is_first_matched_word():
+    # Подсвечивается слово запроса, которое встречается в тексте первым, а не весь запрос
+    results = dict((key, (snippet, term)) for key, snippet, term in make_index(PAGES).search("python погода"))
+    assert results["blog"][1] == "python"
+    assert results["shop"][1] == "python"
+    assert results["blog"][0].startswith("Заметки о Python")
+
+
+def test_reindex_updates_postings():
+    index = make_index({"page": "старый текст"})
+    index.versions["page"] = 2
+    index.add("page", 2, "новый текст")
+    assert keys(index.search("старый")) == []
+    assert keys(index.search("новый текст")) == ["page"]
+    index.remove("page")
+    assert index.postings == {}
@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from PyQt5.QtCore import QEventLoop, QTimer
+
+import flykit
+
+WORDS = ["погода", "погода москва", "погода завтра", "почта", "python", "python asyncio", "pytest",
+         "Pyqt5", "pyqt5 qwebengine", "qt"]
+
+
+def run_events(ms):
+    loop = QEventLoop()
+    QTimer.singleShot(ms, loop.quit)
+    loop.exec_()
+
+
+@pytest.fixture
+def server(local_server):
+    # Подсказки — слова словаря с тем же началом; запрос "slow…" отвечает с задержкой
+    local_server.release = threading.Event()
+
+    def suggest(handler):
+        query = parse_qs(urlparse(handler.path).query).get("q", [""])[0]
+        if query.startswith("slow"):
+            local_server.release.wait(5)
+        results = [word for word in WORDS if word.lower().startswith(query.lower())]
+        return 200, {"Content-Type": "application/json"}, json.dumps([query, results]).encode("utf-8")
+
+    local_server.routes["/suggest"] = suggest
+    local_server.routes["/broken"] = lambda handler: (200, {}, b"[\"q\"")
+    yield local_server
+    local_server.release.set()
+
+
+@pytest.fixture
+def suggestions(qt_app, server):
+    suggestions = flykit.SearchSuggestions(server.url("/suggest?q={query}"), qt_app)
+    suggestions.debounce.setInterval(0)
+    yield suggestions
+    suggestions.cancel()
+
+
+def queries(server):
+    return [parse_qs(urlparse(path).query).get("q", [""])[0] for path, headers in server.requests]
+
+
+def test_request_and_cache(suggestions, server, wait_signal):
+    suggestions.request("по")
+    assert wait_signal(suggestions.suggestions) == ("по", ["погода", "погода москва", "погода завтра", "почта"])
+    # Повтор и уточнение короткого списка берутся из кэша без сети
+    received = []
+    suggestions.suggestions.connect(lambda query, results: received.append((query, results)))
+    suggestions.request("ПО")
+    suggestions.request("пого")
+    run_events(100)
+    assert received == [("ПО", ["погода", "погода москва", "погода завтра", "почта"]),
+                        ("пого", ["погода", "погода москва", "погода завтра"])]
+    assert queries(server) == ["по"]
+
+
+def test_query_is_percent_encoded(suggestions, server, wait_signal):
+    suggestions.request("  python asyncio  ")
+    assert wait_signal(suggestions.suggestions) == ("python asyncio", ["python asyncio"])
+    assert server.requests[0][0] == "/suggest?q=python%20asyncio"
+
+
+def test_full_cached_list_is_refreshed(suggestions, server, wait_signal, monkeypatch):
+    # Список длиной LIMIT мог быть обрезан: показываем отфильтрованный кэш и всё равно спрашиваем сервер
+    monkeypatch.setattr(flykit.SearchSuggestions, "LIMIT", 2)
+    suggestions.request("p")
+    assert wait_signal(suggestions.suggestions) == ("p", ["python", "python asyncio"])
+    received = []
+    suggestions.suggestions.connect(lambda query, results: received.append((query, results)))
+    suggestions.request("py")
+    assert received == [("py", ["python", "python asyncio"])]
+    assert wait_signal(suggestions.suggestions) == ("py", ["python", "python asyncio"])
+    assert queries(server) == ["p", "py"]
+
+
+def test_empty_query_clears(suggestions, server):
+    received = []
+    suggestions.suggestions.connect(lambda query, results: received.append((query, results)))
+    suggestions.request("   ")
+    assert received == [("", [])]
+    run_events(50)
+    assert server.requests == []
+
+
+def test_new_request_cancels_previous(suggestions, server, wait_signal):
+    suggestions.request("slow")
+    deadline = time.time() + 5
+    while not server.requests and time.time() < deadline:
+        run_events(10)
+    suggestions.request("qt")
+    assert wait_signal(suggestions.suggestions) == ("qt", ["qt"])
+    server.release.set()
+    received = []
+    suggestions.suggestions.connect(lambda query, results: received.append(query))
+    run_events(200)
+    # Ответ на отменённый запрос не показывается и не попадает в кэш
+    assert received == []
+    assert "slow" not in suggestions.cache
+
+
+def test_debounce_sends_only_last_query(suggestions, server, wait_signal):
+    suggestions.debounce.setInterval(50)
+    for query in ("p", "py", "pyt"):
+        suggestions.request(query)
+    assert wait_signal(suggestions.suggestions) == ("pyt", ["python", "python asyncio", "pytest"])
+    assert queries(server) == ["pyt"]
+
+
+@pytest.mark.parametrize("path", ["/broken?q={query}", "/missing?q={query}"])
+def test_bad_response_ignored(qt_app, server, path):
+    suggestions = flykit.SearchSuggestions(server.url(path), qt_app)
+    suggestions.debounce.setInterval(0)
+    received = []
+    suggestions.suggestions.connect(lambda query, results: received.append(query))
+    suggestions.request("qt")
+    deadline = time.time() + 5
+    while (not server.requests or suggestions.reply is not None) and time.time() < deadline:
+        run_events(10)
+    assert received == []
+    assert suggestions.cache == {}
+
+
+def test_cache_size_limited(suggestions, monkeypatch):
+    monkeypatch.setattr(flykit.SearchSuggestions, "CACHE_SIZE", 3)
+    for query in ("a", "b", "c", "a", "d"):
+        suggestions.remember(query, [query])
+    assert list(suggestions.cache) == ["c", "a", "d"]